@@ -1,6 +1,8 @@
 from simpn.simulator import SimToken, SimProblem
-from random import uniform, choices
 import json
+import numpy as np
+from rng import get_rng
+from case_record import CaseRecord, case_table
 from datetime import datetime, timedelta
 
 # Load configuration
@@ -10,48 +12,136 @@ with open('config.json', 'r') as f:
 # Define the initial simulation start time
 INITIAL_TIME = datetime(2020, 1, 1, 0, 0, 0)
 
-def start_behavior(sim_problem):
+class CaseAttributeSampler:
     """
-    Generates case attributes based on distribution configurations in config.json.
-    Returns a SimToken containing the attributes and an empty rework_counts dictionary.
+    Draws case attributes from the distributions in config["case_attributes"].
+    The configuration is validated and compiled once; values are drawn with NumPy in batches of batch_size cases
+    (one categorical draw per discrete attribute, one bin choice plus a uniform value per bins attribute),
+    and the next batch is drawn when the current one is used up.
+
+    :param attribute_config: the "case_attributes" section of the configuration.
+    :param seed: seed for the random generator, so the drawn attributes can be reproduced, or a numpy Generator to draw from.
+    :param batch_size: number of cases drawn at once.
     """
-    attributes = {}
-    for attr_name, attr_config in config.get("case_attributes", {}).items():
+    def __init__(self, attribute_config, seed=None, batch_size=1024):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.rng = np.random.default_rng(seed)
+        self.batch_size = batch_size
+        self.names = []
+        self._draws = []
+        for attr_name, attr_config in attribute_config.items():
+            self.names.append(attr_name)
+            self._draws.append(self._compile(attr_name, attr_config))
+        self._batch = []
+        self._position = 0
+
+    @staticmethod
+    def _probabilities(attr_name, probabilities):
+        total = sum(probabilities)
+        if not (0.99 <= total <= 1.01):
+            raise ValueError(f"Probabilities for {attr_name} must sum to 1, got {total}")
+        # Normalize, because numpy only accepts probabilities that sum to 1 exactly
+        return np.asarray(probabilities, dtype=float) / total
+
+    def _compile(self, attr_name, attr_config):
+        """Returns a function that draws n values of the attribute as a list."""
         attr_type = attr_config["type"]
         dist_config = attr_config.get("distribution", {})
         dist_type = dist_config.get("type")
 
         if dist_type == "discrete":
-            # Handle discrete distributions (for strings, booleans)
             values = [item["value"] for item in dist_config["values"]]
-            probabilities = [item["probability"] for item in dist_config["values"]]
-            # Validate probabilities
-            if not (0.99 <= sum(probabilities) <= 1.01):
-                raise ValueError(f"Probabilities for {attr_name} must sum to 1, got {sum(probabilities)}")
-            # Select one value based on probabilities
-            value = choices(values, weights=probabilities, k=1)[0]
-            attributes[attr_name] = value
+            probabilities = self._probabilities(attr_name, [item["probability"] for item in dist_config["values"]])
+
+            def draw(n):
+                return [values[i] for i in self.rng.choice(len(values), size=n, p=probabilities).tolist()]
+            return draw
 
         elif dist_type == "bins" and attr_type == "numerical":
-            # Handle binned numerical distributions
             bins = dist_config["bins"]
-            ranges = [item["range"] for item in bins]
-            probabilities = [item["probability"] for item in bins]
-            # Validate probabilities
-            if not (0.99 <= sum(probabilities) <= 1.01):
-                raise ValueError(f"Probabilities for {attr_name} must sum to 1, got {sum(probabilities)}")
-            # Select a bin based on probabilities
-            selected_bin = choices(ranges, weights=probabilities, k=1)[0]
-            # Generate a uniform random value within the selected bin
-            min_val, max_val = selected_bin
-            value = uniform(min_val, max_val)
-            attributes[attr_name] = value
+            lows = np.array([item["range"][0] for item in bins], dtype=float)
+            widths = np.array([item["range"][1] for item in bins], dtype=float) - lows
+            probabilities = self._probabilities(attr_name, [item["probability"] for item in bins])
+
+            def draw(n):
+                selected = self.rng.choice(len(bins), size=n, p=probabilities)
+                return (lows[selected] + widths[selected] * self.rng.random(n)).tolist()
+            return draw
 
         else:
             raise ValueError(f"Unsupported distribution type '{dist_type}' for attribute '{attr_name}'")
 
+    def _refill(self):
+        columns = [draw(self.batch_size) for draw in self._draws]
+        names = self.names
+        self._batch = [dict(zip(names, row)) for row in zip(*columns)] if columns else [{} for _ in range(self.batch_size)]
+        self._position = 0
+
+    def reset(self):
+        """Drops the values drawn in advance, e.g. after the generator was re-seeded."""
+        self._batch = []
+        self._position = 0
+
+    def get_state(self):
+        """The values drawn in advance that are not used yet, e.g. to checkpoint a run."""
+        return self._batch[self._position:]
+
+    def set_state(self, state):
+        """Continues with the values of get_state; the generator state is restored with the model's SimulationRNG."""
+        self._batch = list(state)
+        self._position = 0
+
+    def sample(self):
+        """Returns a new dictionary with the attributes of one case."""
+        if self._position == len(self._batch):
+            self._refill()
+        attributes = self._batch[self._position]
+        self._position += 1
+        return attributes
+
+
+def attribute_sampler(sim_problem, seed=None):
+    """
+    Returns the CaseAttributeSampler of the simulation problem, creating it from config.json on first use.
+    The sampler draws from the numpy stream of the model's SimulationRNG (see common/rng.py), so seeding the
+    model reproduces the case attributes too. Passing a seed re-seeds the model's RNG before the simulation starts.
+    """
+    rng = get_rng(sim_problem, seed)
+    sampler = getattr(sim_problem, "attribute_sampler", None)
+    if sampler is None:
+        sampler = CaseAttributeSampler(config.get("case_attributes", {}), seed=rng.numpy)
+        # Values drawn in advance belong to the old seed
+        rng.on_seed(sampler.reset)
+        sim_problem.attribute_sampler = sampler
+    return sampler
+
+def generate_attributes(sim_problem):
+    """
+    Generates case attributes based on distribution configurations in config.json,
+    including the start time of the case as a datetime.
+    """
+    attributes = attribute_sampler(sim_problem).sample()
     # Add the start time as a datetime
-    start_time = INITIAL_TIME + timedelta(minutes=sim_problem.clock)
-    attributes["start_time"] = start_time
+    attributes["start_time"] = INITIAL_TIME + timedelta(minutes=sim_problem.clock)
+    return attributes
+
+def start_behavior(sim_problem):
+    """
+    Generates case attributes based on distribution configurations in config.json.
+    Returns a SimToken containing the attributes and an empty rework_counts dictionary.
+    """
+    attributes = generate_attributes(sim_problem)
     # Token format: (attributes, rework_counts)
-    return [SimToken((attributes, {}))]
\ No newline at end of file
+    return [SimToken((attributes, {}))]
+
+def start_case(sim_problem, case_id):
+    """
+    Start event behavior that also receives the case_id, for BPMNStartEvent(..., behavior=lambda case_id: start_case(model, case_id)).
+    Returns the case token, a CaseRecord with the attributes in the CaseTable of the model (see case_record.py).
+    The new case is also recorded as sim_problem.last_started_case, so the event log reporters get its attributes
+    without searching the queue.
+    """
+    case = CaseRecord(case_id, case_table(sim_problem), generate_attributes(sim_problem))
+    sim_problem.last_started_case = (case_id, case)
+    return SimToken(case)
\ No newline at end of file
@@ -0,0 +1,223 @@
+import sys
+from array import array
+from collections import namedtuple
+
+from simpn.simulator import SimProblem
+
+
+class _Missing:
+    """The value in a column for the cases that do not have the attribute; stays the same object when copied."""
+    __slots__ = ()
+
+    def __reduce__(self):
+        return "_MISSING"  # pickle and copy refer to the module-level instance
+
+    def __repr__(self):
+        return "<missing>"
+
+
+_MISSING = _Missing()
+
+class CaseRecordState(namedtuple("CaseRecordState", ["id", "attributes", "rework_counts"])):
+    """A copy of a CaseRecord that does not change with the run, for snapshots: see freeze_records and thaw_records."""
+    __slots__ = ()
+
+    def __deepcopy__(self, memo):
+        # Never changed (thaw_records copies the values into a new record), so copies of a snapshot can share it and
+        # the tokens of one record stay one record
+        return self
+
+
+class CaseTable:
+    """
+    The attributes of the cases of a model, stored in columns: one list per attribute name with a value per row, and a
+    row per case. The row of a case is reused when its CaseRecord is no longer referenced, so the table grows with the
+    number of cases in progress rather than with the length of the run.
+    The rework points of the model are numbered, so every case keeps its rework counts in a small array.
+    """
+    def __init__(self):
+        self.columns = {}
+        self.rows = 0
+        self.free = []
+        self.rework_points = {}
+
+    def column(self, name):
+        """Returns the column of an attribute, creating it on first use."""
+        column = self.columns.get(name)
+        if column is None:
+            column = self.columns[sys.intern(name)] = [_MISSING] * self.rows
+        return column
+
+    def add_row(self, attributes):
+        """Stores the attributes of a new case and returns its row."""
+        if self.free:
+            row = self.free.pop()
+        else:
+            row = self.rows
+            self.rows += 1
+            for column in self.columns.values():
+                column.append(_MISSING)
+        for name, value in attributes.items():
+            self.column(name)[row] = value
+        return row
+
+    def release(self, row):
+        """Clears a row for reuse."""
+        for column in self.columns.values():
+            column[row] = _MISSING
+        self.free.append(row)
+
+    def rework_index(self, key):
+        """Returns the index of the counter of a rework point (an activity or a rework loop) in CaseRecord.rework."""
+        index = self.rework_points.get(key)
+        if index is None:
+            index = self.rework_points[key] = len(self.rework_points)
+        return index
+
+
+class CaseRecord:
+    """
+    The value of a case token: the case_id, the row of its attributes in the CaseTable of the model and its rework
+    counts. Behaviors change a case in place (record["loan_approval_resource"] = resource, set_rework_count), instead
+    of building new dictionaries and tuples for every change.
+
+    A record is a mapping of its attributes, so conditions, decision tables and guards that take the attributes
+    dictionary take the record as it is. For code written for the tuple tokens (case_id, (attributes, rework_counts)),
+    record[0], record[1] and unpacking give that shape, with the record as the attributes and a dictionary of the
+    rework counts; see also case_attributes.
+
+    Tokens that are copied, such as those of a parallel split, refer to the same record, so their branches share the
+    changes to the case.
+
+    :param case_id: The case_id.
+    :param table: The CaseTable of the model, see case_table.
+    :param attributes: The initial attributes, a dictionary.
+    """
+    __slots__ = ("id", "table", "row", "rework", "version")
+
+    def __init__(self, case_id, table, attributes=None):
+        self.id = case_id
+        self.table = table
+        self.row = table.add_row(attributes or {})
+        self.rework = None  # array of rework counts by CaseTable.rework_index, created on the first rework
+        self.version = 0  # incremented by every change, so caches keyed on the record can tell it changed
+
+    def __del__(self):
+        self.table.release(self.row)
+
+    def __getitem__(self, key):
+        if type(key) is int:
+            # The tuple token (case_id, (attributes, rework_counts))
+            if key == 0:
+                return self.id
+            return (self.id, (self, self.rework_counts()))[key]
+        column = self.table.columns.get(key)
+        if column is not None:
+            value = column[self.row]
+            if value is not _MISSING:
+                return value
+        raise KeyError(key)
+
+    def __setitem__(self, name, value):
+        self.table.column(name)[self.row] = value
+        self.version += 1
+
+    def get(self, name, default=None):
+        column = self.table.columns.get(name)
+        if column is not None:
+            value = column[self.row]
+            if value is not _MISSING:
+                return value
+        return default
+
+    def __contains__(self, name):
+        column = self.table.columns.get(name)
+        return column is not None and column[self.row] is not _MISSING
+
+    def keys(self):
+        """The names of the attributes of the case."""
+        return [name for name, column in self.table.columns.items() if column[self.row] is not _MISSING]
+
+    def items(self):
+        return [(name, column[self.row]) for name, column in self.table.columns.items()
+                if column[self.row] is not _MISSING]
+
+    def __iter__(self):
+        # Unpacks like the tuple token: identifier, (attributes, rework_counts) = record
+        return iter((self.id, (self, self.rework_counts())))
+
+    def rework_count(self, index):
+        """The rework count of the rework point with the given CaseTable.rework_index."""
+        rework = self.rework
+        return rework[index] if rework is not None and index < len(rework) else 0
+
+    def set_rework_count(self, index, count):
+        rework = self.rework
+        if rework is None:
+            rework = self.rework = array("H", bytes(2 * len(self.table.rework_points)))
+        if index >= len(rework):
+            rework.extend(array("H", bytes(2 * (index + 1 - len(rework)))))
+        rework[index] = count
+        self.version += 1
+
+    def rework_counts(self):
+        """The rework counts as a dictionary {rework point: count}, without the points that are not reworked."""
+        rework = self.rework
+        if rework is None:
+            return {}
+        return {key: rework[index] for key, index in self.table.rework_points.items()
+                if index < len(rework) and rework[index]}
+
+    def to_tuple(self):
+        """The case as a tuple token (case_id, (attributes, rework_counts)) with copies of the dictionaries."""
+        return self.id, (dict(self.items()), self.rework_counts())
+
+    def __repr__(self):
+        return f"CaseRecord({self.id!r}, {dict(self.items())}, {self.rework_counts()})"
+
+
+def case_table(sim_problem: SimProblem):
+    """Returns the CaseTable of the simulation problem, creating it on first use."""
+    table = getattr(sim_problem, "case_table", None)
+    if table is None:
+        table = sim_problem.case_table = CaseTable()
+    return table
+
+
+def case_attributes(case):
+    """The attributes of a case token value: the record itself, or the dictionary of a tuple token."""
+    return case if case.__class__ is CaseRecord else case[1][0]
+
+
+def freeze_records(value, memo):
+    """
+    Returns the value of a token with every CaseRecord in it, also inside tuples and lists, replaced by a
+    CaseRecordState with copies of its attributes and rework counts. Records are changed in place as the run goes on,
+    so a snapshot of the marking keeps these copies instead of the records. A record that is in several tokens (e.g.
+    the branches of a parallel split) gets one state, through memo (a dictionary shared by the tokens).
+    """
+    if value.__class__ is CaseRecord:
+        state = memo.get(id(value))
+        if state is None:
+            state = memo[id(value)] = CaseRecordState(value.id, dict(value.items()), value.rework_counts())
+        return state
+    if value.__class__ is tuple or value.__class__ is list:
+        return value.__class__(freeze_records(item, memo) for item in value)
+    return value
+
+
+def thaw_records(value, table, memo):
+    """
+    The reverse of freeze_records: returns the value with every CaseRecordState replaced by a new CaseRecord in the
+    given CaseTable. States that are the same object become the same record, through memo.
+    """
+    if value.__class__ is CaseRecordState:
+        record = memo.get(id(value))
+        if record is None:
+            record = memo[id(value)] = CaseRecord(value.id, table, value.attributes)
+            for key, count in value.rework_counts.items():
+                record.set_rework_count(table.rework_index(key), count)
+        return record
+    if value.__class__ is tuple or value.__class__ is list:
+        return value.__class__(thaw_records(item, table, memo) for item in value)
+    return value
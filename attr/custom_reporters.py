@@ -1,67 +1,181 @@
+import asyncio
+import math
+import queue
+import sys
+import threading
+from collections import namedtuple
 from datetime import datetime, timedelta
 from simpn.reporters import Reporter, TimeUnit
+from array import array
+from case_record import CaseRecord
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
 
-class EnhancedEventLogReporter(Reporter):
+DEFAULT_TIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+# Number of microseconds in one unit of simulation time
+UNIT_MICROSECONDS = {
+    TimeUnit.SECONDS: 1_000_000,
+    TimeUnit.MINUTES: 60_000_000,
+    TimeUnit.HOURS: 3_600_000_000,
+    TimeUnit.DAYS: 86_400_000_000,
+}
+
+# A completed event as produced by StreamingEventReporter; start_time and completion_time are datetimes
+EventLogRow = namedtuple("EventLogRow", ["case_id", "task", "resource", "start_time", "completion_time", "attributes"])
+
+class TimestampEncoder:
     """
-    An enhanced event log reporter that logs events with additional case attributes.
-    Attributes are extracted from simulation tokens to match the simulation's case attributes.
+    Converts simulation times to datetimes and timestamp strings.
+    The time unit is resolved once, at construction. For the default time format the string is built from
+    integer microsecond arithmetic and a memo of per-day "%Y-%m-%d " prefixes, so strftime is only called once
+    per simulated day. The result is identical to (initial_time + timedelta(...)).strftime(time_format).
+
+    :param timeunit: The TimeUnit of simulation time.
+    :param initial_time: The datetime that corresponds to simulation time 0.
+    :param time_format: A datetime formatting string.
+    """
+    def __init__(self, timeunit, initial_time, time_format=DEFAULT_TIME_FORMAT):
+        self.initial_time = initial_time
+        self.time_format = time_format
+        self.unit_microseconds = UNIT_MICROSECONDS.get(timeunit)
+        self._midnight = initial_time.replace(hour=0, minute=0, second=0, microsecond=0)
+        self._offset = (initial_time - self._midnight) // timedelta(microseconds=1)
+        self._day_prefixes = {}
+        if self.unit_microseconds is None:
+            self.format = lambda time: None
+        elif time_format == DEFAULT_TIME_FORMAT:
+            self.format = self._format_default
+        else:
+            self.format = self._format_strftime
+
+    def to_microseconds(self, time):
+        """
+        Simulation time in whole microseconds since initial_time.
+        Rounds in the same way as timedelta, so that it matches initial_time + timedelta(...).
+        """
+        fraction, whole = math.modf(time)
+        return int(whole) * self.unit_microseconds + round(fraction * self.unit_microseconds)
+
+    def to_datetime(self, time):
+        """Convert simulation time to a datetime, or None if the time unit is not supported."""
+        if self.unit_microseconds is None:
+            return None
+        return self.initial_time + timedelta(microseconds=self.to_microseconds(time))
+
+    def _format_strftime(self, time):
+        return self.to_datetime(time).strftime(self.time_format)
+
+    def _format_default(self, time):
+        day, rest = divmod(self._offset + self.to_microseconds(time), 86_400_000_000)
+        prefix = self._day_prefixes.get(day)
+        if prefix is None:
+            prefix = (self._midnight + timedelta(days=day)).strftime("%Y-%m-%d ")
+            self._day_prefixes[day] = prefix
+        seconds, microseconds = divmod(rest, 1_000_000)
+        minutes, seconds = divmod(seconds, 60)
+        hours, minutes = divmod(minutes, 60)
+        return f"{prefix}{hours:02d}:{minutes:02d}:{seconds:02d}.{microseconds:06d}"
+
+
+class CaseAttributeStore:
+    """
+    The case attributes that the reporters keep per case_id, limited to the attribute names from the config.
+    By default the attribute dictionary of the case token is kept as is. With compact=True only a tuple of the
+    configured values is kept per case, with the (interned) attribute names shared by all cases, which takes a
+    few dozen bytes per case instead of a full dictionary.
+
+    :param names: The attribute names, in column order.
+    :param compact: Store a tuple of values per case instead of the attribute dictionary (default: False).
+    """
+    __slots__ = ("names", "compact", "_cases", "_empty")
+
+    def __init__(self, names, compact=False):
+        self.names = tuple(sys.intern(name) for name in names)
+        self.compact = compact
+        self._cases = {}
+        self._empty = (None,) * len(self.names)
+
+    def __setitem__(self, case_id, attributes):
+        if self.compact:
+            self._cases[case_id] = tuple([attributes.get(name) for name in self.names])
+        else:
+            self._cases[case_id] = attributes
+
+    def __getitem__(self, case_id):
+        """The attributes of a case as a dictionary."""
+        attributes = self._cases[case_id]
+        return dict(zip(self.names, attributes)) if self.compact else attributes
+
+    def __contains__(self, case_id):
+        return case_id in self._cases
+
+    def __len__(self):
+        return len(self._cases)
+
+    def __iter__(self):
+        return iter(self._cases)
+
+    def values_of(self, case_id):
+        """The attribute values of a case as a tuple in column order; all None for unknown cases."""
+        attributes = self._cases.get(case_id)
+        if attributes is None:
+            return self._empty
+        if self.compact:
+            return attributes
+        return tuple([attributes.get(name) for name in self.names])
+
+    def pop(self, case_id):
+        """Forget a case."""
+        self._cases.pop(case_id, None)
+
+
+class CaseEventReporter(Reporter):
+    """
+    Base class for reporters that turn simulation events into event log rows with case attributes.
+    It classifies the events (start event, task start/complete, intermediate and end events), keeps track of task
+    start times and case attributes, and passes each completed row to log_sim_event, which subclasses implement.
 
-    :param filename: The name of the file to store the event log.
     :param config: A dictionary containing configuration, including optional 'case_attributes'.
     :param sim_problem: The SimProblem instance to access simulation state.
     :param timeunit: The TimeUnit of simulation time (default: MINUTES).
     :param initial_time: A datetime value for the simulation start (default: 2020-01-01).
     :param time_format: A datetime formatting string (default: "%Y-%m-%d %H:%M:%S.%f").
-    :param separator: The separator to use in the log (default: ",").
+    :param evict_on_end: Forget the attributes of a case once its end event is logged (default: True).
+    :param compact_attributes: Keep only a tuple of the configured attribute values per case, see CaseAttributeStore (default: False).
+    :param warmup_time: Events that start before this simulation time are not logged (default: 0, log everything).
     """
-    def __init__(self, filename, config=None, sim_problem=None, timeunit=TimeUnit.MINUTES, 
-                 initial_time=datetime(2020, 1, 1), time_format="%Y-%m-%d %H:%M:%S.%f", separator=","):
-        # Initialize basic attributes
+    def __init__(self, config=None, sim_problem=None, timeunit=TimeUnit.MINUTES,
+                 initial_time=datetime(2020, 1, 1), time_format=DEFAULT_TIME_FORMAT,
+                 evict_on_end=True, compact_attributes=False, warmup_time=0):
         self.task_start_times = {}  # Store task start times
+        self.warmup_time = warmup_time
         self.timeunit = timeunit
         self.initial_time = initial_time
         self.time_format = time_format
-        self.sep = separator
-        self.logfile = open(filename, "wt")
+        self.time_encoder = TimestampEncoder(timeunit, initial_time, time_format)
+        self.format_time = self.time_encoder.format
         self.sim_problem = sim_problem  # Access to simulation state
-        self.case_attributes = {}  # Store attributes per case_id from simulation
 
         # Handle case attributes from config
         self.case_attributes_config = config.get("case_attributes", {}) if config else {}
         self.attribute_names = list(self.case_attributes_config.keys())
-
-        # Write the CSV header with base columns plus attribute names
-        base_columns = ["case_id", "task", "resource", "start_time", "completion_time"]
-        header = base_columns + self.attribute_names
-        self.logfile.write(self.sep.join(header) + "\n")
+        self.case_attributes = CaseAttributeStore(self.attribute_names, compact=compact_attributes)  # Store attributes per case_id from simulation
+        self.evict_on_end = evict_on_end
 
     def displace(self, time):
         """Convert simulation time to a datetime based on the time unit."""
-        if self.timeunit == TimeUnit.MINUTES:
-            return self.initial_time + timedelta(minutes=time)
-        elif self.timeunit == TimeUnit.SECONDS:
-            return self.initial_time + timedelta(seconds=time)
-        elif self.timeunit == TimeUnit.HOURS:
-            return self.initial_time + timedelta(hours=time)
-        elif self.timeunit == TimeUnit.DAYS:
-            return self.initial_time + timedelta(days=time)
-        return None
+        return self.time_encoder.to_datetime(time)
 
-    def log_event(self, case_id, task, resource, start_time, completion_time, attributes):
-        """Log an event with case attributes from the simulation."""
-        line = [
-            str(case_id),
-            task,
-            str(resource),
-            start_time.strftime(self.time_format),
-            completion_time.strftime(self.time_format)
-        ]
-        # Use the provided attributes
-        for attr_name in self.attribute_names:
-            value = attributes.get(attr_name, "")
-            line.append(str(value))
-        self.logfile.write(self.sep.join(line) + "\n")
-        self.logfile.flush()
+    def log_sim_event(self, case_id, task, resource, start_time, completion_time, values):
+        """
+        Log an event with case attributes; start_time and completion_time are simulation times
+        and values are the attribute values in the order of attribute_names.
+        """
+        raise NotImplementedError
 
     def callback(self, timed_binding):
         """Process simulation events and log them with attributes from tokens."""
@@ -71,39 +185,26 @@ class EnhancedEventLogReporter(Reporter):
             # For start events, binding[0][1].value is the new case_id (string), coming from the timer place.
             case_id = binding[0][1].value  # e.g., "order_placed0"
 
-            # After fire(...), tokens are already produced on the event's outgoing places.
-            attributes = None
-            found = False
-
-            # Search all outgoing places for the newly produced case token
-            for out_place in event.outgoing:
-                # Each place has a .marking of SimToken objects
-                for tok in out_place.marking:
-                    # Case tokens have the shape: (case_id, (attributes, rework_counts))
-                    val = tok.value
-                    if isinstance(val, tuple) and len(val) >= 2 and val[0] == case_id:
-                        # Extract attributes; value[1] is (attributes, rework_counts)
-                        # If your model sometimes has no rework_counts, keep a safe fallback.
-                        try:
-                            attrs = val[1][0]  # expected (attributes, rework_counts)
-                        except Exception:
-                            # fallback if value[1] is already the attributes dict
-                            attrs = val[1]
-
-                        attributes = attrs
-                        self.case_attributes[case_id] = attributes
-                        found = True
-                        break
-                if found:
-                    break
+            # start_case(...) records the case it just created on the problem, which avoids any search
+            last_started_case = getattr(self.sim_problem, "last_started_case", None)
+            if last_started_case is not None and last_started_case[0] == case_id:
+                found, attributes = True, last_started_case[1]
+            else:
+                # After fire(...), the token is on an outgoing place with the current time (unless the behavior
+                # gave it a delay), so first only look at the tokens with that time in places sorted by time.
+                found, attributes = self._find_case_attributes(event, case_id, time)
+                if not found:
+                    found, attributes = self._find_case_attributes(event, case_id)
 
             if not found:
                 # Helpful message that doesn’t assume any specific place name
                 raise ValueError(f"Start-event case token for case_id '{case_id}' not found on any outgoing place of event '{event.get_id()}'")
+            self.case_attributes[case_id] = attributes
 
             # Log the start event (no resource, instantaneous for start)
             event_name = event.get_id()[:event.get_id().index("<")]
-            self.log_event(case_id, event_name, "", self.displace(time), self.displace(time), attributes=attributes)
+            if time >= self.warmup_time:
+                self.log_sim_event(case_id, event_name, "", time, time, self.case_attributes.values_of(case_id))
 
 
         elif event.get_id().endswith("<task:start>"):
@@ -119,19 +220,421 @@ class EnhancedEventLogReporter(Reporter):
             task = event.get_id()[:event.get_id().index("<")]
             resource = busy_token[1]
             if (case_id, task) in self.task_start_times:
-                start_time = self.displace(self.task_start_times[(case_id, task)])
-                completion_time = self.displace(time)
-                attributes = self.case_attributes[case_id]
-                self.log_event(case_id, task, resource, start_time, completion_time, attributes=attributes)
+                start_time = self.task_start_times[(case_id, task)]
+                if start_time >= self.warmup_time:
+                    values = self.case_attributes.values_of(case_id)
+                    self.log_sim_event(case_id, task, resource, start_time, time, values)
                 del self.task_start_times[(case_id, task)]
 
         elif event.get_id().endswith("<intermediate_event>") or event.get_id().endswith("<end_event>"):
             case_token = binding[0][1].value  # (case_id, (attributes, rework_counts))
             case_id = case_token[0]  # e.g., "application_received0"
             event_name = event.get_id()[:event.get_id().index("<")]
-            attributes = self.case_attributes[case_id]
-            self.log_event(case_id, event_name, "", self.displace(time), self.displace(time), attributes=attributes)
+            if time >= self.warmup_time:
+                values = self.case_attributes.values_of(case_id)
+                self.log_sim_event(case_id, event_name, "", time, time, values)
+            if self.evict_on_end and event.get_id().endswith("<end_event>"):
+                # The case is complete, so its attributes are no longer needed
+                self.case_attributes.pop(case_id)
+
+    def get_state(self):
+        """
+        The tasks in progress and the attributes of the cases in progress, e.g. to checkpoint a run. The attributes
+        are copied, as those of a CaseRecord change in place when the run continues.
+        """
+        return {"task_start_times": dict(self.task_start_times),
+                "case_attributes": {case_id: dict(self.case_attributes[case_id].items())
+                                    for case_id in self.case_attributes}}
+
+    def set_state(self, state):
+        """Continues from a state of get_state, so that the cases in progress are logged when they complete."""
+        self.task_start_times = dict(state["task_start_times"])
+        for case_id, attributes in state["case_attributes"].items():
+            self.case_attributes[case_id] = attributes
+
+    def _find_case_attributes(self, event, case_id, time=None):
+        """
+        Search the outgoing places of a start event for the token of the given case.
+        If time is given, places that are sorted by time are only searched for tokens with that time.
+        Returns (found, attributes).
+        """
+        for out_place in event.outgoing:
+            if time is not None and getattr(out_place, "_sorted_by_time", False):
+                candidates = out_place.marking.irange_key(time, time)
+            else:
+                # Each place has a .marking of SimToken objects
+                candidates = out_place.marking
+            for tok in candidates:
+                # Case tokens are CaseRecords, which are their own attributes, or (case_id, (attributes, rework_counts))
+                val = tok.value
+                if val.__class__ is CaseRecord:
+                    if val.id == case_id:
+                        return True, val
+                elif isinstance(val, tuple) and len(val) >= 2 and val[0] == case_id:
+                    # Extract attributes; value[1] is (attributes, rework_counts)
+                    # If your model sometimes has no rework_counts, keep a safe fallback.
+                    try:
+                        return True, val[1][0]  # expected (attributes, rework_counts)
+                    except Exception:
+                        # fallback if value[1] is already the attributes dict
+                        return True, val[1]
+        return False, None
+
+    def close(self):
+        """Finish the log. Subclasses that hold resources override this."""
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+class EnhancedEventLogReporter(CaseEventReporter):
+    """
+    An enhanced event log reporter that logs events with additional case attributes.
+    Attributes are extracted from simulation tokens to match the simulation's case attributes.
+
+    :param filename: The name of the file to store the event log.
+    :param config: A dictionary containing configuration, including optional 'case_attributes'.
+    :param sim_problem: The SimProblem instance to access simulation state.
+    :param timeunit: The TimeUnit of simulation time (default: MINUTES).
+    :param initial_time: A datetime value for the simulation start (default: 2020-01-01).
+    :param time_format: A datetime formatting string (default: "%Y-%m-%d %H:%M:%S.%f").
+    :param separator: The separator to use in the log (default: ",").
+    :param buffer_rows: Number of rows to collect before writing them in one batch (default: None, write and flush every row).
+    :param buffer_bytes: Approximate number of bytes to collect before writing them in one batch (default: None, no byte limit).
+    :param evict_on_end: Forget the attributes of a case once its end event is logged (default: True).
+    :param compact_attributes: Keep only a tuple of the configured attribute values per case (default: False).
+    :param warmup_time: Events that start before this simulation time are not logged (default: 0, log everything).
+
+    When ``buffer_rows`` or ``buffer_bytes`` is set, rows are kept in memory and written in bulk when the buffer is full,
+    when ``flush()`` is called, and on ``close()``. The reporter can be used as a context manager, so the buffer is
+    always written out, even if the simulation raises an exception.
+    """
+    def __init__(self, filename, config=None, sim_problem=None, timeunit=TimeUnit.MINUTES, 
+                 initial_time=datetime(2020, 1, 1), time_format=DEFAULT_TIME_FORMAT, separator=",",
+                 buffer_rows=None, buffer_bytes=None, evict_on_end=True, compact_attributes=False, warmup_time=0):
+        super().__init__(config=config, sim_problem=sim_problem, timeunit=timeunit,
+                         initial_time=initial_time, time_format=time_format,
+                         evict_on_end=evict_on_end, compact_attributes=compact_attributes, warmup_time=warmup_time)
+        self.sep = separator
+        self.logfile = open(filename, "wt")
+
+        # Write buffering: None for both limits keeps the flush-per-row behavior
+        self.buffer_rows = buffer_rows
+        self.buffer_bytes = buffer_bytes
+        self.buffered = buffer_rows is not None or buffer_bytes is not None
+        self._buffer = []  # Pending lines, each ending with a newline
+        self._buffer_size = 0  # Number of characters in the pending lines
+
+        # Write the CSV header with base columns plus attribute names
+        base_columns = ["case_id", "task", "resource", "start_time", "completion_time"]
+        header = base_columns + self.attribute_names
+        self.logfile.write(self.sep.join(header) + "\n")
+
+    def log_event(self, case_id, task, resource, start_time, completion_time, attributes):
+        """Log an event with case attributes from the simulation; start_time and completion_time are datetimes."""
+        values = [attributes.get(attr_name) for attr_name in self.attribute_names]
+        self.write_row(case_id, task, resource, start_time.strftime(self.time_format),
+                       completion_time.strftime(self.time_format), values)
+
+    def log_sim_event(self, case_id, task, resource, start_time, completion_time, values):
+        """Log an event with case attribute values; start_time and completion_time are simulation times."""
+        start = self.format_time(start_time)
+        completion = start if completion_time == start_time else self.format_time(completion_time)
+        self.write_row(case_id, task, resource, start, completion, values)
+
+    def write_row(self, case_id, task, resource, start, completion, values):
+        """Write one row; start and completion are already formatted timestamps, missing values are None."""
+        line = [
+            str(case_id),
+            task,
+            str(resource),
+            start,
+            completion
+        ]
+        # Use the provided attribute values
+        for value in values:
+            line.append("" if value is None else str(value))
+        self.write_line(self.sep.join(line) + "\n")
+
+    def write_line(self, line):
+        """Write a line to the log, either directly or through the write buffer."""
+        if not self.buffered:
+            self.logfile.write(line)
+            self.logfile.flush()
+            return
+        self._buffer.append(line)
+        self._buffer_size += len(line)
+        if ((self.buffer_rows is not None and len(self._buffer) >= self.buffer_rows) or
+                (self.buffer_bytes is not None and self._buffer_size >= self.buffer_bytes)):
+            self.flush()
+
+    def flush(self):
+        """Write all buffered lines to the log file in one batch."""
+        if self._buffer:
+            self.logfile.write("".join(self._buffer))
+            self._buffer = []
+            self._buffer_size = 0
+        self.logfile.flush()
+
+    def close(self):
+        """Write any buffered lines and close the log file."""
+        if self.logfile.closed:
+            return
+        self.flush()
+        self.logfile.close()
+
+
+class ColumnarEventLogReporter(CaseEventReporter):
+    """
+    An event log reporter that writes the enriched event log as typed columns to Parquet or Arrow IPC instead of CSV text.
+    It uses the same event handling as EnhancedEventLogReporter, so the attribute columns come from the same config.
+    Rows are collected in column buffers and written as one row group (Parquet) or record batch (Arrow) every
+    row_group_size rows. case_id, task, resource and string attributes are dictionary-encoded, start_time and
+    completion_time are int64 microsecond timestamps, numerical attributes are float64 and boolean attributes bool.
+    Requires pyarrow.
+
+    :param filename: The name of the file to store the event log.
+    :param config: A dictionary containing configuration, including optional 'case_attributes'.
+    :param sim_problem: The SimProblem instance to access simulation state.
+    :param timeunit: The TimeUnit of simulation time (default: MINUTES).
+    :param initial_time: A datetime value for the simulation start (default: 2020-01-01).
+    :param file_format: "parquet" (default) or "arrow" for an Arrow IPC stream.
+    :param row_group_size: The number of rows per row group or record batch (default: 65536).
+    :param evict_on_end: Forget the attributes of a case once its end event is logged (default: True).
+    :param compact_attributes: Keep only a tuple of the configured attribute values per case (default: False).
+    :param warmup_time: Events that start before this simulation time are not logged (default: 0, log everything).
+    """
+    def __init__(self, filename, config=None, sim_problem=None, timeunit=TimeUnit.MINUTES,
+                 initial_time=datetime(2020, 1, 1), file_format="parquet", row_group_size=65536,
+                 evict_on_end=True, compact_attributes=False, warmup_time=0):
+        if pa is None:
+            raise ImportError("ColumnarEventLogReporter requires pyarrow, install it with 'pip install pyarrow'")
+        if file_format not in ("parquet", "arrow"):
+            raise ValueError(f"Unsupported file_format '{file_format}', expected 'parquet' or 'arrow'")
+        super().__init__(config=config, sim_problem=sim_problem, timeunit=timeunit, initial_time=initial_time,
+                         evict_on_end=evict_on_end, compact_attributes=compact_attributes, warmup_time=warmup_time)
+        if self.time_encoder.unit_microseconds is None:
+            raise ValueError(f"Unsupported time unit '{timeunit}'")
+        self.file_format = file_format
+        self.row_group_size = row_group_size
+
+        # Timestamps are stored as microseconds since 1970-01-01, in UTC if initial_time has a timezone
+        timezone = None
+        epoch_start = initial_time
+        if initial_time.tzinfo is not None:
+            timezone = "UTC"
+            epoch_start = (initial_time - initial_time.utcoffset()).replace(tzinfo=None)
+        self._epoch_offset = (epoch_start - datetime(1970, 1, 1)) // timedelta(microseconds=1)
+
+        self._attribute_kinds = []
+        fields = [
+            pa.field("case_id", pa.dictionary(pa.int32(), pa.string())),
+            pa.field("task", pa.dictionary(pa.int32(), pa.string())),
+            pa.field("resource", pa.dictionary(pa.int32(), pa.string())),
+            pa.field("start_time", pa.timestamp("us", tz=timezone)),
+            pa.field("completion_time", pa.timestamp("us", tz=timezone)),
+        ]
+        for attr_name in self.attribute_names:
+            kind = self.case_attributes_config[attr_name].get("type")
+            if kind == "numerical":
+                fields.append(pa.field(attr_name, pa.float64()))
+            elif kind == "boolean":
+                fields.append(pa.field(attr_name, pa.bool_()))
+            else:
+                kind = "string"
+                fields.append(pa.field(attr_name, pa.dictionary(pa.int32(), pa.string())))
+            self._attribute_kinds.append(kind)
+        self.schema = pa.schema(fields)
+
+        if file_format == "parquet":
+            self._sink = None
+            self._writer = pq.ParquetWriter(filename, self.schema)
+        else:
+            self._sink = pa.OSFile(filename, "wb")
+            self._writer = pa.ipc.new_stream(self._sink, self.schema)
+        self._reset_columns()
+
+    def _reset_columns(self):
+        self._case_ids = []
+        self._tasks = []
+        self._resources = []
+        self._start_times = array("q")
+        self._completion_times = array("q")
+        self._attribute_columns = [array("d") if kind == "numerical" else [] for kind in self._attribute_kinds]
+
+    def log_sim_event(self, case_id, task, resource, start_time, completion_time, values):
+        """Add an event to the column buffers; start_time and completion_time are simulation times."""
+        to_microseconds = self.time_encoder.to_microseconds
+        self._case_ids.append(str(case_id))
+        self._tasks.append(task)
+        self._resources.append(str(resource))
+        self._start_times.append(self._epoch_offset + to_microseconds(start_time))
+        self._completion_times.append(self._epoch_offset + to_microseconds(completion_time))
+        for value, kind, column in zip(values, self._attribute_kinds, self._attribute_columns):
+            if kind == "numerical":
+                column.append(math.nan if value is None else float(value))
+            elif kind == "boolean":
+                column.append(None if value is None else bool(value))
+            else:
+                column.append(None if value is None else str(value))
+        if len(self._case_ids) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered rows as one row group or record batch."""
+        if not self._case_ids:
+            return
+        columns = [
+            pa.array(self._case_ids, type=pa.string()).dictionary_encode(),
+            pa.array(self._tasks, type=pa.string()).dictionary_encode(),
+            pa.array(self._resources, type=pa.string()).dictionary_encode(),
+            pa.array(self._start_times, type=pa.int64()).cast(self.schema.field("start_time").type),
+            pa.array(self._completion_times, type=pa.int64()).cast(self.schema.field("completion_time").type),
+        ]
+        for kind, column in zip(self._attribute_kinds, self._attribute_columns):
+            if kind == "numerical":
+                columns.append(pa.array(column, type=pa.float64(), from_pandas=True))
+            elif kind == "boolean":
+                columns.append(pa.array(column, type=pa.bool_()))
+            else:
+                columns.append(pa.array(column, type=pa.string()).dictionary_encode())
+        self._writer.write_table(pa.Table.from_arrays(columns, schema=self.schema))
+        self._reset_columns()
+
+    def close(self):
+        """Write the remaining rows and close the file."""
+        if self._writer is None:
+            return
+        self.flush()
+        self._writer.close()
+        if self._sink is not None:
+            self._sink.close()
+        self._writer = None
+
+
+class StreamingEventReporter(CaseEventReporter):
+    """
+    An event log reporter that hands completed events to a consumer while the simulation is running,
+    instead of writing them to a file. Events are passed through a bounded queue: when the consumer falls behind
+    and the queue is full, the simulation waits, so memory use does not depend on the length of the run.
+    Events are EventLogRow tuples (case_id, task, resource, start_time, completion_time, attributes) with datetimes.
+
+    Typical use runs the simulation in a background thread and iterates over the events::
+
+        reporter = StreamingEventReporter(config=config, sim_problem=loan_process)
+        for event in reporter.stream(24*60):
+            consume(event)
+
+    or, in asyncio code, ``async for event in reporter.start(24*60): ...``.
+
+    :param config: A dictionary containing configuration, including optional 'case_attributes'.
+    :param sim_problem: The SimProblem instance that is simulated.
+    :param timeunit: The TimeUnit of simulation time (default: MINUTES).
+    :param initial_time: A datetime value for the simulation start (default: 2020-01-01).
+    :param maxsize: The maximum number of events waiting in the queue (default: 1024).
+    :param evict_on_end: Forget the attributes of a case once its end event is logged (default: True).
+    :param compact_attributes: Keep only a tuple of the configured attribute values per case (default: False).
+    :param warmup_time: Events that start before this simulation time are not logged (default: 0, log everything).
+    """
+    _DONE = object()  # Marks the end of the stream in the queue
+
+    class Cancelled(Exception):
+        """Raised inside the simulation when the consumer closed the stream."""
+        pass
+
+    def __init__(self, config=None, sim_problem=None, timeunit=TimeUnit.MINUTES,
+                 initial_time=datetime(2020, 1, 1), maxsize=1024, evict_on_end=True, compact_attributes=False,
+                 warmup_time=0):
+        super().__init__(config=config, sim_problem=sim_problem, timeunit=timeunit, initial_time=initial_time,
+                         evict_on_end=evict_on_end, compact_attributes=compact_attributes, warmup_time=warmup_time)
+        self.queue = queue.Queue(maxsize)
+        self._thread = None
+        self._error = None
+        self._closed = False
+
+    def log_sim_event(self, case_id, task, resource, start_time, completion_time, values):
+        """Put the event on the queue, waiting while the queue is full."""
+        if self._closed:
+            raise StreamingEventReporter.Cancelled()
+        self.queue.put(EventLogRow(case_id, task, resource, self.displace(start_time),
+                                   self.displace(completion_time), dict(zip(self.attribute_names, values))))
+
+    def start(self, duration):
+        """
+        Start simulating the reporter's sim_problem for the given duration in a background thread.
+
+        :param duration: The duration of the simulation.
+        :return: The reporter itself, which can then be iterated over.
+        """
+        if self.sim_problem is None:
+            raise ValueError("StreamingEventReporter needs a sim_problem to start a simulation")
+        if self._thread is not None:
+            raise ValueError("The simulation of this StreamingEventReporter was already started")
+
+        def run():
+            try:
+                self.sim_problem.simulate(duration, self)
+            except StreamingEventReporter.Cancelled:
+                pass
+            except BaseException as e:
+                self._error = e
+            finally:
+                self.queue.put(StreamingEventReporter._DONE)
+
+        self._thread = threading.Thread(target=run, name="simulation", daemon=True)
+        self._thread.start()
+        return self
+
+    def stream(self, duration):
+        """Start the simulation and return an iterator over its events."""
+        return iter(self.start(duration))
+
+    def end(self):
+        """
+        Mark the end of the stream. Only needed when simulate(...) is called directly with this reporter,
+        instead of through start().
+        """
+        self.queue.put(StreamingEventReporter._DONE)
+
+    def _finish(self):
+        if self._thread is not None:
+            self._thread.join()
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def __iter__(self):
+        while True:
+            event = self.queue.get()
+            if event is StreamingEventReporter._DONE:
+                break
+            yield event
+        self._finish()
+
+    async def __aiter__(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            event = await loop.run_in_executor(None, self.queue.get)
+            if event is StreamingEventReporter._DONE:
+                break
+            yield event
+        self._finish()
 
     def close(self):
-        """Close the log file."""
-        self.logfile.close()
\ No newline at end of file
+        """Stop the stream; a running simulation is cancelled at its next event."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None:
+            # Unblock the simulation if it is waiting for space in the queue
+            while self._thread.is_alive():
+                try:
+                    self.queue.get(timeout=0.05)
+                except queue.Empty:
+                    pass
+            self._thread.join()
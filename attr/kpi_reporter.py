@@ -0,0 +1,181 @@
+import math
+
+from simpn.reporters import Reporter
+
+from online_stats import RunningStats, P2Quantile, TimeWeightedStats
+
+
+class KPIReporter(Reporter):
+    """
+    Computes the KPIs of a simulation run while it runs, without writing an event log: the cycle time of the cases,
+    the waiting and service time per task, the busy fraction per resource and the time-weighted length of the queue
+    of every task. Means and variances are kept with Welford's algorithm and quantiles with the P-square algorithm,
+    so the memory per KPI is constant; only the cases and tasks in progress are remembered.
+
+    Optionally, the completed cases and their mean cycle time are also counted per time bucket, e.g. per day.
+
+    With a warmup_time, the KPIs only cover the period after it: cycle times of the cases that complete after it,
+    waiting times of the tasks that start after it, and busy times and queue lengths from then on. The time buckets
+    also cover the warm-up, so that its end can be seen in the series (see experiments/warmup.py).
+
+    :param sim_problem: The SimProblem instance, before the simulation starts. Needed for the utilization per task
+        (from the pool sizes) and for the queue lengths; optional otherwise.
+    :param quantiles: The quantiles of the cycle time to estimate.
+    :param bucket: Width of the time buckets of the series, in simulation time, or None for no series.
+    :param warmup_time: The simulation time from which the KPIs are measured (default: 0).
+    """
+    def __init__(self, sim_problem=None, quantiles=(0.5, 0.9, 0.95), bucket=None, warmup_time=0):
+        self.case_start_times = {}
+        self.task_start_times = {}
+        self.cases_started = 0
+        self.cycle_time = RunningStats()
+        self.cycle_time_quantiles = [P2Quantile(q) for q in quantiles]
+        self.waiting_time = RunningStats()
+        self.task_waiting_time = {}
+        self.task_service_time = {}
+        self.task_busy_time = {}
+        self.resource_busy_time = {}
+        self.bucket = bucket
+        self.buckets = {}  # bucket index -> RunningStats of the cycle times of the cases completed in it
+
+        # A model that continues from a snapshot starts at its clock instead of 0
+        start = sim_problem.clock if sim_problem is not None else 0
+        self.warmup_time = max(start, warmup_time)
+        self.warmed_up = start >= warmup_time
+
+        self.pool_sizes = {}
+        self.queues = {}  # queue place -> TimeWeightedStats of its length
+        if sim_problem is not None:
+            for event in sim_problem.events:
+                if event.get_id().endswith("<task:start>"):
+                    task = event.get_id()[:event.get_id().index("<")]
+                    self.task_waiting_time[task] = RunningStats()
+                    self.task_service_time[task] = RunningStats()
+                    if len(event.incoming) > 1:
+                        self.pool_sizes[task] = len(event.incoming[1].marking)
+                        for token in event.incoming[1].marking:
+                            self.resource_busy_time.setdefault(token.value, 0.0)
+                    queue = event.incoming[0]
+                    self.queues[queue] = TimeWeightedStats(sim_problem.clock, len(queue.marking))
+
+    def callback(self, timed_binding):
+        (binding, time, event) = timed_binding
+        event_id = event.get_id()
+        if not self.warmed_up and time >= self.warmup_time:
+            self.end_warmup()
+        if event_id.endswith("<start_event>"):
+            self.case_start_times[binding[0][1].value] = time
+            if self.warmed_up:
+                self.cases_started += 1
+        elif event_id.endswith("<task:start>"):
+            # The case token carries the time it was put in the task's queue
+            case_token = binding[0][1]
+            task = event_id[:event_id.index("<")]
+            if self.warmed_up:
+                waiting = time - case_token.time
+                self.waiting_time.add(waiting)
+                stats = self.task_waiting_time.get(task)
+                if stats is None:
+                    stats = self.task_waiting_time[task] = RunningStats()
+                stats.add(waiting)
+            # Keyed without the resource: a task that a shift end preempts starts again under the same key, and one
+            # that is handed over completes with another resource (see bottleneck/shifts.py)
+            self.task_start_times[(task, case_token.value[0])] = time
+        elif event_id.endswith("<task:complete>"):
+            task = event_id[:event_id.index("<")]
+            busy = binding[0][1].value
+            start_time = self.task_start_times.pop((task, busy[0][0]), None)
+            if start_time is not None and self.warmed_up:
+                stats = self.task_service_time.get(task)
+                if stats is None:
+                    stats = self.task_service_time[task] = RunningStats()
+                stats.add(time - start_time)
+                # Only the part of a task that started during the warm-up after it ends counts as busy time
+                busy_time = time - max(start_time, self.warmup_time)
+                self.task_busy_time[task] = self.task_busy_time.get(task, 0.0) + busy_time
+                self.resource_busy_time[busy[1]] = self.resource_busy_time.get(busy[1], 0.0) + busy_time
+        elif event_id.endswith("<end_event>"):
+            start_time = self.case_start_times.pop(binding[0][1].value[0], None)
+            if start_time is not None:
+                cycle_time = time - start_time
+                if self.warmed_up:
+                    self.cycle_time.add(cycle_time)
+                    for quantile in self.cycle_time_quantiles:
+                        quantile.add(cycle_time)
+                if self.bucket:
+                    index = int(time // self.bucket)
+                    stats = self.buckets.get(index)
+                    if stats is None:
+                        stats = self.buckets[index] = RunningStats()
+                    stats.add(cycle_time)
+
+        # Only the queues that this event took a case from or put one in can have changed
+        if self.queues:
+            for place, _ in binding:
+                if place in self.queues:
+                    self.queues[place].update(time, len(place.marking))
+            for place in event.outgoing:
+                if place in self.queues:
+                    self.queues[place].update(time, len(place.marking))
+
+    def get_state(self):
+        """The start times of the cases and tasks in progress, e.g. to checkpoint a run."""
+        return {"case_start_times": dict(self.case_start_times), "task_start_times": dict(self.task_start_times)}
+
+    def set_state(self, state):
+        """
+        Continues from a state of get_state, so that the cases and tasks in progress are measured when they complete.
+        The KPIs themselves start from scratch.
+        """
+        self.case_start_times = dict(state["case_start_times"])
+        self.task_start_times = dict(state["task_start_times"])
+
+    def end_warmup(self):
+        """Starts measuring the queue lengths at the end of the warm-up; called at the first event after it."""
+        for stats in self.queues.values():
+            stats.restart(self.warmup_time)
+        self.warmed_up = True
+
+    def kpis(self, duration):
+        """
+        Returns the KPIs of a run that was simulated up to time `duration` (the duration passed to simulate), measured
+        from the end of the warm-up, as a flat dictionary: cases_started, cases_completed,
+        throughput, mean_cycle_time, std_cycle_time, cycle_time_p<q>, mean_waiting_time, and per task
+        waiting_time_<task>, service_time_<task> and utilization_<task>, per resource busy_fraction_<resource> and
+        per queue queue_length_<place>.
+        """
+        if not self.warmed_up and duration >= self.warmup_time:
+            self.end_warmup()
+        elapsed = duration - self.warmup_time
+        kpis = {
+            "cases_started": self.cases_started,
+            "cases_completed": self.cycle_time.count,
+            "throughput": self.cycle_time.count / elapsed if elapsed > 0 else 0.0,
+            "mean_cycle_time": self.cycle_time.value(),
+            "std_cycle_time": self.cycle_time.std if self.cycle_time.count else math.nan,
+        }
+        for quantile in self.cycle_time_quantiles:
+            kpis[f"cycle_time_p{quantile.p * 100:g}"] = quantile.value()
+        kpis["mean_waiting_time"] = self.waiting_time.value()
+        for task, stats in self.task_waiting_time.items():
+            kpis[f"waiting_time_{task}"] = stats.value()
+        for task, stats in self.task_service_time.items():
+            kpis[f"service_time_{task}"] = stats.value()
+        for task, pool_size in self.pool_sizes.items():
+            capacity = pool_size * elapsed
+            kpis[f"utilization_{task}"] = self.task_busy_time.get(task, 0.0) / capacity if capacity > 0 else math.nan
+        for resource, busy in self.resource_busy_time.items():
+            kpis[f"busy_fraction_{resource}"] = busy / elapsed if elapsed > 0 else math.nan
+        for place, stats in self.queues.items():
+            kpis[f"queue_length_{place.get_id()}"] = stats.mean(duration)
+        return kpis
+
+    def series(self):
+        """Returns (bucket start time, completed cases, mean cycle time) per time bucket, in time order."""
+        return [(index * self.bucket, stats.count, stats.mean) for index, stats in sorted(self.buckets.items())]
+
+    def print_kpis(self, duration):
+        """Prints the KPIs to the console."""
+        print("\nKPIs:\n")
+        for name, value in self.kpis(duration).items():
+            print(f"  {name}: {value:.4f}" if isinstance(value, float) else f"  {name}: {value}")
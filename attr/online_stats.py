@@ -0,0 +1,150 @@
+import math
+from bisect import bisect_right
+
+
+class RunningStats:
+    """
+    Count, mean, variance, minimum and maximum of a stream of values in constant memory (Welford's algorithm).
+    Two RunningStats can be merged, e.g. to combine replications.
+    """
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    @property
+    def variance(self):
+        """Sample variance (0 for fewer than two values)."""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def merge(self, other):
+        """Adds the values summarized by other (Chan et al.'s parallel update)."""
+        if other.count == 0:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self._m2 += other._m2 + delta * delta * self.count * other.count / count
+        self.mean += delta * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def value(self):
+        """The mean, or nan if there are no values."""
+        return self.mean if self.count > 0 else math.nan
+
+
+class P2Quantile:
+    """
+    Estimates the p-quantile of a stream of values in constant memory with the P-square algorithm
+    (Jain and Chlamtac, 1985): five markers track the minimum, p/2, p, (1+p)/2 quantiles and the maximum, and are
+    moved with a piecewise-parabolic fit as values arrive. Exact for the first five values.
+
+    :param p: The quantile, between 0 and 1, e.g. 0.9.
+    """
+    def __init__(self, p):
+        if not 0.0 < p < 1.0:
+            raise ValueError(f"The quantile must be between 0 and 1, got {p}")
+        self.p = p
+        self.count = 0
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x):
+        self.count += 1
+        q = self.heights
+        if self.count <= 5:
+            q.append(x)
+            if self.count == 5:
+                q.sort()
+            return
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = bisect_right(q, x) - 1
+        n = self.positions
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+        for i in (1, 2, 3):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                if not q[i - 1] < height < q[i + 1]:
+                    height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = height
+                n[i] += d
+
+    def value(self):
+        """The estimated quantile, or nan if there are no values."""
+        if self.count == 0:
+            return math.nan
+        if self.count < 5:
+            values = sorted(self.heights)
+            return values[min(len(values) - 1, int(round(self.p * (len(values) - 1))))]
+        return self.heights[2]
+
+
+class TimeWeightedStats:
+    """
+    Time-weighted mean and maximum of a level that changes at discrete times, e.g. the length of a queue.
+
+    :param start: The time at which the measurement starts.
+    :param level: The level at that time.
+    """
+    def __init__(self, start=0.0, level=0):
+        self.start = start
+        self.last_time = start
+        self.level = level
+        self.area = 0.0
+        self.max = level
+
+    def update(self, time, level):
+        """Records that the level changed to `level` at `time`."""
+        self.area += self.level * (time - self.last_time)
+        self.last_time = time
+        self.level = level
+        if level > self.max:
+            self.max = level
+
+    def restart(self, time):
+        """Forgets the history before `time`, e.g. at the end of a warm-up period; the current level is kept."""
+        self.start = time
+        self.last_time = time
+        self.area = 0.0
+        self.max = self.level
+
+    def mean(self, until=None):
+        """The time-weighted mean level from the start up to `until` (default: the last change)."""
+        until = self.last_time if until is None else until
+        elapsed = until - self.start
+        if elapsed <= 0:
+            return float(self.level)
+        return (self.area + self.level * (until - self.last_time)) / elapsed
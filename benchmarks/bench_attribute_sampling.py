@@ -0,0 +1,59 @@
+"""
+Compares drawing case attributes per arrival with random.choices against the batched CaseAttributeSampler.
+
+Run: python benchmarks/bench_attribute_sampling.py [num_cases]
+"""
+import os
+import sys
+from random import choices, uniform
+
+from bench_utils import ROOT, add_repo_paths, load_config, rate, print_rates
+
+add_repo_paths()
+os.chdir(os.path.join(ROOT, "attr"))  # case_attributes reads config.json from the working directory
+from case_attributes import CaseAttributeSampler  # noqa: E402
+
+
+def per_arrival(attribute_config):
+    """The previous implementation: rebuild and validate the distributions for every case."""
+    attributes = {}
+    for attr_name, attr_config in attribute_config.items():
+        dist_config = attr_config["distribution"]
+        if dist_config["type"] == "discrete":
+            values = [item["value"] for item in dist_config["values"]]
+            probabilities = [item["probability"] for item in dist_config["values"]]
+            if not (0.99 <= sum(probabilities) <= 1.01):
+                raise ValueError(attr_name)
+            attributes[attr_name] = choices(values, weights=probabilities, k=1)[0]
+        else:
+            ranges = [item["range"] for item in dist_config["bins"]]
+            probabilities = [item["probability"] for item in dist_config["bins"]]
+            if not (0.99 <= sum(probabilities) <= 1.01):
+                raise ValueError(attr_name)
+            min_val, max_val = choices(ranges, weights=probabilities, k=1)[0]
+            attributes[attr_name] = uniform(min_val, max_val)
+    return attributes
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    attribute_config = load_config("attr")["case_attributes"]
+
+    def per_arrival_path(n):
+        for _ in range(n):
+            per_arrival(attribute_config)
+
+    def sampler_path(n):
+        sample = CaseAttributeSampler(attribute_config, seed=1).sample
+        for _ in range(n):
+            sample()
+
+    results = {
+        "random.choices per arrival": rate(per_arrival_path, n),
+        "CaseAttributeSampler": rate(sampler_path, n),
+    }
+    print_rates(f"Case attribute sampling, {n:,} cases", results, unit="cases/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Reports the peak RSS of the reporter's per-case state over a long run with many cases.
+Every configuration runs in its own process, so the peaks do not influence each other.
+
+Run: python benchmarks/bench_case_attribute_memory.py [num_cases]
+"""
+import os
+import resource
+import subprocess
+import sys
+from datetime import datetime
+
+from bench_utils import add_repo_paths, load_config
+
+CONFIGURATIONS = {
+    "keep all cases (before)": dict(evict_on_end=False, compact_attributes=False),
+    "keep all cases, compact": dict(evict_on_end=False, compact_attributes=True),
+    "evict on end": dict(evict_on_end=True, compact_attributes=False),
+    "evict on end, compact": dict(evict_on_end=True, compact_attributes=True),
+}
+
+
+class Event:
+    def __init__(self, event_id):
+        self._id = event_id
+        self.outgoing = []
+
+    def get_id(self):
+        return self._id
+
+
+class Problem:
+    last_started_case = None
+
+
+def run(name, num_cases):
+    add_repo_paths()
+    from custom_reporters import EnhancedEventLogReporter
+    from simpn.simulator import SimToken
+
+    problem = Problem()
+    reporter = EnhancedEventLogReporter(os.devnull, config=load_config("attr"), sim_problem=problem,
+                                        buffer_rows=10000, **CONFIGURATIONS[name])
+    start, end = Event("arrival<start_event>"), Event("done<end_event>")
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    for i in range(num_cases):
+        case_id = f"arrival{i}"
+        attributes = {"requestedAmount": 1000.0 + i, "loanType": "personal", "isUrgent": i % 10 == 0,
+                      "start_time": datetime(2020, 1, 1)}
+        problem.last_started_case = (case_id, attributes)
+        reporter.callback(([(None, SimToken(case_id))], i, start))
+        reporter.callback(([(None, SimToken((case_id, (attributes, {}))))], i + 30, end))
+    reporter.close()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux
+    print(f"{peak / 1024:.1f} {(peak - baseline) * 1024 / num_cases:.1f} {len(reporter.case_attributes)}")
+
+
+def main():
+    num_cases = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"Reporter per-case state, {num_cases:,} cases")
+    print(f"  {'configuration':<28}{'peak RSS':>12}{'growth/case':>14}{'cases kept':>12}")
+    for name in CONFIGURATIONS:
+        output = subprocess.run([sys.executable, __file__, "--run", name, str(num_cases)],
+                                capture_output=True, text=True, check=True).stdout.split()
+        peak, per_case, kept = float(output[0]), float(output[1]), int(output[2])
+        print(f"  {name:<28}{peak:>9.1f} MB{per_case:>11.1f} B{kept:>12,}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--run":
+        run(sys.argv[2], int(sys.argv[3]))
+    else:
+        main()
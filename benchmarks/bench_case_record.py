@@ -0,0 +1,88 @@
+"""
+Compares tuple case tokens (case_id, (attributes, rework_counts)) with CaseRecord tokens in a model with a rework
+loop: the memory blocks that the complete and rework decision behaviors allocate per event (all results are kept,
+so every allocation that belongs to a token value is counted), and the run time and peak memory of a simulation.
+
+Run: python benchmarks/bench_case_record.py [days]
+"""
+import sys
+import time
+import tracemalloc
+
+from bench_utils import add_repo_paths
+
+add_repo_paths()
+from simpn.simulator import SimProblem, SimToken  # noqa: E402
+from simpn.prototypes import BPMNStartEvent, BPMNTask, BPMNEndEvent  # noqa: E402
+from case_record import CaseRecord, case_table  # noqa: E402
+from rework import setup_rework  # noqa: E402
+from rng import get_rng  # noqa: E402
+
+CONFIG = {"rework": [{"activity": "check", "max_iteration": 3, "probability": 0.3,
+                      "condition": "loanType == 'personal'"}]}
+
+
+def build_model(records, seed=1):
+    model = SimProblem()
+    rng = get_rng(model, seed)
+    waiting, done = model.add_var("waiting"), model.add_var("done")
+    staff = model.add_var("staff")
+    for i in range(3):
+        staff.put(f"employee{i}")
+
+    def start(case_id):
+        attributes = {"loanType": rng.choice(["personal", "auto", "mortgage"]),
+                      "requestedAmount": rng.uniform(1000, 100000), "isUrgent": rng.uniform(0, 1) < 0.2}
+        if records:
+            return SimToken(CaseRecord(case_id, case_table(model), attributes))
+        return SimToken((case_id, (attributes, {})))
+
+    BPMNStartEvent(model, [], [waiting], "arrive", lambda: rng.expovariate(1 / 10), behavior=start)
+    BPMNTask(model, [waiting, staff], [done, staff], "check",
+             lambda c, r: [SimToken((c, r), delay=rng.expovariate(1 / 20))])
+    BPMNEndEvent(model, [done], [], "end")
+    setup_rework(model, CONFIG)
+    return model
+
+
+def blocks_per_event(records, n=20000):
+    """Memory blocks allocated by one complete plus one rework decision, with the resulting tokens kept."""
+    model = build_model(records)
+    complete = model.id2node["check<task:complete>"].behavior
+    decide = model.id2node["rework_decision_event_check"].behavior
+    attributes = {"loanType": "personal", "requestedAmount": 5000.0, "isUrgent": False}
+    cases = [CaseRecord(f"case{i}", case_table(model), attributes) if records else (f"case{i}", (attributes, {}))
+             for i in range(n)]
+    kept = []
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for case in cases:
+        case = complete((case, "employee0"))[0].value
+        tokens = decide(case)
+        kept.append(tokens)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+    return blocks / (2 * n)
+
+
+def main():
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    print("Memory blocks allocated per complete / rework decision event:")
+    for label, records in [("tuple tokens", False), ("CaseRecord", True)]:
+        print(f"  {label:<13} {blocks_per_event(records):5.2f}")
+
+    print(f"\nSimulating {days} days:")
+    for label, records in [("tuple tokens", False), ("CaseRecord", True)]:
+        model = build_model(records)
+        tracemalloc.start()
+        start = time.perf_counter()
+        model.simulate(days * 24 * 60)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"  {label:<13} {elapsed:6.2f} s (traced), peak {peak / 1e6:6.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
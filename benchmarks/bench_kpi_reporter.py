@@ -0,0 +1,79 @@
+"""
+Compares two ways to get the KPIs of a run: writing the event log with EnhancedEventLogReporter and computing the
+mean cycle time and service times from the CSV afterwards, versus computing them online with KPIReporter.
+Reports the wall time, the peak Python memory (tracemalloc) and the size of the event log.
+
+Run: python benchmarks/bench_kpi_reporter.py [days]
+"""
+import csv
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from bench_utils import ROOT, add_repo_paths, load_config
+
+add_repo_paths()
+sys.path.insert(0, os.path.join(ROOT, "templates"))
+os.chdir(os.path.join(ROOT, "rework"))  # case_attributes reads config.json from the working directory
+from custom_reporters import EnhancedEventLogReporter  # noqa: E402
+from kpi_reporter import KPIReporter  # noqa: E402
+from sequence import build_model  # noqa: E402
+
+
+def kpis_from_log(filename):
+    parse = lambda text: datetime.strptime(text, "%Y-%m-%d %H:%M:%S.%f")  # noqa: E731
+    first_event, cycle_times, service = {}, [], {}
+    with open(filename) as f:
+        for row in csv.DictReader(f):
+            start, completion = parse(row["start_time"]), parse(row["completion_time"])
+            first_event.setdefault(row["case_id"], start)
+            if row["resource"]:
+                service.setdefault(row["task"], []).append((completion - start).total_seconds() / 60)
+            elif row["task"] == "application_approved":
+                cycle_times.append((completion - first_event.pop(row["case_id"])).total_seconds() / 60)
+    kpis = {"mean_cycle_time": sum(cycle_times) / len(cycle_times)}
+    for task, times in service.items():
+        kpis[f"service_time_{task}"] = sum(times) / len(times)
+    return kpis
+
+
+def measure(label, run):
+    tracemalloc.start()
+    start = time.perf_counter()
+    kpis, log_size = run()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"  {label:<28} {elapsed:6.2f} s, peak {peak / 1e6:7.1f} MB, event log {log_size / 1e6:6.1f} MB, "
+          f"mean cycle time {kpis['mean_cycle_time']:.2f}")
+
+
+def main():
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    duration = days * 24 * 60
+    config = load_config("rework")
+    print(f"Sequence template, {days} days:")
+
+    def with_event_log():
+        with tempfile.TemporaryDirectory() as folder:
+            filename = os.path.join(folder, "log.csv")
+            model = build_model(config, seed=1)
+            with EnhancedEventLogReporter(filename, config=config, sim_problem=model) as reporter:
+                model.simulate(duration, reporter)
+            return kpis_from_log(filename), os.path.getsize(filename)
+
+    def with_kpi_reporter():
+        model = build_model(config, seed=1)
+        reporter = KPIReporter(model)
+        model.simulate(duration, reporter)
+        return reporter.kpis(duration), 0
+
+    measure("event log + post-processing", with_event_log)
+    measure("KPIReporter", with_kpi_reporter)
+
+
+if __name__ == "__main__":
+    main()
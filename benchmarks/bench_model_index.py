@@ -0,0 +1,119 @@
+"""
+Times wiring rework, long rework, task constraints and static bottlenecks into generated sequence models of up to 10k
+tasks: the lookups the setup functions do, with the previous linear scans over all prototypes and events versus the
+shared ModelIndex, and the total time to build and wire a model with setup_rework, setup_long_rework,
+apply_task_constraints and adjust_bottlenecks. (Building the model itself is quadratic in SimPN, which checks every
+new prototype against the list of all places and events.)
+
+Run: python benchmarks/bench_model_index.py [largest number of tasks]
+"""
+import contextlib
+import io
+import sys
+import time
+
+from bench_utils import add_repo_paths
+
+add_repo_paths()
+from simpn.simulator import SimProblem, SimToken  # noqa: E402
+from simpn.prototypes import BPMNStartEvent, BPMNTask, BPMNEndEvent  # noqa: E402
+from model_index import ModelIndex  # noqa: E402
+from rework import setup_rework, setup_long_rework  # noqa: E402
+from task_constraints import apply_task_constraints  # noqa: E402
+from bottleneck_manager import adjust_bottlenecks  # noqa: E402
+from case_record import CaseRecord, case_table  # noqa: E402
+from rng import get_rng  # noqa: E402
+
+
+def build_model(num_tasks):
+    model = SimProblem()
+    rng = get_rng(model, 1)
+    places = [model.add_var(f"p{i}") for i in range(num_tasks + 1)]
+    BPMNStartEvent(model, [], [places[0]], "arrival", lambda: rng.expovariate(1 / 10),
+                   behavior=lambda case_id: SimToken(CaseRecord(case_id, case_table(model))))
+    for i in range(num_tasks):
+        resources = model.add_var(f"resources{i}")
+        resources.put(f"r{i}")
+        BPMNTask(model, [places[i], resources], [places[i + 1], resources], f"task{i}",
+                 lambda c, r: [SimToken((c, r), delay=rng.expovariate(1 / 8))])
+    BPMNEndEvent(model, [places[-1]], [], "done")
+    return model
+
+
+def wiring_config(num_tasks):
+    """Rework on every task, long rework and a task constraint on every 10th task, a bottleneck on every 100th."""
+    return {
+        "rework": [{"activity": f"task{i}", "max_iteration": 1, "probability": 0.1} for i in range(num_tasks)],
+        "long_rework": [{"trigger_activity": f"task{i}", "back_to": f"task{i - 1}", "max_iteration": 1,
+                         "probability": 0.1} for i in range(10, num_tasks, 10)],
+        "task_constraints": {f"task{i}": {"type": "working_hours", "hours": ["09:00", "17:00"]}
+                             for i in range(5, num_tasks, 10)},
+        "bottlenecks": {"type": "resource_shortage", "where": [f"task{i}" for i in range(0, num_tasks, 100)]},
+    }
+
+
+def scan_lookups(model, config):
+    """The lookups of the setup functions, with the previous scans over all prototypes and events."""
+    for rework in config["rework"]:
+        next((p for p in model.prototypes if p.get_id() == rework["activity"]), None)
+    for rework in config["long_rework"]:
+        trigger = next((p for p in model.prototypes if p.get_id() == rework["trigger_activity"]), None)
+        back_to = next((p for p in model.prototypes if p.get_id() == rework["back_to"]), None)
+        [e for e in model.events if back_to.outgoing[0] in e.incoming and trigger.incoming[0] in e.outgoing]
+    for task in config["task_constraints"]:
+        next(p for p in model.prototypes if p.name == task and isinstance(p, BPMNTask))
+    [e for e in model.events if e.get_id().endswith("<start_event>")]
+    for task in config["bottlenecks"]["where"]:
+        [e for e in model.events if e.get_id() == task + "<task:start>"]
+
+
+def index_lookups(model, config):
+    """The same lookups with a ModelIndex, including building the index."""
+    index = ModelIndex(model)
+    for rework in config["rework"]:
+        index.prototype(rework["activity"])
+    for rework in config["long_rework"]:
+        trigger = index.prototype(rework["trigger_activity"])
+        back_to = index.prototype(rework["back_to"])
+        [e for e in index.consumers_of(back_to.outgoing[0]) if trigger.incoming[0] in e.outgoing]
+    for task in config["task_constraints"]:
+        index.prototype(task)
+    index.process_start_events()
+    for task in config["bottlenecks"]["where"]:
+        index.task_start(task)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def wire(model, config):
+    with contextlib.redirect_stdout(io.StringIO()):
+        setup_rework(model, config)
+        setup_long_rework(model, config)
+        apply_task_constraints(model, config)
+        adjust_bottlenecks(model, config)
+
+
+def main():
+    largest = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    sizes = [n for n in [1000, 2500, 5000, 10000] if n < largest] + [largest]
+    print("Lookups of the setup functions:")
+    print(f"  {'tasks':>6} {'scans':>9} {'index':>9}")
+    for n in sizes:
+        model, config = build_model(n), wiring_config(n)
+        print(f"  {n:>6} {timed(scan_lookups, model, config):8.3f}s "
+              f"{timed(index_lookups, model, config):8.3f}s")
+
+    print("\nBuilding a model with the simulator, and wiring the extensions into it:")
+    for n in sizes:
+        start = time.perf_counter()
+        model = build_model(n)
+        built = time.perf_counter() - start
+        print(f"  {n:>6} tasks: build {built:6.2f} s, wire {timed(wire, model, wiring_config(n)):6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Compares a parallel join with guard c1 == c2 against add_parallel_join when one branch is much slower than the other,
+so thousands of finished tokens of the fast branch wait for their partner.
+
+Run: python benchmarks/bench_parallel_join.py [duration]
+"""
+import random
+import sys
+import time
+
+from bench_utils import add_repo_paths
+
+add_repo_paths()
+from simpn.simulator import SimProblem, SimToken  # noqa: E402
+from gateways import add_parallel_join  # noqa: E402
+
+
+def build_model(indexed_join):
+    model = SimProblem()
+    arrivals = model.add_var("arrivals")
+    fast_queue, slow_queue = model.add_var("fast_queue"), model.add_var("slow_queue")
+    fast_done, slow_done = model.add_var("fast_done"), model.add_var("slow_done")
+    joined = model.add_var("joined")
+    arrivals.put(0)
+
+    model.add_event([arrivals], [arrivals, fast_queue, slow_queue],
+                    lambda i: [SimToken(i + 1, delay=random.expovariate(1)), SimToken((i, ({}, {}))),
+                               SimToken((i, ({}, {})))],
+                    name="arrive")
+    model.add_event([fast_queue], [fast_done], lambda c: [SimToken(c, delay=random.expovariate(1 / 5))], name="fast")
+    # The slow branch takes up to 2000 time units and finishes cases in a different order than they arrived
+    model.add_event([slow_queue], [slow_done], lambda c: [SimToken(c, delay=random.uniform(0, 2000))], name="slow")
+    if indexed_join:
+        add_parallel_join(model, [fast_done, slow_done], [joined], "join")
+    else:
+        model.add_event([fast_done, slow_done], [joined], lambda c1, c2: [SimToken(c1)], name="join",
+                        guard=lambda c1, c2: c1 == c2)
+    model.add_event([joined], [], lambda c: [], name="done")
+    return model
+
+
+class Counter:
+    def __init__(self):
+        self.events = 0
+
+    def callback(self, timed_binding):
+        self.events += 1
+
+
+def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 1500
+    print(f"Parallel join, one arrival per time unit, slow branch up to 2000 time units, duration {duration:,.0f}")
+    for label, indexed_join in [("guard c1 == c2", False), ("add_parallel_join", True)]:
+        random.seed(1)
+        model = build_model(indexed_join)
+        counter = Counter()
+        start = time.perf_counter()
+        model.simulate(duration, counter)
+        elapsed = time.perf_counter() - start
+        print(f"  {label:<20} {counter.events / elapsed:>12,.0f} events/sec  ({elapsed:.2f} s, {counter.events:,} events)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Measures how run_replications scales with the number of worker processes, using the sequence template.
+
+Run: python benchmarks/bench_replications.py [num_replications] [duration]
+"""
+import os
+import sys
+import time
+
+from bench_utils import ROOT, add_repo_paths, load_config
+
+add_repo_paths()
+sys.path.insert(0, os.path.join(ROOT, "templates"))
+os.chdir(os.path.join(ROOT, "rework"))  # case_attributes reads config.json from the working directory
+from replications import run_replications  # noqa: E402
+from sequence import build_model  # noqa: E402
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    num_replications = int(sys.argv[1]) if len(sys.argv) > 1 else 2 * cpus
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 24 * 60 * 30
+    config = load_config("rework")
+    workers = sorted({1, max(1, cpus // 4), max(1, cpus // 2), cpus})
+
+    print(f"{num_replications} replications of the sequence template, {duration:,.0f} minutes each, {cpus} CPUs")
+    baseline = None
+    for max_workers in workers:
+        start = time.perf_counter()
+        run_replications(build_model, config, num_replications, duration, seed=1, max_workers=max_workers)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"  {max_workers:>3} workers {elapsed:>8.2f} s  speedup {baseline / elapsed:5.2f}x"
+              f"  (efficiency {baseline / elapsed / max_workers:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Compares the write throughput of EnhancedEventLogReporter with flush-per-row against buffered writing.
+
+Run: python benchmarks/bench_reporter_buffering.py [num_events]
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+from bench_utils import add_repo_paths, load_config, rate, print_rates
+
+add_repo_paths()
+from custom_reporters import EnhancedEventLogReporter  # noqa: E402
+
+
+def make_writer(config, **kwargs):
+    def write(n):
+        fd, path = tempfile.mkstemp(suffix=".csv")
+        os.close(fd)
+        attributes = {"requestedAmount": 25000.0, "loanType": "personal", "isUrgent": False}
+        start, end = datetime(2020, 1, 1, 9), datetime(2020, 1, 1, 10)
+        with EnhancedEventLogReporter(path, config=config, **kwargs) as reporter:
+            for i in range(n):
+                reporter.log_event(i, "review_application", "officer1", start, end, attributes)
+        os.remove(path)
+    return write
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    config = load_config("attr")
+    results = {
+        "flush per row": rate(make_writer(config), n),
+        "buffer_rows=1000": rate(make_writer(config, buffer_rows=1000), n),
+        "buffer_rows=10000": rate(make_writer(config, buffer_rows=10000), n),
+        "buffer_bytes=1MiB": rate(make_writer(config, buffer_bytes=1 << 20), n),
+    }
+    print_rates(f"EnhancedEventLogReporter.log_event, {n:,} rows", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Compares the previous time-based bottlenecks (capacity changes as tuples in one shared schedule place, matched by
+guarded events of every task) against the ResourceCalendar, for a model with many tasks and holiday periods.
+
+Run: python benchmarks/bench_resource_calendar.py [tasks] [periods per task]
+"""
+import random
+import sys
+import time
+
+from bench_utils import add_repo_paths
+
+add_repo_paths()
+from simpn.simulator import SimProblem, SimToken  # noqa: E402
+from simpn.prototypes import BPMNStartEvent, BPMNTask, BPMNEndEvent  # noqa: E402
+from resource_calendar import ResourceCalendar  # noqa: E402
+
+DAY = 24 * 60
+
+
+def legacy_schedule(model, pools, num_periods):
+    # The reduce/restore-by-number part of the previous adjust_bottlenecks
+    schedule = model.add_var("schedule")
+    for task, pool in pools.items():
+        removed = model.add_var(f"removed_resources_{task}")
+        remove_signal, restore_signal = model.add_var(f"remove_signal_{task}"), model.add_var(f"restore_signal_{task}")
+        for p in range(num_periods):
+            schedule.put(("reduce_resources", task, 1), time=(7 * p + 2) * DAY)
+            schedule.put(("restore_resources", task, 1), time=(7 * p + 4) * DAY)
+
+        def signal(action, task):
+            def guard(value):
+                return isinstance(value, tuple) and len(value) == 3 and value[0] == action and value[1] == task
+            return guard
+        model.add_event([schedule], [remove_signal], lambda v: [SimToken(v[2])],
+                        guard=signal("reduce_resources", task), name=f"start_reduce_{task}")
+        model.add_event([remove_signal, pool], [remove_signal, removed],
+                        lambda n, r: [SimToken(n - 1) if n > 1 else None, SimToken(r)],
+                        guard=lambda n, r: n > 0, name=f"remove_resource_{task}")
+        model.add_event([schedule], [restore_signal], lambda v: [SimToken(v[2])],
+                        guard=signal("restore_resources", task), name=f"start_restore_{task}")
+        model.add_event([restore_signal, removed], [restore_signal, pool],
+                        lambda n, r: [SimToken(n - 1) if n > 1 else None, SimToken(r)],
+                        guard=lambda n, r: n > 0, name=f"restore_resource_{task}")
+
+
+def build_model(num_tasks, num_periods, calendar):
+    model = SimProblem()
+    places = [model.add_var(f"q{i}") for i in range(num_tasks + 1)]
+    pools = {}
+    BPMNStartEvent(model, [], [places[0]], "arrive", lambda: random.expovariate(1 / 30))
+    for i in range(num_tasks):
+        pool = model.add_var(f"pool{i}")
+        pool.put(f"r{i}_1")
+        pool.put(f"r{i}_2")
+        pools[f"t{i}"] = pool
+        BPMNTask(model, [places[i], pool], [places[i + 1], pool], f"t{i}",
+                 lambda c, r: [SimToken((c, r), delay=random.expovariate(1 / 10))])
+    BPMNEndEvent(model, [places[-1]], [], "done")
+    if calendar:
+        resource_calendar = ResourceCalendar(model)
+        for pool in pools.values():
+            for p in range(num_periods):
+                resource_calendar.add_period(pool, {"start_date": f"2020-01-{1 + 7 * p + 2:02d}",
+                                                    "end_date": f"2020-01-{1 + 7 * p + 4:02d}",
+                                                    "resources_to_remove": 1})
+    else:
+        legacy_schedule(model, pools, num_periods)
+    return model
+
+
+def main():
+    num_tasks = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    num_periods = int(sys.argv[2]) if len(sys.argv) > 2 else 4  # within January
+    duration = 28 * DAY
+    print(f"{num_tasks} tasks, {num_periods} periods per task, {duration / DAY:.0f} days")
+    for label, calendar in [("schedule place + guards", False), ("ResourceCalendar", True)]:
+        random.seed(1)
+        model = build_model(num_tasks, num_periods, calendar)
+        steps = []
+        start = time.perf_counter()
+        model.simulate(duration, type("Counter", (), {"callback": lambda self, b: steps.append(1)})())
+        elapsed = time.perf_counter() - start
+        print(f"  {label:<24} {len(model.events):>4} events  {len(steps) / elapsed:>10,.0f} steps/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Compares the resource-constraint guard that evals every condition per binding with the decision-table guard.
+Like the simulator, every case is tried with each free resource in turn.
+
+Run: python benchmarks/bench_resource_guard.py [num_bindings]
+"""
+import random
+import sys
+
+from bench_utils import add_repo_paths, load_config, rate, print_rates
+
+add_repo_paths()
+from resource_constraints import create_guard  # noqa: E402
+
+RESOURCES = ["s1", "s2", "s3", "s4", "s5"]
+
+
+def eval_guard(task_constraints):
+    """The previous guard: eval every condition for every (case, resource) binding."""
+    def guard(c, r):
+        attributes = c[1][0]
+        for condition in task_constraints['conditions']:
+            if eval(condition['condition'], {}, attributes):
+                return r in condition['resources']
+        return True
+    return guard
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    config = load_config("bottleneck")
+    task_constraints = config["resource_constraints"][0]
+    cases = [(f"case{i}", ({"loanType": random.choice(["personal", "mortgage", "auto"]),
+                            "requestedAmount": random.uniform(1000, 100000)}, {}))
+             for i in range(n // len(RESOURCES))]
+
+    def run(guard):
+        def bindings(n):
+            for c in cases:
+                for r in RESOURCES:
+                    guard(c, r)
+        return bindings
+
+    results = {
+        "eval per binding": rate(run(eval_guard(task_constraints)), len(cases) * len(RESOURCES)),
+        "decision table + case cache": rate(run(create_guard(task_constraints["task"], config)),
+                                            len(cases) * len(RESOURCES)),
+    }
+    print_rates(f"Resource guard, {len(cases):,} cases x {len(RESOURCES)} resources", results, unit="bindings/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Times sizing a model with many tasks: the previous estimators (1000 behavior calls per task) against
+calculate_optimal_resources with the analytic / early-stopping estimators.
+
+Run: python benchmarks/bench_resource_sizing.py [num_tasks]
+"""
+import contextlib
+import io
+import math
+import sys
+import time
+from random import expovariate as exp, uniform
+
+from bench_utils import add_repo_paths
+
+add_repo_paths()
+from simpn.simulator import SimProblem, SimToken  # noqa: E402
+from simpn.prototypes import BPMNStartEvent, BPMNTask, BPMNEndEvent  # noqa: E402
+from resource_calculator import calculate_optimal_resources, clear_estimates  # noqa: E402
+
+
+def build_model(num_tasks):
+    model = SimProblem()
+    places = [model.add_var(f"p{i}") for i in range(num_tasks + 1)]
+    BPMNStartEvent(model, [], [places[0]], "arrival", lambda: exp(1 / 10))
+    for i in range(num_tasks):
+        resources = model.add_var(f"resources{i}")
+        resources.put(f"r{i}")
+        if i % 2 == 0:
+            behavior = lambda c, r: [SimToken((c, r), delay=exp(1 / 8))]
+        else:
+            behavior = lambda c, r: [SimToken((c, r), delay=uniform(2, 12))]
+        BPMNTask(model, [places[i], resources], [places[i + 1], resources], f"task{i}", behavior)
+    BPMNEndEvent(model, [places[-1]], [], "done")
+    return model
+
+
+def previous_sizing(model, num_samples=1000):
+    """The previous estimators: call every behavior num_samples times and average the delays."""
+    start_event = next(e for e in model.events if e.get_id().endswith("<start_event>"))
+    total = sum(float(start_event.behavior("arrival0")[0].delay) for _ in range(num_samples))
+    arrival_rate = num_samples / total
+    needs = {}
+    for event in model.events:
+        if event.get_id().endswith("<task:start>"):
+            mean = sum(float(event.behavior("case", "resource")[0].delay) for _ in range(num_samples)) / num_samples
+            needs[event.get_id()] = max(1, math.ceil(arrival_rate * mean))
+    return needs
+
+
+def timed(func):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        func()
+    return time.perf_counter() - start
+
+
+def main():
+    num_tasks = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    model = build_model(num_tasks)
+    clear_estimates()
+    results = {
+        "previous estimators": timed(lambda: previous_sizing(model)),
+        "calculate_optimal_resources": timed(lambda: calculate_optimal_resources(model, "unused.json")),
+        "  again (cached estimates)": timed(lambda: calculate_optimal_resources(model, "unused.json")),
+    }
+    print(f"Resource sizing, model with {num_tasks} tasks")
+    for name, seconds in results.items():
+        print(f"  {name:<30} {seconds * 1000:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
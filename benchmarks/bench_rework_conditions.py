@@ -0,0 +1,59 @@
+"""
+Compares evaluating rework conditions with eval() on the raw string against the predicates from compile_condition.
+
+Run: python benchmarks/bench_rework_conditions.py [num_decisions]
+"""
+import random
+import sys
+from datetime import datetime
+
+from bench_utils import add_repo_paths, rate, print_rates
+
+add_repo_paths()
+from rework import compile_condition  # noqa: E402
+
+CONDITIONS = {
+    "equality": "loanType == 'personal'",
+    "time window": "loanType == 'personal' and start_time >= datetime(2020, 1, 2) and start_time <= datetime(2020, 1, 3)",
+    "general expression": "requestedAmount > 50000 or isUrgent",
+}
+
+
+def eval_per_decision(condition, attributes):
+    """The previous safe_eval: copy the attributes into a new environment and eval the string."""
+    try:
+        env = {"__builtins__": {}, "datetime": datetime}
+        env.update(attributes)
+        return eval(condition, env)
+    except Exception:
+        return False
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    cases = [{"requestedAmount": random.uniform(1000, 100000),
+              "loanType": random.choice(["personal", "mortgage", "auto"]),
+              "isUrgent": random.random() < 0.1,
+              "start_time": datetime(2020, 1, random.randint(1, 5))} for _ in range(1000)]
+    attributes = [cases[i % len(cases)] for i in range(n)]
+
+    for label, condition in CONDITIONS.items():
+        predicate = compile_condition(condition)
+
+        def eval_path(n):
+            for a in attributes:
+                eval_per_decision(condition, a)
+
+        def compiled_path(n):
+            for a in attributes:
+                predicate(a)
+
+        results = {
+            "eval() per decision": rate(eval_path, n),
+            "compile_condition": rate(compiled_path, n),
+        }
+        print_rates(f"Rework condition ({label}): {condition}", results, unit="decisions/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Measures the cost of shift changes: next_change lookups/sec of a ShiftCalendar, and the run time of a multi-year
+simulation whose resources work office hours with a lunch break, against the same model without shifts.
+
+Run: python benchmarks/bench_shifts.py [years] [resources]
+"""
+import random
+import sys
+import time
+
+from bench_utils import add_repo_paths
+
+add_repo_paths()
+from simpn.simulator import SimProblem, SimToken  # noqa: E402
+from simpn.prototypes import BPMNStartEvent, BPMNTask, BPMNEndEvent  # noqa: E402
+from shifts import ShiftCalendar, apply_shifts  # noqa: E402
+
+OFFICE = {"days": ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"],
+          "hours": [["09:00", "12:30"], ["13:00", "17:00"]]}
+
+
+def build_model(num_resources, shifts):
+    model = SimProblem()
+    waiting, done = model.add_var("waiting"), model.add_var("done")
+    staff = model.add_var("staff")
+    calendars = {}
+    for i in range(num_resources):
+        staff.put(f"employee{i}")
+        # Staggered shifts, so that every resource changes at its own time
+        calendars[f"office{i}"] = dict(OFFICE, hours=[[f"{8 + i % 3:02d}:00", "12:30"], ["13:00", f"{16 + i % 3:02d}:00"]])
+    BPMNStartEvent(model, [], [waiting], "arrive", lambda: random.expovariate(1 / 60))
+    BPMNTask(model, [waiting, staff], [done, staff], "handle",
+             lambda c, r: [SimToken((c, r), delay=random.expovariate(1 / 30))])
+    BPMNEndEvent(model, [done], [], "end")
+    if shifts:
+        apply_shifts(model, {"shifts": {"calendars": calendars,
+                                        "resources": {f"employee{i}": f"office{i}" for i in range(num_resources)}}})
+    return model
+
+
+def main():
+    years = float(sys.argv[1]) if len(sys.argv) > 1 else 1
+    num_resources = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    duration = years * 365 * 24 * 60
+
+    calendar = ShiftCalendar(OFFICE)
+    n = 1000000
+    start = time.perf_counter()
+    t = 0
+    for _ in range(n):
+        t, _ = calendar.next_change(t)
+    print(f"ShiftCalendar.next_change: {n / (time.perf_counter() - start):,.0f} lookups/sec "
+          f"({n:,} shift changes reach day {t / 1440:,.0f})")
+
+    print(f"\nSimulating {years:g} year(s) with {num_resources} resources:")
+    for label, shifts in [("always available", False), ("office shifts", True)]:
+        random.seed(1)
+        model = build_model(num_resources, shifts)
+        start = time.perf_counter()
+        model.simulate(duration)
+        elapsed = time.perf_counter() - start
+        changes = 4 * 5 * 52 * years * num_resources if shifts else 0
+        print(f"  {label:<17} {elapsed:6.2f} s, about {changes:,.0f} shift changes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Measures forking what-if branches from a snapshot: the time to simulate a shared prefix once, the size of the
+snapshot file per compression and the time to save and restore it, and the total time of a number of branches that
+re-simulate the prefix versus branches that restore the snapshot.
+
+Run: python benchmarks/bench_snapshot.py [prefix days] [branch days] [branches]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from bench_utils import ROOT, add_repo_paths, load_config
+
+add_repo_paths()
+sys.path.insert(0, os.path.join(ROOT, "templates"))
+os.chdir(os.path.join(ROOT, "rework"))  # case_attributes reads config.json from the working directory
+from sequence import build_model  # noqa: E402
+from snapshot import save_snapshot, restore_snapshot  # noqa: E402
+
+
+def main():
+    prefix_days = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    branch_days = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    branches = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    prefix, branch = prefix_days * 24 * 60, branch_days * 24 * 60
+    config = load_config("rework")
+
+    start = time.perf_counter()
+    model = build_model(config, seed=1)
+    model.simulate(prefix)
+    prefix_time = time.perf_counter() - start
+    print(f"Sequence template, prefix of {prefix_days} days: {prefix_time:.2f} s")
+
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, "snapshot")
+        for compression in ["gzip", "lzma", None]:
+            start = time.perf_counter()
+            save_snapshot(model, filename, compression=compression)
+            saved = time.perf_counter() - start
+            start = time.perf_counter()
+            restore_snapshot(build_model(config), filename)
+            restored = time.perf_counter() - start
+            print(f"  snapshot ({str(compression):<4}) {os.path.getsize(filename) / 1e3:8.1f} kB, "
+                  f"save {saved * 1000:6.1f} ms, build + restore {restored * 1000:6.1f} ms")
+
+        save_snapshot(model, filename)
+        print(f"\n{branches} branches of {branch_days} days:")
+        start = time.perf_counter()
+        for i in range(branches):
+            model = build_model(config, seed=1)
+            model.simulate(prefix + branch)
+        resimulated = time.perf_counter() - start
+        start = time.perf_counter()
+        for i in range(branches):
+            model = build_model(config)
+            restore_snapshot(model, filename)
+            model.simulate(prefix + branch)
+        forked = time.perf_counter() - start
+        print(f"  re-simulating the prefix  {resimulated:6.2f} s")
+        print(f"  restoring the snapshot    {forked:6.2f} s  ({resimulated / forked:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
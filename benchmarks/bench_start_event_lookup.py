@@ -0,0 +1,60 @@
+"""
+Measures the cost of logging a case arrival while the queue behind the start event is saturated.
+Compares the full scan of the outgoing places (the previous behavior), the lookup restricted to tokens with the
+current time, and the case recorded by start_case (sim_problem.last_started_case).
+
+Run: python benchmarks/bench_start_event_lookup.py
+"""
+import os
+import time
+
+from bench_utils import add_repo_paths
+
+add_repo_paths()
+from simpn.simulator import SimProblem, SimToken  # noqa: E402
+from simpn.prototypes import BPMNStartEvent  # noqa: E402
+from custom_reporters import EnhancedEventLogReporter  # noqa: E402
+
+ARRIVALS = 200
+
+
+def build(queue_length):
+    problem = SimProblem()
+    waiting = problem.add_var("waiting")
+    BPMNStartEvent(problem, [], [waiting], "arrival", 1, behavior=lambda case_id: SimToken((case_id, ({}, {}))))
+    for i in range(queue_length):
+        waiting.put((f"backlog{i}", ({"loanType": "personal"}, {})), time=i)
+    event = problem.id2node["arrival<start_event>"]
+    timer = problem.id2node["arrival_timer"]
+    reporter = EnhancedEventLogReporter(os.devnull, sim_problem=problem)
+    return problem, waiting, timer, event, reporter
+
+
+def arrivals_per_second(queue_length, mode):
+    problem, waiting, timer, event, reporter = build(queue_length)
+    start = time.perf_counter()
+    for i in range(ARRIVALS):
+        now = queue_length + i
+        case_id = f"arrival{i}"
+        attributes = {"loanType": "personal"}
+        waiting.put((case_id, (attributes, {})), time=now)
+        if mode == "full scan (before)":
+            reporter._find_case_attributes(event, case_id)
+        else:
+            if mode == "last_started_case":
+                problem.last_started_case = (case_id, attributes)
+            reporter.callback(([(timer, SimToken(case_id))], now, event))
+    return ARRIVALS / (time.perf_counter() - start)
+
+
+def main():
+    modes = ["full scan (before)", "tokens at current time", "last_started_case"]
+    print(f"Start event logging with a saturated queue ({ARRIVALS} arrivals per measurement)")
+    print(f"  {'queue length':>12}" + "".join(f"{m:>26}" for m in modes))
+    for queue_length in (100, 1_000, 10_000, 50_000):
+        rates = [arrivals_per_second(queue_length, mode) for mode in modes]
+        print(f"  {queue_length:>12}" + "".join(f"{r:>18,.0f} arr/sec" for r in rates))
+
+
+if __name__ == "__main__":
+    main()
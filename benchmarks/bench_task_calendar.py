@@ -0,0 +1,82 @@
+"""
+Compares the previous task constraints (a guard on the time variable that converts the simulation time with
+timedelta + strftime for every binding) against the TaskCalendar gate, for a task that is open on Thursdays only.
+
+Run: python benchmarks/bench_task_calendar.py [days]
+"""
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from bench_utils import add_repo_paths
+
+add_repo_paths()
+from simpn.simulator import SimProblem, SimToken  # noqa: E402
+from simpn.prototypes import BPMNStartEvent, BPMNTask, BPMNEndEvent  # noqa: E402
+from task_constraints import apply_task_constraints, TaskCalendar  # noqa: E402
+
+CONSTRAINT = {"type": "day_of_week", "days": ["Thursday"]}
+
+
+def legacy_guard(constraint):
+    initial_time = datetime(2020, 1, 1)
+
+    def guard(*args):
+        dt = initial_time + timedelta(minutes=args[-1])
+        return dt.strftime("%A") in constraint["days"]
+    return guard
+
+
+def build_model(gate):
+    model = SimProblem()
+    waiting, checked, done = model.add_var("waiting"), model.add_var("checked"), model.add_var("done")
+    clerks, checkers = model.add_var("clerks"), model.add_var("checkers")
+    for i in range(3):
+        clerks.put(f"clerk{i}")
+        checkers.put(f"checker{i}")
+    BPMNStartEvent(model, [], [waiting], "arrive", lambda: random.expovariate(1 / 10))
+    # An unconstrained task keeps the simulator busy while the constrained one is closed
+    BPMNTask(model, [waiting, clerks], [checked, clerks], "register",
+             lambda c, r: [SimToken((c, r), delay=random.expovariate(1 / 20))])
+    BPMNTask(model, [checked, checkers], [done, checkers], "approve",
+             lambda c, r: [SimToken((c, r), delay=random.expovariate(1 / 2))])
+    BPMNEndEvent(model, [done], [], "end")
+    if gate:
+        apply_task_constraints(model, {"task_constraints": {"approve": CONSTRAINT}})
+    else:
+        start_event = model.id2node["approve<task:start>"]
+        original_incoming = start_event.incoming
+        original_behavior = start_event.behavior
+        start_event.set_inflow(original_incoming + [model.var("time")])
+        start_event.behavior = lambda *args: original_behavior(*args[:len(original_incoming)])
+        start_event.set_guard(legacy_guard(CONSTRAINT))
+    return model
+
+
+def main():
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 14
+    n = 200000
+    calendar, guard = TaskCalendar(CONSTRAINT), legacy_guard(CONSTRAINT)
+    times = [random.uniform(0, days * 24 * 60) for _ in range(n)]
+    for label, check in [("timedelta + strftime", lambda t: guard(t)), ("TaskCalendar.is_open", calendar.is_open)]:
+        start = time.perf_counter()
+        for t in times:
+            check(t)
+        print(f"{label:<22} {n / (time.perf_counter() - start):>12,.0f} checks/sec")
+
+    print(f"\nSimulating {days} days:")
+    for label, gate in [("guard on time", False), ("calendar gate", True)]:
+        random.seed(1)
+        model = build_model(gate)
+        starts = []
+        reporter = type("Reporter", (), {"callback": lambda self, b: starts.append(b[1])
+                                         if b[2].get_id() == "approve<task:start>" else None})()
+        start = time.perf_counter()
+        model.simulate(days * 24 * 60, reporter)
+        elapsed = time.perf_counter() - start
+        print(f"  {label:<15} {elapsed:6.2f} s, {len(starts)} approvals")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Compares timestamp formatting through timedelta + strftime with the cached TimestampEncoder.
+
+Run: python benchmarks/bench_timestamp_format.py [num_values]
+"""
+import random
+import sys
+from datetime import datetime, timedelta
+
+from bench_utils import add_repo_paths, rate, print_rates
+
+add_repo_paths()
+from simpn.reporters import TimeUnit  # noqa: E402
+from custom_reporters import TimestampEncoder, DEFAULT_TIME_FORMAT  # noqa: E402
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    initial_time = datetime(2020, 1, 1)
+    # Simulation time only moves forward, so the values are sorted like the rows of a real log
+    times = sorted(random.uniform(0, 60 * 24 * 365) for _ in range(n))
+    encoder = TimestampEncoder(TimeUnit.MINUTES, initial_time)
+
+    def strftime_path(n):
+        for t in times:
+            (initial_time + timedelta(minutes=t)).strftime(DEFAULT_TIME_FORMAT)
+
+    def encoder_path(n):
+        fmt = encoder.format
+        for t in times:
+            fmt(t)
+
+    results = {
+        "timedelta + strftime": rate(strftime_path, n),
+        "TimestampEncoder.format": rate(encoder_path, n),
+    }
+    print_rates(f"Timestamp formatting, {n:,} values over one simulated year", results, unit="values/sec")
+
+
+if __name__ == "__main__":
+    main()
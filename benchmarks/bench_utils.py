@@ -0,0 +1,43 @@
+"""
+Shared helpers for the benchmark scripts.
+
+The project modules use flat imports (e.g. ``from custom_reporters import ...``), so the
+benchmarks put the module folders on the import path before importing them.
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULE_FOLDERS = ["attr", "rework", "bottleneck", "common", "experiments"]
+
+
+def add_repo_paths():
+    """Make the project modules importable with the same flat imports the templates use."""
+    for folder in MODULE_FOLDERS:
+        path = os.path.join(ROOT, folder)
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+
+def load_config(folder="attr"):
+    """Load the sample config.json of one of the module folders."""
+    import json
+    with open(os.path.join(ROOT, folder, "config.json"), "r") as f:
+        return json.load(f)
+
+
+def rate(func, n):
+    """Call func(n) once and return the number of operations per second."""
+    start = time.perf_counter()
+    func(n)
+    elapsed = time.perf_counter() - start
+    return n / elapsed if elapsed > 0 else float("inf")
+
+
+def print_rates(title, results, unit="events/sec"):
+    """Print a small table of name -> rate, relative to the first entry."""
+    print(title)
+    baseline = next(iter(results.values()))
+    for name, value in results.items():
+        print(f"  {name:<30} {value:>14,.0f} {unit}  ({value / baseline:.2f}x)")
@@ -0,0 +1,166 @@
+"""
+Generates synthetic loan processes of any size for the scaling benchmarks, built with the same APIs as the templates:
+BPMNStartEvent, BPMNTask and BPMNEndEvent, add_parallel_join, setup_rework / setup_long_rework and
+apply_resource_constraints.
+
+    from model_generator import generate_model
+
+    model, config = generate_model("xor", 500, seed=1)
+    model.simulate(5 * 24 * 60)
+
+Shapes:
+- "sequence": the tasks one after the other.
+- "xor": blocks of `width` alternative tasks, one of which is chosen at random for every case.
+- "parallel": blocks of `width` tasks that every case passes through at the same time, joined by add_parallel_join.
+- "rework": a sequence in which every task has self-loop rework and every fifth task sends cases back four tasks.
+
+The mean service time of a task follows from the arrival rate and the share of the cases that visit it, so every
+resource pool has about the same utilization (load) whatever the shape and size. Larger models therefore have more
+cases in progress: in a sequence a case spends about num_tasks times the mean service time.
+"""
+import contextlib
+import io
+
+from bench_utils import add_repo_paths
+
+add_repo_paths()
+from simpn.simulator import SimProblem, SimToken  # noqa: E402
+from simpn.prototypes import BPMNStartEvent, BPMNTask, BPMNEndEvent  # noqa: E402
+from case_record import CaseRecord, case_table  # noqa: E402
+from gateways import add_parallel_join  # noqa: E402
+from resource_constraints import apply_resource_constraints  # noqa: E402
+from rework import setup_rework, setup_long_rework  # noqa: E402
+from rng import get_rng  # noqa: E402
+
+SHAPES = ["sequence", "xor", "parallel", "rework"]
+LOAN_TYPES = ["personal", "auto", "mortgage"]
+
+SELF_REWORK = {"max_iteration": 2, "probability": 0.2}
+LONG_REWORK = {"max_iteration": 1, "probability": 0.1, "every": 5, "back": 4}
+# Expected visits of a task in the rework shape, an upper bound: 1 + 0.2 + 0.2^2 for the self-loops, times 1.1 for
+# the long rework loops that a task lies in
+REWORK_VISITS = (1 + 0.2 + 0.04) * 1.1
+
+
+def _start_behavior(model, rng):
+    table = case_table(model)
+
+    def start(case_id):
+        attributes = {"loanType": rng.choice(LOAN_TYPES), "requestedAmount": rng.uniform(1000, 100000),
+                      "isUrgent": rng.uniform(0, 1) < 0.2}
+        case = CaseRecord(case_id, table, attributes)
+        model.last_started_case = (case_id, case)
+        return SimToken(case)
+    return start
+
+
+def _task_behavior(rng, mean):
+    return lambda c, r: [SimToken((c, r), delay=rng.expovariate(1 / mean))]
+
+
+def _xor_behavior(rng, branches):
+    indices = range(branches)
+
+    def choose(c):
+        result = [None] * branches
+        result[rng.choice(indices)] = SimToken(c)
+        return result
+    return choose
+
+
+def _and_behavior(branches):
+    return lambda c: [SimToken(c) for _ in range(branches)]
+
+
+def _add_task(model, rng, name, incoming, outgoing, resources, mean):
+    pool = model.add_var(f"{name}_resources")
+    for j in range(resources):
+        pool.put(f"{name}_r{j}")
+    BPMNTask(model, [incoming, pool], [outgoing, pool], name, _task_behavior(rng, mean))
+
+
+def _blocks(num_tasks, width):
+    """Splits the task numbers into consecutive blocks of at most width tasks."""
+    return [range(start, min(start + width, num_tasks)) for start in range(0, num_tasks, width)]
+
+
+def generate_model(shape, num_tasks, seed=None, width=4, resources=2, interarrival=10, load=0.8, constraints=True,
+                   quiet=True):
+    """
+    Builds a synthetic loan process and returns (model, config), where config holds the rework, long_rework and
+    resource_constraints sections that were applied to it.
+
+    :param shape: One of SHAPES.
+    :param num_tasks: The number of tasks.
+    :param seed: Seed of the model's random streams (see common/rng.py).
+    :param width: The number of tasks in an XOR or AND block.
+    :param resources: The number of resources of every task.
+    :param interarrival: The mean time between two arrivals, in minutes.
+    :param load: The utilization of the resource pools, which sets the mean service time of the tasks.
+    :param constraints: If True, every fourth task may only use its first resource for personal loans.
+    :param quiet: If True, the console output of the setup functions is suppressed.
+    :return: The SimProblem and the config.
+    """
+    if shape not in SHAPES:
+        raise ValueError(f"Unknown shape '{shape}', expected one of {', '.join(SHAPES)}")
+    if num_tasks < 1:
+        raise ValueError(f"A model needs at least one task, got {num_tasks}")
+
+    model = SimProblem()
+    rng = get_rng(model, seed)
+    # The mean service time at which a task that every case visits once has the given load
+    mean = load * resources * interarrival
+    if shape == "rework":
+        mean /= REWORK_VISITS
+    tasks = [f"task{i}" for i in range(num_tasks)]
+
+    arrivals = model.add_var("arrivals")
+    BPMNStartEvent(model, [], [arrivals], "application_received", lambda: rng.expovariate(1 / interarrival),
+                   behavior=_start_behavior(model, rng))
+
+    place = arrivals
+    if shape in ("sequence", "rework"):
+        for name in tasks:
+            done = model.add_var(f"{name}_done")
+            _add_task(model, rng, name, place, done, resources, mean)
+            place = done
+    else:
+        for k, block in enumerate(_blocks(num_tasks, width)):
+            done = model.add_var(f"block{k}_done")
+            if len(block) == 1:
+                _add_task(model, rng, tasks[block[0]], place, done, resources, mean)
+            else:
+                branches = [model.add_var(f"{tasks[i]}_waiting") for i in block]
+                if shape == "xor":
+                    # A branch gets one in len(block) cases
+                    model.add_event([place], branches, _xor_behavior(rng, len(block)), name=f"xor_split{k}")
+                    for i, branch in zip(block, branches):
+                        _add_task(model, rng, tasks[i], branch, done, resources, mean * len(block))
+                else:
+                    model.add_event([place], branches, _and_behavior(len(block)), name=f"and_split{k}")
+                    finished = [model.add_var(f"{tasks[i]}_done") for i in block]
+                    for i, branch, end in zip(block, branches, finished):
+                        _add_task(model, rng, tasks[i], branch, end, resources, mean)
+                    add_parallel_join(model, finished, [done], f"and_join{k}")
+            place = done
+    BPMNEndEvent(model, [place], [], "application_completed")
+
+    config = {"rework": [], "long_rework": [], "resource_constraints": []}
+    if shape == "rework":
+        every, back = LONG_REWORK["every"], LONG_REWORK["back"]
+        triggers = set(range(back, num_tasks, every))
+        config["rework"] = [{"activity": name, **SELF_REWORK} for i, name in enumerate(tasks) if i not in triggers]
+        config["long_rework"] = [{"trigger_activity": tasks[i], "back_to": tasks[i - back],
+                                  "max_iteration": LONG_REWORK["max_iteration"],
+                                  "probability": LONG_REWORK["probability"]} for i in sorted(triggers)]
+    if constraints:
+        config["resource_constraints"] = [
+            {"task": name, "conditions": [{"condition": "loanType == 'personal'", "resources": [f"{name}_r0"]}]}
+            for name in tasks[::4]]
+
+    with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+        setup_rework(model, config)
+        setup_long_rework(model, config)
+        apply_resource_constraints(model, config)
+    return model, config
+
@@ -0,0 +1,172 @@
+"""
+Scaling benchmark suite: builds the synthetic models of model_generator.py for every shape and size and records the
+model build time, the simulated events/sec, and the peak memory of building and simulating the model (traced in a
+second run, as tracemalloc slows down the simulation). The results are written as JSON to
+benchmarks/results/<commit>.json, so that two commits can be compared:
+
+   python benchmarks/run_benchmarks.py --sizes 10 50 200 --days 1
+   python benchmarks/run_benchmarks.py --compare benchmarks/results/1a2b3c4.json
+
+With --compare, the new results are printed next to the old ones, and the exit status is 1 if events/sec, build
+time or memory got worse by more than --threshold for any model.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from bench_utils import ROOT, add_repo_paths
+
+add_repo_paths()
+from simpn.reporters import Reporter  # noqa: E402
+from model_generator import SHAPES, generate_model  # noqa: E402
+
+RESULTS = os.path.join(ROOT, "benchmarks", "results")
+# Measurements for which a larger value is better; for the others smaller is better
+HIGHER_IS_BETTER = {"events_per_sec"}
+
+
+class EventCounter(Reporter):
+    """Counts the events, the started and the completed cases of a simulation."""
+    def __init__(self):
+        self.events = 0
+        self.started = 0
+        self.completed = 0
+
+    def callback(self, timed_binding):
+        self.events += 1
+        name = timed_binding[2].get_id()
+        if name.endswith("<start_event>"):
+            self.started += 1
+        elif name.endswith("<end_event>"):
+            self.completed += 1
+
+
+def commit_id():
+    """The short hash of the checked out commit, with -dirty if there are uncommitted changes."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        changes = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                                 capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return commit + "-dirty" if changes else commit
+
+
+def measure(shape, num_tasks, duration, seed, repeat=1, memory=True):
+    """
+    Builds and simulates one model; returns a dictionary of measurements. The build time is the best of five builds,
+    the run time the best of repeat simulations (all with the same seed, so they fire the same events).
+    """
+    build = math.inf
+    for _ in range(5):
+        start = time.perf_counter()
+        model, _ = generate_model(shape, num_tasks, seed=seed)
+        build = min(build, time.perf_counter() - start)
+
+    run = math.inf
+    for i in range(repeat):
+        if i > 0:
+            model, _ = generate_model(shape, num_tasks, seed=seed)
+        counter = EventCounter()
+        start = time.perf_counter()
+        model.simulate(duration, counter)
+        run = min(run, time.perf_counter() - start)
+    result = {
+        "shape": shape,
+        "tasks": num_tasks,
+        "model_events": len(model.events),
+        "build_sec": round(build, 4),
+        "run_sec": round(run, 4),
+        "events_fired": counter.events,
+        "events_per_sec": round(counter.events / run, 1) if run > 0 else None,
+        "cases_started": counter.started,
+        "cases_completed": counter.completed,
+        "cases_in_progress": counter.started - counter.completed,
+    }
+    if memory:
+        del model
+        tracemalloc.start()
+        model, _ = generate_model(shape, num_tasks, seed=seed)
+        model.simulate(duration)
+        result["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+        tracemalloc.stop()
+    return result
+
+
+def compare(results, baseline, threshold):
+    """Prints the results next to those of a baseline file; returns the number of regressions."""
+    old = {(r["shape"], r["tasks"]): r for r in baseline["results"]}
+    regressions = 0
+    print(f"\nCompared with {baseline['commit']} (regression: more than {threshold:.0%} worse):")
+    for result in results:
+        before = old.get((result["shape"], result["tasks"]))
+        if before is None:
+            continue
+        for key in ["build_sec", "events_per_sec", "peak_mb"]:
+            if result.get(key) is None or not before.get(key):
+                continue
+            ratio = result[key] / before[key]
+            worse = ratio < 1 - threshold if key in HIGHER_IS_BETTER else ratio > 1 + threshold
+            regressions += worse
+            print(f"  {result['shape']:<9} {result['tasks']:>6} {key:<15} {before[key]:>12,.2f} -> "
+                  f"{result[key]:>12,.2f}  ({ratio:.2f}x){'  REGRESSION' if worse else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scaling benchmarks on synthetic models.")
+    parser.add_argument("--shapes", nargs="+", choices=SHAPES, default=SHAPES)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10, 50, 200], help="numbers of tasks")
+    parser.add_argument("--days", type=float, default=1, help="simulated days per model")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=1, help="simulations per model, the fastest one counts")
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced run that measures peak memory")
+    parser.add_argument("--output", help="results file, by default benchmarks/results/<commit>.json")
+    parser.add_argument("--compare", help="results file of an earlier commit to compare with")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change that counts as a regression")
+    args = parser.parse_args()
+
+    duration = args.days * 24 * 60
+    results = []
+    print(f"{'shape':<9} {'tasks':>6} {'build':>9} {'events/sec':>11} {'peak':>9} {'cases in progress':>18}")
+    for shape in args.shapes:
+        for num_tasks in args.sizes:
+            result = measure(shape, num_tasks, duration, args.seed, args.repeat, memory=not args.no_memory)
+            results.append(result)
+            peak = f"{result['peak_mb']:7.1f}MB" if "peak_mb" in result else f"{'-':>9}"
+            print(f"{shape:<9} {num_tasks:>6} {result['build_sec']:8.3f}s {result['events_per_sec']:>11,.0f} "
+                  f"{peak} {result['cases_in_progress']:>18}")
+
+    commit = commit_id()
+    output = args.output or os.path.join(RESULTS, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "commit": commit,
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "days": args.days,
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "results": results,
+        }, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+from collections import defaultdict, namedtuple
+
+import numpy as np
+
+from resource_calculator import estimate_interarrival, estimate_service
+from rng import get_rng
+
+# Load of one task: visits per case, arrival rate, mean service time, current pool size and utilization
+TaskLoad = namedtuple("TaskLoad", ["task", "visits", "arrival_rate", "mean_service", "resources", "utilization"])
+
+# Stop following a sampled case after this many steps, e.g. in a loop without exit
+MAX_STEPS_PER_CASE = 10000
+
+
+class NetworkModel:
+    """
+    The routing structure of a SimProblem, read from its events and places.
+
+    Places that hold cases are the nodes. Every other event moves a case from its input place to its output places:
+    a task (<task:start> and <task:complete>), a split or decision, a join or an end event.
+    The routing matrix holds, for every pair of places (p, q), the expected number of tokens put on q for
+    every token taken from p. For an XOR split the entries of a row add up to 1, for an AND split to the
+    number of branches.
+
+    :param sim_problem: The SimProblem instance.
+    :param rng: The random numbers for choosing resources and competing events while sampling, by default the
+        model's own SimulationRNG (see common/rng.py), so the analysis of a seeded model is reproducible.
+    """
+    def __init__(self, sim_problem, rng=None):
+        self.sim_problem = sim_problem
+        self.rng = rng if rng is not None else get_rng(sim_problem)
+        start_events = [e for e in sim_problem.events if e.get_id().endswith("<start_event>")]
+        if len(start_events) != 1:
+            raise ValueError("Expected exactly one start event")
+        self.start_event = start_events[0]
+        self.start_place = self.start_event.outgoing[1]  # outgoing[0] is the timer of the start event
+
+        # task name -> (start event, complete event)
+        self.tasks = {}
+        for event in sim_problem.events:
+            if event.get_id().endswith("<task:start>"):
+                task = event.get_id().split("<")[0]
+                complete = sim_problem.id2node.get(f"{task}<task:complete>")
+                self.tasks[task] = (event, complete)
+        complete_events = set(id(complete) for _, complete in self.tasks.values())
+
+        # place -> events that take cases from it; resources are only an input of tasks, so they are left out
+        self.consumers = defaultdict(list)
+        for event in sim_problem.events:
+            if event is self.start_event or id(event) in complete_events:
+                continue
+            if event.get_id().endswith("<task:start>"):
+                self.consumers[event.incoming[0]].append(event)
+            else:
+                for place in event.incoming:
+                    self.consumers[place].append(event)
+
+        self.arrivals = defaultdict(int)
+        self.emitted = defaultdict(lambda: defaultdict(int))
+
+    def _outputs(self, event, place, value):
+        """Returns the (place, value) pairs that event produces when it takes value from place."""
+        event_id = event.get_id()
+        if event_id.endswith("<end_event>"):
+            return []
+        if event_id.endswith("<task:start>"):
+            task = event_id.split("<")[0]
+            complete = self.tasks[task][1]
+            # Any free resource may take the case, like in the simulation
+            args = [value] + [self.rng.choice(var.marking).value if len(var.marking) > 0 else None
+                              for var in event.incoming[1:]]
+            busy = event.behavior(*args)[0].value
+            result = complete.behavior(busy)
+            # Only the first outgoing place of a task holds the case, the others get the resources back
+            return [(complete.outgoing[0], result[0].value)] if result and result[0] is not None else []
+        if hasattr(event, "join_arity"):
+            # Every case passes a join once, although it arrives join_arity times
+            return [(event.outgoing[i], value) for i in range(len(event.outgoing))] if event.join_index == 0 else []
+        if len(event.incoming) > 1:
+            # A join on all branches at once (guard c1 == c2): continue once, on the first branch
+            if place is not event.incoming[0]:
+                return []
+            result = event.behavior(*([value] * len(event.incoming)))
+        else:
+            result = event.behavior(value)
+        return [(event.outgoing[i], token.value) for i, token in enumerate(result) if token is not None]
+
+    def sample(self, num_cases=1000):
+        """
+        Follows num_cases cases from the start event through the model by calling the behaviors,
+        counting the tokens that each place receives and passes on to other places.
+        Cases are drawn with the start event's own behavior, so attribute-dependent decisions and rework
+        limits are sampled as they occur in the simulation. Time plays no role.
+        """
+        prefix = self.start_event.get_id().split("<")[0]
+        # Generating a case may record it on the model (start_case); restore that afterwards
+        last_started_case = getattr(self.sim_problem, "last_started_case", None)
+        try:
+            for i in range(num_cases):
+                case = self.start_event.behavior(f"{prefix}{i}")[1].value
+                pending = [(self.start_place, case)]
+                steps = 0
+                while pending and steps < MAX_STEPS_PER_CASE:
+                    place, value = pending.pop()
+                    steps += 1
+                    self.arrivals[place] += 1
+                    consumers = self.consumers.get(place)
+                    if not consumers:
+                        continue
+                    # Events that compete for the same place are assumed to take an equal share of it
+                    event = consumers[0] if len(consumers) == 1 else self.rng.choice(consumers)
+                    for out_place, out_value in self._outputs(event, place, value):
+                        self.emitted[place][out_place] += 1
+                        pending.append((out_place, out_value))
+        finally:
+            self.sim_problem.last_started_case = last_started_case
+        return self
+
+    def routing_matrix(self, routing=None):
+        """
+        Returns (places, R) with R[i, j] the expected number of tokens on places[j] per token taken from places[i].
+        Rows come from the sampled counts. routing overrides them per event: {event name: {output place name: value}},
+        for instance {"approve_or_reject": {"approve_queue": 0.7, "reject_queue": 0.3}}.
+        """
+        places = set(self.arrivals) | {self.start_place}
+        for event_name, outputs in (routing or {}).items():
+            event = self.sim_problem.id2node.get(event_name)
+            if event is None:
+                raise ValueError(f"Routing for unknown event '{event_name}'")
+            places.update(event.incoming)
+            places.update(self.sim_problem.id2node[name] for name in outputs)
+        places = sorted(places, key=lambda p: p.get_id())
+        index = {place: i for i, place in enumerate(places)}
+
+        matrix = np.zeros((len(places), len(places)))
+        for place, outputs in self.emitted.items():
+            for out_place, count in outputs.items():
+                matrix[index[place], index[out_place]] = count / self.arrivals[place]
+        for event_name, outputs in (routing or {}).items():
+            event = self.sim_problem.id2node[event_name]
+            source = index[event.incoming[0]]
+            matrix[source, :] = 0.0
+            for name, value in outputs.items():
+                matrix[source, index[self.sim_problem.id2node[name]]] = float(value)
+        return places, matrix
+
+    def visit_ratios(self, routing=None):
+        """
+        Solves the traffic equations v = e + R^T v, where e puts one case on the start place, and returns the
+        expected number of visits per case for every task.
+        """
+        places, matrix = self.routing_matrix(routing)
+        external = np.zeros(len(places))
+        external[places.index(self.start_place)] = 1.0
+        try:
+            place_visits = np.linalg.solve(np.eye(len(places)) - matrix.T, external)
+        except np.linalg.LinAlgError:
+            raise ValueError("The routing has a loop that cases never leave; check the routing probabilities")
+        visits = dict(zip(places, place_visits))
+        ratios = {}
+        for task, (start, _) in self.tasks.items():
+            share = 1.0 / len(self.consumers[start.incoming[0]])
+            ratios[task] = float(visits.get(start.incoming[0], 0.0)) * share
+        return ratios
+
+
+def analyze_network(sim_problem, config=None, num_cases=1000, print_report=True):
+    """
+    Ranks the tasks of a model by utilization before simulating it.
+    The visits per case follow from the routing of the model, including XOR and AND splits and rework loops.
+    Branch probabilities are taken from config["routing"] where given and are sampled from the behaviors otherwise,
+    see NetworkModel.
+
+    :param sim_problem: The SimProblem instance.
+    :param config: Optional configuration dictionary with a "routing" section.
+    :param num_cases: Number of cases used to sample the branch probabilities.
+    :param print_report: Print the ranking to the console.
+    :return: List of TaskLoad, highest utilization first.
+    """
+    network = NetworkModel(sim_problem).sample(num_cases)
+    visits = network.visit_ratios((config or {}).get("routing"))
+
+    prefix = network.start_event.get_id().split("<")[0]
+    interarrival = estimate_interarrival(network.start_event.behavior, prefix)
+    arrival_rate = 1.0 / interarrival.mean if interarrival.mean > 0 else 0.0
+
+    loads = []
+    for task, (start, _) in network.tasks.items():
+        mean_service = estimate_service(start.behavior).mean
+        resources = len(start.incoming[1].marking) if len(start.incoming) > 1 else 0
+        task_rate = arrival_rate * visits[task]
+        utilization = task_rate * mean_service / resources if resources > 0 else float("inf")
+        loads.append(TaskLoad(task, visits[task], task_rate, mean_service, resources, utilization))
+    loads.sort(key=lambda load: load.utilization, reverse=True)
+
+    if print_report:
+        print("\nTask load (highest utilization first):\n")
+        for load in loads:
+            warning = "  <- bottleneck, queue will grow without bound" if load.utilization >= 1.0 else ""
+            print(f"{load.task}: {load.visits:.2f} visits/case, {load.resources} resources, "
+                  f"utilization {load.utilization:.0%}{warning}")
+    return loads
@@ -0,0 +1,101 @@
+import math
+from collections import namedtuple
+
+# Upper bound on the pool size the search tries above the offered load, for targets that cannot be met
+MAX_EXTRA_SERVERS = 1000
+
+# Queueing metrics of one task for a pool of `resources`; times are in simulation time units
+TaskSizing = namedtuple("TaskSizing", ["resources", "utilization", "wait_probability", "mean_wait", "queue_length"])
+
+
+def erlang_c(c, offered_load):
+    """
+    Probability that an arriving case has to wait in an M/M/c queue (Erlang-C formula).
+    Computed through the Erlang-B recursion, which stays stable for large c.
+
+    :param c: Number of resources.
+    :param offered_load: lambda * E[S], in Erlangs.
+    :return: P(wait > 0); 1.0 if the queue is unstable (offered_load >= c).
+    """
+    if offered_load <= 0:
+        return 0.0
+    if offered_load >= c:
+        return 1.0
+    blocking = 1.0
+    for k in range(1, c + 1):
+        blocking = offered_load * blocking / (k + offered_load * blocking)
+    utilization = offered_load / c
+    return blocking / (1.0 - utilization * (1.0 - blocking))
+
+
+def queue_metrics(c, arrival_rate, mean_service, scv_arrival=1.0, scv_service=1.0):
+    """
+    Waiting metrics of a pool of c resources. With both squared coefficients of variation equal to 1 this is the
+    exact M/M/c result. Otherwise the mean wait is scaled with the Allen-Cunneen approximation for G/G/c,
+    Wq = Wq(M/M/c) * (ca^2 + cs^2) / 2, and the waiting time tail is scaled the same way.
+
+    :param c: Number of resources.
+    :param arrival_rate: Arrivals per time unit at the task.
+    :param mean_service: Mean service time.
+    :param scv_arrival: Squared coefficient of variation of the interarrival times (1 for Poisson arrivals).
+    :param scv_service: Squared coefficient of variation of the service times (1 for exponential service).
+    :return: TaskSizing for c resources; waits are infinite when the pool is overloaded.
+    """
+    offered_load = arrival_rate * mean_service
+    utilization = offered_load / c
+    if offered_load <= 0:
+        return TaskSizing(c, 0.0, 0.0, 0.0, 0.0)
+    if utilization >= 1.0:
+        return TaskSizing(c, utilization, 1.0, math.inf, math.inf)
+    wait_probability = erlang_c(c, offered_load)
+    variability = (scv_arrival + scv_service) / 2.0
+    mean_wait = wait_probability * mean_service / (c * (1.0 - utilization)) * variability
+    return TaskSizing(c, utilization, wait_probability, mean_wait, arrival_rate * mean_wait)
+
+
+def probability_wait_exceeds(sizing, arrival_rate, mean_service, t, scv_arrival=1.0, scv_service=1.0):
+    """
+    P(wait > t) for the pool described by sizing: C(c, a) * exp(-(c*mu - lambda) * t) for M/M/c, with the decay rate
+    divided by the Allen-Cunneen variability factor for general distributions.
+    """
+    if sizing.wait_probability == 0.0:
+        return 0.0
+    if sizing.utilization >= 1.0:
+        return 1.0
+    variability = (scv_arrival + scv_service) / 2.0
+    decay = (sizing.resources / mean_service - arrival_rate) / variability
+    return sizing.wait_probability * math.exp(-decay * t)
+
+
+def size_task(arrival_rate, mean_service, target_wait=None, service_level=None, scv_arrival=1.0, scv_service=1.0):
+    """
+    Finds the smallest number of resources for which the task meets the targets.
+
+    :param arrival_rate: Arrivals per time unit at the task.
+    :param mean_service: Mean service time.
+    :param target_wait: Maximum mean waiting time, or None.
+    :param service_level: (t, fraction): at least this fraction of cases waits at most t, or None.
+    :param scv_arrival: Squared coefficient of variation of the interarrival times.
+    :param scv_service: Squared coefficient of variation of the service times.
+    :return: TaskSizing of the recommended pool.
+    """
+    if target_wait is None and service_level is None:
+        raise ValueError("Specify a target_wait, a service_level, or both")
+    if target_wait is not None and target_wait <= 0:
+        raise ValueError(f"target_wait must be positive, got {target_wait}")
+    if service_level is not None:
+        t, fraction = service_level
+        if t < 0 or not (0.0 < fraction < 1.0):
+            raise ValueError(f"service_level must be (t >= 0, 0 < fraction < 1), got {service_level}")
+
+    offered_load = arrival_rate * mean_service
+    c = max(1, math.floor(offered_load) + 1)
+    while True:
+        sizing = queue_metrics(c, arrival_rate, mean_service, scv_arrival, scv_service)
+        meets_wait = target_wait is None or sizing.mean_wait <= target_wait
+        meets_level = service_level is None or \
+            probability_wait_exceeds(sizing, arrival_rate, mean_service, service_level[0],
+                                     scv_arrival, scv_service) <= 1.0 - service_level[1]
+        if (meets_wait and meets_level) or c >= offered_load + MAX_EXTRA_SERVERS:
+            return sizing
+        c += 1
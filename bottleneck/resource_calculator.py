@@ -1,20 +1,214 @@
 import math
 import json
+import random
 import re
+import types
+import weakref
+from collections import namedtuple
+from queueing import size_task
+
+# -----------------------------
+# Delay estimation
+# -----------------------------
+
+# Mean and variance of the delays a behavior produces; samples == 0 means they were derived analytically
+DelayEstimate = namedtuple("DelayEstimate", ["mean", "variance", "samples"])
+
+# Behavior function -> DelayEstimate, so every function is estimated once
+_estimates = weakref.WeakKeyDictionary()
+
+# Built-ins that can pass a drawn value through without it being the delay itself, e.g. min(exp(1/9), 5)
+_PASS_THROUGH = {"min", "max", "sorted", "next", "iter", "choice", "choices"}
+
+
+class _Untraceable(Exception):
+    """Raised when a traced behavior does something with random numbers that the trace cannot follow."""
+
+
+def _untraceable(*args, **kwargs):
+    raise _Untraceable()
+
+
+class _Draw(float):
+    """
+    A value produced by a traced distribution, so we can recognise it when the behavior returns it unchanged.
+    Comparing it or testing its truth aborts the trace, because the mean would steer a data-dependent branch.
+    """
+    __lt__ = __le__ = __gt__ = __ge__ = __eq__ = __ne__ = __bool__ = _untraceable
+    __hash__ = float.__hash__
+
+
+def _traced_distributions(draws):
+    """Replacements for random.expovariate and random.uniform that return the mean and record the variance."""
+    def expovariate(lambd=1.0):
+        draw = _Draw(1.0 / lambd)
+        draws.append((draw, 1.0 / lambd ** 2))
+        return draw
+
+    def uniform(a, b):
+        draw = _Draw((a + b) / 2.0)
+        draws.append((draw, (b - a) ** 2 / 12.0))
+        return draw
+    return {"expovariate": expovariate, "uniform": uniform}
+
+
+class _TracedRandom:
+    """
+    Stands in for a source of random numbers (the random module, a random.Random or the SimulationRNG of a model),
+    for behaviors that call rng.expovariate(...). Any other use of the source aborts the trace.
+    """
+    def __init__(self, traced, source):
+        self._traced = traced
+        self._source = source
+
+    def __getattr__(self, name):
+        if name in self._traced:
+            return self._traced[name]
+        raise _Untraceable()
+
+
+def _is_random_source(value):
+    if isinstance(value, types.FunctionType) or isinstance(value, types.MethodType):
+        return False
+    return callable(getattr(value, "expovariate", None)) and callable(getattr(value, "uniform", None))
+
+
+def _traced_value(value, traced):
+    """
+    Returns the stand-in for a global or closure variable of a behavior, or None if it needs none: a traced
+    distribution for expovariate and uniform of a source of random numbers (also under another name, like exp),
+    a function that aborts the trace for its other methods (like random.random), and _TracedRandom for the source.
+    """
+    if _is_random_source(getattr(value, "__self__", None)):
+        return traced.get(getattr(value, "__name__", None), _untraceable)
+    if _is_random_source(value):
+        return _TracedRandom(traced, value)
+    return None
+
+
+def _analytic_estimate(func, args, get_delay):
+    """
+    Derives the mean and variance of the delay without sampling, if func draws it directly from expovariate or
+    uniform of the random module or of a model's SimulationRNG (also under another name, like exp).
+    Returns None if that cannot be established: if func draws more than once, uses any other random numbers
+    (including the random module's through a function it calls), or compares a draw, e.g. to choose between
+    draws; those delays are mixtures that only sampling can estimate.
+    """
+    code = getattr(func, "__code__", None)
+    if code is None or _PASS_THROUGH.intersection(code.co_names):
+        return None
+    draws = []
+    traced = _traced_distributions(draws)
+    patched = {}
+    for name in code.co_names:
+        stand_in = _traced_value(func.__globals__.get(name), traced)
+        if stand_in is not None:
+            patched[name] = stand_in
+    closure = func.__closure__
+    closure_patched = False
+    if closure:
+        cells = []
+        for cell in closure:
+            try:
+                stand_in = _traced_value(cell.cell_contents, traced)
+            except ValueError:  # empty cell
+                stand_in = None
+            cells.append(cell if stand_in is None else types.CellType(stand_in))
+            closure_patched = closure_patched or stand_in is not None
+        closure = tuple(cells)
+    if not patched and not closure_patched:
+        return None
+    traced_func = types.FunctionType(code, {**func.__globals__, **patched}, func.__name__, func.__defaults__,
+                                     closure)
+    traced_func.__kwdefaults__ = func.__kwdefaults__
+    state = random.getstate()
+    try:
+        delay = get_delay(traced_func(*args))
+    except Exception:  # including _Untraceable
+        return None
+    if random.getstate() != state or len(draws) != 1:
+        return None
+    draw, variance = draws[0]
+    if delay is not draw:
+        return None
+    return DelayEstimate(float(draw), variance, 0)
+
+
+def _sampled_estimate(sample, num_samples, rel_precision, z):
+    """
+    Samples the delay in batches, keeping a running mean and variance (Welford), until the confidence interval
+    half-width is within rel_precision of the mean or num_samples delays have been drawn.
+    """
+    n = 0
+    mean = 0.0
+    m2 = 0.0
+    variance = 0.0
+    batch = max(1, min(100, num_samples))
+    while n < num_samples:
+        for _ in range(min(batch, num_samples - n)):
+            x = float(sample())
+            n += 1
+            delta = x - mean
+            mean += delta / n
+            m2 += delta * (x - mean)
+        variance = m2 / (n - 1) if n > 1 else 0.0
+        if n > 1 and z * math.sqrt(variance / n) <= rel_precision * abs(mean):
+            break
+    return DelayEstimate(mean, variance, n)
+
+
+def _estimate(func, args, get_delay, num_samples, rel_precision, z):
+    estimate = _estimates.get(func)
+    if estimate is None:
+        estimate = _analytic_estimate(func, args, get_delay)
+        if estimate is None:
+            estimate = _sampled_estimate(lambda: get_delay(func(*args)), num_samples, rel_precision, z)
+        _estimates[func] = estimate
+    return estimate
+
+
+def _interarrival_function(behavior_func):
+    """Returns the interarrival_time function that BPMNStartEvent wraps in its behavior, or None."""
+    code = getattr(behavior_func, "__code__", None)
+    if code is not None and "interarrival_time_f" in code.co_freevars:
+        return behavior_func.__closure__[code.co_freevars.index("interarrival_time_f")].cell_contents
+    return None
+
+
+def estimate_interarrival(behavior_func, prefix, num_samples=1000, rel_precision=0.01, z=1.96):
+    """
+    Estimates the interarrival time of a start event from its behavior. The interarrival_time function of a
+    BPMNStartEvent is analysed directly: expovariate and uniform are recognised and give the exact mean and variance.
+    Otherwise the behavior is sampled until the z-confidence interval of the mean is within rel_precision
+    of the mean, with at most num_samples samples. The result is cached per behavior function.
+    """
+    interarrival_f = _interarrival_function(behavior_func)
+    if interarrival_f is not None:
+        estimate = _estimate(interarrival_f, (), lambda delay: delay, num_samples, rel_precision, z)
+    else:
+        estimate = _estimate(behavior_func, (prefix + "0",), lambda result: result[0].delay,
+                             num_samples, rel_precision, z)
+    return estimate
+
+
+def estimate_service(behavior_func, num_samples=1000, rel_precision=0.01, z=1.96):
+    """
+    Estimates the service time of a task from the behavior of its start event, like estimate_interarrival.
+    """
+    return _estimate(behavior_func, ("case", "resource"), lambda result: result[0].delay,
+                     num_samples, rel_precision, z)
+
+
+def clear_estimates():
+    """Forgets the cached estimates, e.g. after changing the distributions of a model."""
+    _estimates.clear()
+
 
 def estimate_interarrival_time(behavior_func, prefix, num_samples=1000):
-    total_delay = 0.0
-    for _ in range(num_samples):
-        result = behavior_func(prefix + "0")
-        total_delay += float(result[0].delay)
-    return total_delay / num_samples
+    return estimate_interarrival(behavior_func, prefix, num_samples=num_samples).mean
 
 def estimate_service_time(behavior_func, num_samples=1000):
-    total_delay = 0.0
-    for _ in range(num_samples):
-        result = behavior_func("case", "resource")
-        total_delay += float(result[0].delay)
-    return total_delay / num_samples
+    return estimate_service(behavior_func, num_samples=num_samples).mean
 
 # -----------------------------
 # Rework-aware visits-per-case
@@ -111,11 +305,27 @@ def _visits_per_case(sim_problem, config):
 # Main
 # -----------------------------
 
-def calculate_optimal_resources(sim_problem, config_path="config.json", num_samples=1000):
+def calculate_optimal_resources(sim_problem, config_path="config.json", num_samples=1000,
+                                target_wait=None, service_level=None, queue_model="mgc", visits=None):
     """
     Simple rework-aware sizing at 100% utilization:
       c_task = ceil( lambda_global * visits_per_case[task] * E[S_task] )
+
+    With a target_wait and/or service_level, every task instead gets the smallest c that meets the target as a
+    queue with arrival rate lambda_global * visits_per_case[task], see queueing.size_task:
+      - target_wait: maximum mean waiting time, in simulation time units.
+      - service_level: (t, fraction), at least this fraction of cases waits at most t.
+      - queue_model: "mmc" for M/M/c (Erlang-C), or "mgc" (default) to account for the estimated
+        variance of interarrival and service times with the Allen-Cunneen approximation.
+    The utilization and expected queue length per task are printed next to the recommendation.
+
+    visits overrides the visits per case per task, e.g. with NetworkModel(...).sample().visit_ratios() from
+    network_analyzer, which also accounts for XOR and AND splits.
     """
+    if queue_model not in ("mmc", "mgc"):
+        raise ValueError(f"queue_model must be 'mmc' or 'mgc', got '{queue_model}'")
+    queueing = target_wait is not None or service_level is not None
+
     # Load config (optional)
     try:
         with open(config_path, "r") as f:
@@ -129,25 +339,39 @@ def calculate_optimal_resources(sim_problem, config_path="config.json", num_samp
         raise ValueError("Expected exactly one start event")
     start_event = start_events[0]
     prefix = start_event.get_id().split("<")[0]
-    mean_interarrival_time = estimate_interarrival_time(start_event.behavior, prefix, num_samples=num_samples)
+    interarrival = estimate_interarrival(start_event.behavior, prefix, num_samples=num_samples)
+    mean_interarrival_time = interarrival.mean
     arrival_rate = 1.0 / mean_interarrival_time if mean_interarrival_time > 0 else 0.0
 
     # Rework-aware expected visits per case (per task)
-    vpc = _visits_per_case(sim_problem, config)
+    vpc = visits if visits is not None else _visits_per_case(sim_problem, config)
 
     # Tasks
     task_start_events = [e for e in sim_problem.events if e.get_id().endswith("<task:start>")]
     resource_needs = {}
     current_resources = {}
+    sizings = {}
 
     for event in task_start_events:
         task_name = event.get_id().split("<")[0]
-        mean_service_time = estimate_service_time(event.behavior, num_samples=num_samples)
+        service = estimate_service(event.behavior, num_samples=num_samples)
+        mean_service_time = service.mean
 
         # 100% utilization with rework: lambda_task = lambda_global * visits_per_case
         lambda_task = arrival_rate * float(vpc.get(task_name, 1.0))
-        required = lambda_task * mean_service_time
-        optimal = max(1, math.ceil(required)) if required > 0 else 1
+        if queueing:
+            if queue_model == "mgc":
+                scv_arrival = _scv(interarrival)
+                scv_service = _scv(service)
+            else:
+                scv_arrival = scv_service = 1.0
+            sizing = size_task(lambda_task, mean_service_time, target_wait=target_wait, service_level=service_level,
+                               scv_arrival=scv_arrival, scv_service=scv_service)
+            sizings[task_name] = sizing
+            optimal = sizing.resources
+        else:
+            required = lambda_task * mean_service_time
+            optimal = max(1, math.ceil(required)) if required > 0 else 1
 
         # current pool (best-effort: incoming[1])
         try:
@@ -162,6 +386,8 @@ def calculate_optimal_resources(sim_problem, config_path="config.json", num_samp
     # Simple messages
     if any(current_resources[t] < resource_needs[t] for t in resource_needs):
         print("\nThe amount of resources is not ideal and may cause bottlenecks.\n")
+    elif queueing:
+        print("\nResources look adequate (targets are met).\n")
     else:
         print("\nResources look adequate (at 100% utilization).\n")
 
@@ -172,5 +398,13 @@ def calculate_optimal_resources(sim_problem, config_path="config.json", num_samp
             print(f"The amount of resources for {task} is already ideal: {current}")
         else:
             print(f"{task} should have {optimal} resources, but currently has {current}")
+        if task in sizings:
+            sizing = sizings[task]
+            print(f"  with {optimal}: utilization {sizing.utilization:.0%}, expected queue length "
+                  f"{sizing.queue_length:.2f}, mean wait {sizing.mean_wait:.2f}")
 
     return resource_needs
+
+def _scv(estimate):
+    """Squared coefficient of variation of a DelayEstimate."""
+    return estimate.variance / estimate.mean ** 2 if estimate.mean > 0 else 1.0
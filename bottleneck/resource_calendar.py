@@ -0,0 +1,322 @@
+import heapq
+import itertools
+from datetime import datetime, timedelta
+
+from simpn.simulator import SimToken
+
+INITIAL_TIME = datetime(2020, 1, 1)  # Matches EventLogReporter default
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+MINUTES_PER_DAY = 24 * 60
+
+
+def to_minutes(dt, initial_time=INITIAL_TIME):
+    """Simulation time (in minutes) of a datetime."""
+    return (dt - initial_time).total_seconds() / 60
+
+
+def describe_period(period, prefix="From"):
+    """Describes a period of the bottleneck configuration for the console, e.g. 'From 2020-12-24 to 2020-12-26'."""
+    every = period.get("every")
+    if every is None:
+        return f"{prefix} {period['start_date']} to {period['end_date']}"
+    if every == "week":
+        return "Every " + ", ".join(period["days"])
+    return f"Every year from {period['start']} to {period['end']}"
+
+
+def _weekly_occurrences(days, initial_time):
+    """(start, end) in minutes of every run of consecutive days, week after week."""
+    unknown = [day for day in days if day not in WEEKDAYS]
+    if unknown or not days:
+        raise ValueError(f"Invalid days for a weekly period: {days}, use {', '.join(WEEKDAYS)}")
+    selected = set(WEEKDAYS.index(day) for day in days)
+    if len(selected) == 7:
+        runs = [(0, 7)]  # the whole week, one occurrence after the other
+    else:
+        runs = []
+        for day in sorted(selected):
+            if (day - 1) % 7 in selected:
+                continue  # not the first day of a run
+            length = 1
+            while (day + length) % 7 in selected:
+                length += 1
+            runs.append((day, length))
+    week_start = to_minutes(datetime(initial_time.year, initial_time.month, initial_time.day)
+                            - timedelta(days=initial_time.weekday()), initial_time)
+    while True:
+        for day, length in runs:
+            start = week_start + day * MINUTES_PER_DAY
+            yield start, start + length * MINUTES_PER_DAY
+        week_start += 7 * MINUTES_PER_DAY
+
+
+def _yearly_occurrences(start, end, initial_time):
+    """(start, end) in minutes of a period given as month-day ('12-24') in every year."""
+    try:
+        start_month, start_day = (int(part) for part in start.split("-"))
+        end_month, end_day = (int(part) for part in end.split("-"))
+    except ValueError:
+        raise ValueError(f"Invalid yearly period '{start}' to '{end}', use month-day, e.g. '12-24'")
+    wraps = (end_month, end_day) <= (start_month, start_day)
+    year = initial_time.year - 1
+    while True:
+        try:
+            occurrence_start = datetime(year, start_month, start_day)
+            occurrence_end = datetime(year + 1 if wraps else year, end_month, end_day)
+        except ValueError:
+            year += 1  # February 29 in a year without it
+            continue
+        yield to_minutes(occurrence_start, initial_time), to_minutes(occurrence_end, initial_time)
+        year += 1
+
+
+def occurrences(period, initial_time=INITIAL_TIME):
+    """
+    Returns an iterator over the (start, end) times in minutes of a period of the bottleneck configuration:
+    - {"start_date": "2020-12-24", "end_date": "2020-12-26"}: once, up to (not including) the end date.
+    - {"every": "week", "days": ["Saturday", "Sunday"]}: every week, consecutive days as one period.
+    - {"every": "year", "start": "12-24", "end": "12-26"}: every year, e.g. for holidays.
+    """
+    every = period.get("every")
+    if every is None:
+        if "start_date" not in period or "end_date" not in period:
+            raise ValueError(f"A period needs a start_date and end_date, or 'every': {period}")
+        start = to_minutes(datetime.strptime(period["start_date"], "%Y-%m-%d"), initial_time)
+        end = to_minutes(datetime.strptime(period["end_date"], "%Y-%m-%d"), initial_time)
+        if end <= start:
+            raise ValueError(f"Period ends before it starts: {period}")
+        return iter([(start, end)])
+    if every == "week":
+        return _weekly_occurrences(period.get("days", []), initial_time)
+    if every == "year":
+        return _yearly_occurrences(period.get("start", ""), period.get("end", ""), initial_time)
+    raise ValueError(f"Invalid recurrence '{every}', use 'week' or 'year'")
+
+
+class _Pool:
+    """
+    The resources of one place that the calendar has taken away, or will take away when they are released.
+
+    Resources are released by putting them back in the place, by whichever event does so: the task's complete event,
+    a behavior that rework or another extension put in its place, or any other event. The pool therefore watches the
+    place itself: it replaces the place's add_token, which the simulator calls for every token that an event produces,
+    and keeps back the resources that a period is waiting for.
+    """
+    def __init__(self, place):
+        self.place = place
+        self.off_duty = []          # resources taken away by number
+        self.pending_count = 0      # number of resources to take away when they are released
+        self.removals = {}          # resource -> number of active periods that take it away by name
+        self.removed = set()        # resources taken away by name
+        self.pending = set()        # resources to take away by name when they are released
+        self.add_token = place.add_token
+        place.add_token = self._add_token
+
+    def _add_token(self, token, count=1):
+        if (self.pending_count > 0 or self.pending) and self.take_on_release(token.value):
+            return
+        self.add_token(token, count)
+
+    def put_back(self, resource, time):
+        """Puts a resource that the calendar took away back in the place."""
+        self.add_token(SimToken(resource, time=time))
+
+    def take_on_release(self, resource):
+        """Takes a released resource away if a period is waiting for it; returns whether it did."""
+        if resource in self.pending:
+            self.pending.discard(resource)
+            self.removed.add(resource)
+            return True
+        if self.pending_count > 0:
+            self.pending_count -= 1
+            self.off_duty.append(resource)
+            return True
+        return False
+
+
+class ResourceCalendar:
+    """
+    A timeline of capacity changes of the resource pools of a model, applied by one timed event.
+
+    The changes are kept in a heap ordered by time, so adding or applying a change costs O(log n), whatever the
+    number of tasks and periods. A single token on the calendar's place carries the time of the next change; the
+    calendar event fires at that time, applies the due changes and puts the token back for the change after.
+    Recurring periods schedule their next occurrence when the current one starts, so the timeline holds at most two
+    entries per period.
+
+    Resources that are busy when they should leave the pool are taken away as soon as they are put back in it, so
+    the calendar can be created before or after the other extensions that change the events of the tasks.
+    Use get_calendar to share one calendar per model.
+
+    :param sim_problem: The SimProblem instance.
+    :param initial_time: The datetime of simulation time 0.
+    :param name: Name of the calendar's place and event.
+    """
+    def __init__(self, sim_problem, initial_time=INITIAL_TIME, name="resource_calendar"):
+        self.sim_problem = sim_problem
+        self.initial_time = initial_time
+        self.timeline = []
+        self._sequence = itertools.count()
+        self.pools = {}
+        self.applied = 0  # number of changes applied so far
+        self.timer = sim_problem.add_var(name)
+        self.event = sim_problem.add_event([self.timer], [self.timer], self._fire, name=f"{name}<calendar>")
+        self._firing = False
+
+    def schedule(self, time, action):
+        """Calls action(time) at simulation time `time`."""
+        heapq.heappush(self.timeline, (time, next(self._sequence), action))
+        if not self._firing:
+            self._set_timer()
+
+    def _set_timer(self):
+        # Keeps the single timer token at the time of the first change
+        time = max(self.timeline[0][0], self.sim_problem.clock)
+        if len(self.timer.marking) > 0:
+            if self.timer.marking[0].time <= time:
+                return
+            self.timer.remove_token(self.timer.marking[0])
+        self.timer.put(None, time=time)
+
+    def _fire(self, _):
+        now = self.sim_problem.clock
+        self._firing = True
+        try:
+            while self.timeline and self.timeline[0][0] <= now:
+                _, _, action = heapq.heappop(self.timeline)
+                action(now)
+                self.applied += 1
+        finally:
+            self._firing = False
+        if not self.timeline:
+            return [None]
+        return [SimToken(None, delay=self.timeline[0][0] - now)]
+
+    def pool(self, task):
+        """Returns the resource place of a task."""
+        event = self.sim_problem.id2node.get(f"{task}<task:start>")
+        if event is None or len(event.incoming) < 2:
+            raise ValueError(f"No start event found for task {task}")
+        return event.incoming[1]
+
+    def _pool_state(self, place):
+        state = self.pools.get(place)
+        if state is None:
+            state = self.pools[place] = _Pool(place)
+        return state
+
+    def remove(self, place, resources, time):
+        """Takes resources out of the pool: a number of them (the first free ones) or a list of names."""
+        state = self._pool_state(place)
+        if isinstance(resources, int):
+            count = resources
+            while count > 0 and len(place.marking) > 0:
+                token = place.marking[0]
+                place.remove_token(token)
+                state.off_duty.append(token.value)
+                count -= 1
+            state.pending_count += count
+        else:
+            free = {token.value: token for token in place.marking}
+            for resource in resources:
+                state.removals[resource] = state.removals.get(resource, 0) + 1
+                if state.removals[resource] > 1:
+                    continue  # already taken away by an overlapping period
+                if resource in free:
+                    place.remove_token(free.pop(resource))
+                    state.removed.add(resource)
+                else:
+                    state.pending.add(resource)
+
+    def restore(self, place, resources, time):
+        """Puts resources that remove took away back in the pool."""
+        state = self._pool_state(place)
+        if isinstance(resources, int):
+            cancelled = min(state.pending_count, resources)
+            state.pending_count -= cancelled
+            for _ in range(min(resources - cancelled, len(state.off_duty))):
+                state.put_back(state.off_duty.pop(), time)
+        else:
+            for resource in resources:
+                state.removals[resource] = state.removals.get(resource, 0) - 1
+                if state.removals[resource] > 0:
+                    continue
+                del state.removals[resource]
+                if resource in state.removed:
+                    state.removed.discard(resource)
+                    state.put_back(resource, time)
+                else:
+                    state.pending.discard(resource)
+
+    def get_state(self):
+        """The number of changes applied and the state of every pool, by place id, e.g. to checkpoint the model."""
+        return {"applied": self.applied,
+                "pools": {place.get_id(): (list(state.off_duty), state.pending_count, dict(state.removals),
+                                           set(state.removed), set(state.pending))
+                          for place, state in self.pools.items()}}
+
+    def set_state(self, state):
+        """
+        Brings the calendar of a freshly built model to a state of get_state. The changes are actions, which cannot be
+        stored, so the changes that were applied are applied again, in the same order, to rebuild the timeline. They
+        also change the marking, so restore the marking afterwards.
+        """
+        self._firing = True
+        try:
+            while self.applied < state["applied"] and self.timeline:
+                time, _, action = heapq.heappop(self.timeline)
+                action(time)
+                self.applied += 1
+        finally:
+            self._firing = False
+        for place_id, (off_duty, pending_count, removals, removed, pending) in state["pools"].items():
+            pool = self._pool_state(self.sim_problem.id2node[place_id])
+            pool.off_duty = list(off_duty)
+            pool.pending_count = pending_count
+            pool.removals = dict(removals)
+            pool.removed = set(removed)
+            pool.pending = set(pending)
+
+    def is_pending(self, place, resource):
+        """Whether the calendar waits for a busy resource to be released, to take it away."""
+        state = self.pools.get(place)
+        return state is not None and resource in state.pending
+
+    def taken(self, place, resource):
+        """Records that a resource the calendar was waiting for has been taken off its task, e.g. preempted."""
+        state = self._pool_state(place)
+        state.pending.discard(resource)
+        state.removed.add(resource)
+
+    def add_period(self, place, period):
+        """
+        Takes period["resources_to_remove"] (a number or a list of names) out of the pool during the period,
+        see occurrences for the formats of one-off and recurring periods.
+        """
+        resources = period.get("resources_to_remove")
+        if not (isinstance(resources, int) or isinstance(resources, list)):
+            raise ValueError(f"resources_to_remove must be a number or a list of resources: {period}")
+        times = occurrences(period, self.initial_time)
+
+        def start(time, occurrence_end):
+            self.remove(place, resources, time)
+            self.schedule(occurrence_end, lambda t: self.restore(place, resources, t))
+            schedule_next()
+
+        def schedule_next():
+            for occurrence_start, occurrence_end in times:
+                if occurrence_end > 0:  # skip the occurrences that ended before the simulation starts
+                    self.schedule(max(occurrence_start, 0), lambda t: start(t, occurrence_end))
+                    return
+
+        self._pool_state(place)
+        schedule_next()
+
+
+def get_calendar(sim_problem, initial_time=INITIAL_TIME):
+    """Returns the ResourceCalendar of the simulation problem, creating it on first use."""
+    calendar = getattr(sim_problem, "resource_calendar", None)
+    if calendar is None:
+        calendar = ResourceCalendar(sim_problem, initial_time)
+        sim_problem.resource_calendar = calendar
+    return calendar
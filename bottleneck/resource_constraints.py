@@ -1,5 +1,8 @@
+import ast
 import json
 
+from case_record import CaseRecord, case_attributes
+
 def print_resource_constraints(config):
     """
     Prints the resource constraints defined in the config to the console, 
@@ -31,9 +34,72 @@ def print_resource_constraints(config):
                     print(f"  - If {condition_str}: Only resources {resources_str} are allowed.")
         print()  # Add a blank line for readability
 
+def _equality_test(condition_str):
+    """
+    Returns (attribute, value) if the condition has the form attribute == literal (or literal == attribute),
+    else None.
+    """
+    try:
+        node = ast.parse(condition_str, mode='eval').body
+    except SyntaxError:
+        return None
+    if not (isinstance(node, ast.Compare) and len(node.ops) == 1 and isinstance(node.ops[0], ast.Eq)):
+        return None
+    left, right = node.left, node.comparators[0]
+    if not isinstance(left, ast.Name):
+        left, right = right, left
+    if not isinstance(left, ast.Name):
+        return None
+    try:
+        value = ast.literal_eval(right)
+        hash(value)
+    except (ValueError, TypeError, SyntaxError):
+        return None
+    return left.id, value
+
+def compile_decision_table(conditions):
+    """
+    Compiles the condition list of a task into a function that maps the case attributes to the set of
+    allowed resources, or to None if no condition holds and any resource is allowed.
+    As before, the first condition that holds decides.
+
+    If every condition tests the same attribute for equality with a literal (e.g. loanType == 'personal'),
+    the table is a dict from attribute value to resource set. Otherwise the conditions are compiled once
+    and evaluated in order.
+
+    :param conditions: The 'conditions' list of a resource constraint in config.json.
+    :return: A function attributes -> frozenset of resources or None.
+    """
+    tests = [_equality_test(cond['condition']) for cond in conditions]
+    if tests and all(test is not None for test in tests) and len({name for name, _ in tests}) == 1:
+        attribute = tests[0][0]
+        table = {}
+        for (_, value), cond in zip(tests, conditions):
+            table.setdefault(value, frozenset(cond['resources']))
+
+        def allowed_resources(attributes):
+            if attribute not in attributes:
+                raise NameError(f"name '{attribute}' is not defined")
+            try:
+                return table.get(attributes[attribute])
+            except TypeError:  # unhashable value, cannot be equal to any literal in the table
+                return None
+        return allowed_resources
+
+    compiled = [(compile(cond['condition'], '<resource constraint>', 'eval'), frozenset(cond['resources']))
+                for cond in conditions]
+
+    def allowed_resources(attributes):
+        for code, resources in compiled:
+            if eval(code, {}, attributes):
+                return resources
+        return None
+    return allowed_resources
+
 def create_guard(task_name, config):
     """
     Creates a guard function for a specific task based on resource constraints in the config.
+    The conditions are compiled into a decision table once, see compile_decision_table.
     
     :param task_name: The name of the task (e.g., 'pre_approval_check').
     :param config: The configuration dictionary from config.json.
@@ -41,19 +107,29 @@ def create_guard(task_name, config):
     """
     task_constraints = next((tc for tc in config.get('resource_constraints', []) if tc['task'] == task_name), None)
     if task_constraints:
-        def guard(c, r):
+        allowed_resources = compile_decision_table(task_constraints['conditions'])
+        # The simulator tries the same case with every free resource, so remember the result for the last case.
+        # A CaseRecord keeps its identity while rework changes it in place, so its version is part of the key.
+        last_case = None
+        last_version = None
+        last_allowed = None
+
+        def guard(c, r, *_):
             """
             Checks if the resource is allowed to perform the task for the case.
             
-            :param c: Case token as (case_id, (attributes, rework_counts)).
+            :param c: Case token, a CaseRecord or (case_id, (attributes, rework_counts)).
             :param r: Resource identifier (e.g., 's1').
+            :param _: Further inputs of the start event, e.g. the gate of a task constraint.
             :return: True if allowed, False otherwise.
             """
-            attributes = c[1][0]  # Extract attributes from case token
-            for condition in task_constraints['conditions']:
-                if eval(condition['condition'], {}, attributes):
-                    return r in condition['resources']
-            return True  # No conditions met means any resource is allowed
+            nonlocal last_case, last_version, last_allowed
+            version = c.version if c.__class__ is CaseRecord else None
+            if c is not last_case or version != last_version:
+                last_allowed = allowed_resources(case_attributes(c))
+                last_case = c
+                last_version = version
+            return last_allowed is None or r in last_allowed  # No conditions met means any resource is allowed
         return guard
     return None
 
@@ -0,0 +1,221 @@
+import math
+from bisect import bisect_right
+
+from simpn.simulator import SimToken
+
+from resource_calendar import get_calendar, INITIAL_TIME, MINUTES_PER_DAY, WEEKDAYS
+from task_constraints import minute_of_day
+
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+SHIFT_END_POLICIES = ("finish", "preempt", "handover")
+
+
+class ShiftCalendar:
+    """
+    The working times of a resource as a weekly template of on-duty intervals, precomputed in minutes since Monday
+    00:00. Finding the next shift start or end is a bisect in the template, however long the simulation runs.
+
+    :param definition: {"days": ["Monday", ...], "hours": [["09:00", "12:30"], ["13:00", "17:00"]]}. Days default to
+        every day and hours to the whole day; a shift that ends before it starts ("22:00" to "06:00") ends the next day.
+    :param initial_time: The datetime of simulation time 0.
+    """
+    def __init__(self, definition, initial_time=INITIAL_TIME):
+        days = definition.get("days", WEEKDAYS)
+        unknown = [day for day in days if day not in WEEKDAYS]
+        if unknown:
+            raise ValueError(f"Invalid days {unknown}, use {', '.join(WEEKDAYS)}")
+        hours = definition.get("hours", [["00:00", "24:00"]])
+        if hours and isinstance(hours[0], str):
+            hours = [hours]  # a single shift per day
+
+        pieces = []
+        for day in days:
+            base = WEEKDAYS.index(day) * MINUTES_PER_DAY
+            for start_text, end_text in hours:
+                start, end = minute_of_day(start_text), minute_of_day(end_text)
+                if end <= start:
+                    end += MINUTES_PER_DAY
+                start, end = base + start, base + end
+                if end > MINUTES_PER_WEEK:  # Sunday night into Monday
+                    pieces.append((0, end - MINUTES_PER_WEEK))
+                    end = MINUTES_PER_WEEK
+                pieces.append((start, end))
+        merged = []
+        for start, end in sorted(pieces):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        self.starts = [start for start, _ in merged]
+        self.ends = [end for _, end in merged]
+
+        # Shift changes within a week: (minute, on duty after it); a shift over the week boundary does not change
+        self.changes = []
+        for start, end in merged:
+            self.changes.append((start, True))
+            self.changes.append((end, False))
+        if self.changes and self.changes[0] == (0, True) and self.changes[-1] == (MINUTES_PER_WEEK, False):
+            self.changes = self.changes[1:-1]
+        self.change_minutes = [minute for minute, _ in self.changes]
+
+        # Simulation time of the Monday 00:00 before time 0
+        self.origin = -(initial_time.weekday() * MINUTES_PER_DAY + initial_time.hour * 60 + initial_time.minute)
+
+    def is_on_duty(self, t):
+        offset = (t - self.origin) % MINUTES_PER_WEEK
+        i = bisect_right(self.starts, offset) - 1
+        return i >= 0 and offset < self.ends[i]
+
+    def next_change(self, t):
+        """Returns (time, on duty after it) of the first shift start or end after t, or (inf, None) if there is none."""
+        if not self.changes:
+            return math.inf, None
+        week, offset = divmod(t - self.origin, MINUTES_PER_WEEK)
+        i = bisect_right(self.change_minutes, offset)
+        if i == len(self.changes):
+            week += 1
+            i = 0
+        minute, on_duty = self.changes[i]
+        return self.origin + week * MINUTES_PER_WEEK + minute, on_duty
+
+
+class _ShiftGroup:
+    """The resources that work the same shifts, with what happens to their work at the end of a shift."""
+    def __init__(self, calendar, shift_calendar, policy, task_starts):
+        self.calendar = calendar
+        self.shift_calendar = shift_calendar
+        self.policy = policy
+        self.resources = []  # (pool place, resource)
+        self.task_starts = task_starts  # pool place -> start events of the tasks that use it
+
+    def start(self):
+        if not self.shift_calendar.is_on_duty(0):
+            self.calendar.schedule(0, self.off_duty)
+        else:
+            self.schedule_next(0)
+
+    def schedule_next(self, time):
+        change, on_duty = self.shift_calendar.next_change(time)
+        if change != math.inf:
+            self.calendar.schedule(change, self.on_duty if on_duty else self.off_duty)
+
+    def off_duty(self, time):
+        for place, resource in self.resources:
+            self.calendar.remove(place, [resource], time)
+        if self.policy != "finish":
+            # Only after all free resources of the group have left, so that work is not handed over to them
+            for place, resource in self.resources:
+                if self.calendar.is_pending(place, resource):
+                    self._interrupt(place, resource, time)
+        self.schedule_next(time)
+
+    def on_duty(self, time):
+        for place, resource in self.resources:
+            self.calendar.restore(place, [resource], time)
+        self.schedule_next(time)
+
+    def _interrupt(self, place, resource, time):
+        # The resource is busy: find its task, and put the case back in the queue or give it to a colleague
+        for start_event in self.task_starts[place]:
+            busy = start_event.outgoing[0]
+            token = next((t for t in busy.marking if t.value[1] == resource), None)
+            if token is None:
+                continue
+            if self.policy == "handover":
+                colleague = next((t for t in place.marking if t.time <= time), None)
+                if colleague is None:
+                    return  # nobody on duty to hand over to, so the resource finishes the task
+                place.remove_token(colleague)
+                busy.remove_token(token)
+                busy.add_token(SimToken((token.value[0], colleague.value) + tuple(token.value[2:]), time=token.time))
+            else:
+                busy.remove_token(token)
+                start_event.incoming[0].put(token.value[0], time=time)
+            self.calendar.taken(place, resource)
+            return
+
+
+def _resource_pools(sim_problem):
+    """
+    Returns {resource: pool place}, {pool name: pool place} and {pool place: task start events} for the resource
+    pools of the tasks.
+    """
+    pools = {}
+    task_starts = {}
+    for event in sim_problem.events:
+        if event.get_id().endswith("<task:start>") and len(event.incoming) > 1:
+            pools[event.incoming[1].get_id()] = event.incoming[1]
+            task_starts.setdefault(event.incoming[1], []).append(event)
+    resources = {}
+    for place in pools.values():
+        for token in place.marking:
+            resources[token.value] = place
+    return resources, pools, task_starts
+
+
+def apply_shifts(sim_problem, config):
+    """
+    Takes resources out of their pool outside their shifts, as configured in the "shifts" section:
+
+        "shifts": {
+          "calendars": {
+            "office": {"days": ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"],
+                       "hours": [["09:00", "12:30"], ["13:00", "17:00"]], "at_shift_end": "finish"}
+          },
+          "resources": {"officer1": "office", "credit_analyst": "office"}
+        }
+
+    "resources" maps a resource, or a whole resource pool, to its calendar. "at_shift_end" decides what happens to a
+    task that is still running when the shift ends:
+    - "finish": the resource completes it and leaves the pool when it is done.
+    - "preempt": the task is interrupted and the case goes back to the queue, to start over with another resource.
+    - "handover": a free colleague from the same pool takes over the rest of the task; the resource finishes it if
+      no colleague is free.
+    The reporters keep the tasks in progress by case and task, so an interrupted task is logged once: a preempted
+    task from its new start, a handed over task from its first start and with the colleague as its resource.
+
+    The shift changes are applied from the model's ResourceCalendar, together with the time-based bottlenecks, so a
+    resource that is on holiday stays away when its shift starts.
+
+    :param sim_problem: The SimProblem instance, with its tasks and resources.
+    :param config: Configuration dictionary.
+    :return: The ShiftCalendar per calendar name.
+    """
+    shifts = config.get("shifts")
+    if not shifts:
+        print("No shifts applied.")
+        return {}
+    calendar = get_calendar(sim_problem)
+    resources, pools, task_starts = _resource_pools(sim_problem)
+
+    groups = {}
+    shift_calendars = {}
+    for name, definition in shifts.get("calendars", {}).items():
+        policy = definition.get("at_shift_end", "finish")
+        if policy not in SHIFT_END_POLICIES:
+            raise ValueError(f"Invalid at_shift_end '{policy}' for shift calendar {name}, use one of {SHIFT_END_POLICIES}")
+        shift_calendars[name] = ShiftCalendar(definition, calendar.initial_time)
+        groups[name] = _ShiftGroup(calendar, shift_calendars[name], policy, task_starts)
+
+    print("\nApplying Shifts:\n")
+    for key, name in shifts.get("resources", {}).items():
+        if name not in groups:
+            raise ValueError(f"Unknown shift calendar '{name}' for {key}")
+        if key in pools:
+            members = [(pools[key], token.value) for token in pools[key].marking]
+        elif key in resources:
+            members = [(resources[key], key)]
+        else:
+            raise ValueError(f"No resource or resource pool '{key}' in the model")
+        groups[name].resources.extend(members)
+        print(f"- {key}: works shift '{name}' ({', '.join(str(resource) for _, resource in members)})")
+
+    for name, group in groups.items():
+        if group.resources:
+            definition = shifts["calendars"][name]
+            hours = definition.get("hours", [["00:00", "24:00"]])
+            hours = [hours] if hours and isinstance(hours[0], str) else hours
+            print(f"  Shift '{name}': {', '.join(definition.get('days', ['every day']))}, "
+                  f"{', '.join(f'{start}-{end}' for start, end in hours)}; at shift end: {group.policy}")
+            group.start()
+    return shift_calendars
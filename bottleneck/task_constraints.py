@@ -1,48 +1,186 @@
+import math
+from bisect import bisect_right
 from datetime import datetime, timedelta
-from simpn.simulator import SimProblem
+from simpn.simulator import SimProblem, SimToken
 import simpn.prototypes as prototype
+from model_index import model_index
+
+INITIAL_TIME = datetime(2020, 1, 1)  # Matches EventLogReporter default
+MINUTES_PER_DAY = 24 * 60
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+DAYS_PER_EXTENSION = 366     # the calendar computes its open intervals one year at a time
+MAX_DAYS_CLOSED = 10 * 366   # a task that is closed for longer than this is considered never to open again
+
+
+def minute_of_day(text):
+    """Minutes since midnight of a time of day given as 'HH:MM'."""
+    try:
+        hours, minutes = (int(part) for part in text.split(":"))
+    except ValueError:
+        raise ValueError(f"Invalid time '{text}', use HH:MM, e.g. '09:00'")
+    return hours * 60 + minutes
+
+
+class TaskCalendar:
+    """
+    The times at which a task may start, as a sorted list of open intervals in simulation minutes.
+
+    The intervals are computed from the constraint once per day of the calendar, a year ahead at a time, so checking
+    whether the task is open is a lookup instead of a date conversion. Supported constraints:
+    - {"type": "day_of_week", "days": ["Monday", "Thursday"]}
+    - {"type": "date_range", "start_day": 5, "end_day": 10}: days of the month.
+    - {"type": "working_hours", "hours": ["09:00", "17:00"]}: every day.
+    "hours" can also be added to the other types to open only part of the day.
+
+    :param constraint: The constraint of the task from the configuration.
+    :param initial_time: The datetime of simulation time 0.
+    """
+    def __init__(self, constraint, initial_time=INITIAL_TIME):
+        self.constraint = constraint
+        self.initial_time = initial_time
+        kind = constraint.get("type")
+        if kind == "day_of_week":
+            unknown = [day for day in constraint["days"] if day not in WEEKDAYS]
+            if unknown:
+                raise ValueError(f"Invalid days {unknown}, use {', '.join(WEEKDAYS)}")
+            weekdays = set(WEEKDAYS.index(day) for day in constraint["days"])
+            self._day_open = lambda date: date.weekday() in weekdays
+        elif kind == "date_range":
+            start_day, end_day = constraint["start_day"], constraint["end_day"]
+            self._day_open = lambda date: start_day <= date.day <= end_day
+        elif kind == "working_hours":
+            self._day_open = lambda date: True
+        else:
+            self._day_open = None  # unrecognized constraints leave the task always open
+        hours = constraint.get("hours", ["00:00", "24:00"])
+        self.open_minute, self.close_minute = minute_of_day(hours[0]), minute_of_day(hours[1])
+        if not (0 <= self.open_minute < self.close_minute <= MINUTES_PER_DAY):
+            raise ValueError(f"Invalid hours {hours}, the task must open before it closes on the same day")
+
+        self.starts = []
+        self.ends = []
+        self._days = 0  # days for which the intervals have been computed
+        self._current = (math.inf, -math.inf)  # the interval found by the last lookup
+
+    @property
+    def always_open(self):
+        return self._day_open is None
+
+    def _extend(self):
+        date = self.initial_time.date() + timedelta(days=self._days)
+        for day in range(self._days, self._days + DAYS_PER_EXTENSION):
+            if self._day_open(date):
+                start, end = day * MINUTES_PER_DAY + self.open_minute, day * MINUTES_PER_DAY + self.close_minute
+                if self.ends and self.ends[-1] == start:
+                    self.ends[-1] = end  # merge with the open interval of the day before
+                else:
+                    self.starts.append(start)
+                    self.ends.append(end)
+            date += timedelta(days=1)
+        self._days += DAYS_PER_EXTENSION
+
+    def _interval(self, t):
+        """Returns the first open interval (start, end) that ends after t, or (inf, inf) if there is none."""
+        start, end = self._current
+        if start <= t < end:
+            return self._current
+        if self.always_open:
+            return (-math.inf, math.inf)
+        while True:
+            i = bisect_right(self.ends, t)
+            if i < len(self.ends):
+                self._current = (self.starts[i], self.ends[i])
+                return self._current
+            if self._days * MINUTES_PER_DAY > t + MAX_DAYS_CLOSED * MINUTES_PER_DAY:
+                return (math.inf, math.inf)
+            self._extend()
+
+    def is_open(self, t):
+        start, end = self._interval(t)
+        return start <= t
+
+    def next_open(self, t):
+        """The first time at or after t at which the task is open (inf if it never opens again)."""
+        return max(t, self._interval(t)[0])
+
+    def next_close(self, t):
+        """The first time after t at which the task closes, for a time t at which it is open."""
+        return self._interval(t)[1]
+
 
 def make_guard(constraint):
-    initial_time = datetime(2020, 1, 1)  # Matches EventLogReporter default
+    calendar = TaskCalendar(constraint)
     def guard(*args):
         t = args[-1]  # Simulation time in minutes
-        dt = initial_time + timedelta(minutes=t)
-        if constraint["type"] == "day_of_week":
-            return dt.strftime("%A") in constraint["days"]
-        elif constraint["type"] == "date_range":
-            day = dt.day
-            return constraint["start_day"] <= day <= constraint["end_day"]
-        else:
-            return True  # Default to always enabled if type is unrecognized
+        return calendar.is_open(t)
     return guard
 
+
+def add_task_gate(sim_problem: SimProblem, start_event, calendar, name):
+    """
+    Lets start_event fire only while the calendar is open, without polling.
+    A gate place holds one token whose time is the next opening time, so the simulator wakes the task up at that
+    time by itself. The task takes and returns the gate when it starts; a timer event closes the gate at the end of
+    each open interval by moving its token to the next opening time.
+    """
+    gate = sim_problem.add_var(f"{name}<gate>")
+    timer = sim_problem.add_var(f"{name}<gate:timer>")
+    opening = calendar.next_open(0)
+    if opening == math.inf:
+        print(f"Warning: {name} never opens, its cases will wait forever.")
+    else:
+        gate.put(name, time=opening)
+        closing = calendar.next_close(opening)
+        if closing != math.inf:
+            timer.put(None, time=closing)
+
+    def close(_, gate_value):
+        now = sim_problem.clock
+        reopening = calendar.next_open(now)
+        if reopening == math.inf:
+            return [None, None]
+        closing = calendar.next_close(reopening)
+        return [SimToken(None, delay=closing - now) if closing != math.inf else None,
+                SimToken(gate_value, delay=reopening - now)]
+    sim_problem.add_event([timer, gate], [timer, gate], close, name=f"{name}<gate:close>")
+
+    original_incoming = start_event.incoming
+    original_behavior = start_event.behavior
+    original_guard = start_event.guard
+    index = model_index(sim_problem)
+    index.set_inflow(start_event, original_incoming + [gate])
+    index.set_outflow(start_event, start_event.outgoing + [gate])
+    start_event.behavior = lambda *args: list(original_behavior(*args[:len(original_incoming)])) + [SimToken(name)]
+    if original_guard is not None:
+        start_event.set_guard(lambda *args: original_guard(*args[:len(original_incoming)]))
+
+
 def apply_task_constraints(sim_problem: SimProblem, config):
     task_constraints = config.get("task_constraints", {})
     if not task_constraints:
         print("No task constraints applied.")
     else:
         print("\nApplying Task Constraints:\n")
+        index = model_index(sim_problem)
         for task_name, constraint in task_constraints.items():
-            for proto in sim_problem.prototypes:
-                if proto.name == task_name and isinstance(proto, prototype.BPMNTask):
-                    start_event = proto.events[0]  # Start event of the task
-                    time_var = sim_problem.var("time")  # Access or create time variable
-                    original_incoming = start_event.incoming
-                    start_event.set_inflow(original_incoming + [time_var])
-                    original_behavior = start_event.behavior
-                    start_event.behavior = lambda *args: original_behavior(*args[:len(original_incoming)])
-                    guard = make_guard(constraint)
-                    start_event.set_guard(guard)
-                    # Print the applied constraint
-                    if constraint["type"] == "day_of_week":
-                        days = ', '.join(constraint["days"])
-                        print(f"Applied task constraint to {task_name}: only on {days}")
-                    elif constraint["type"] == "date_range":
-                        start_day = constraint["start_day"]
-                        end_day = constraint["end_day"]
-                        print(f"Applied task constraint to {task_name}: between day {start_day} and {end_day} of the month")
-                    break
+            proto = index.prototype(task_name)
+            if isinstance(proto, prototype.BPMNTask):
+                start_event = proto.events[0]  # Start event of the task
+                calendar = TaskCalendar(constraint)
+                if not calendar.always_open:
+                    add_task_gate(sim_problem, start_event, calendar, task_name)
+                # Print the applied constraint
+                hours = f", from {constraint['hours'][0]} to {constraint['hours'][1]}" if "hours" in constraint else ""
+                if constraint["type"] == "day_of_week":
+                    days = ', '.join(constraint["days"])
+                    print(f"Applied task constraint to {task_name}: only on {days}{hours}")
+                elif constraint["type"] == "date_range":
+                    start_day = constraint["start_day"]
+                    end_day = constraint["end_day"]
+                    print(f"Applied task constraint to {task_name}: between day {start_day} and {end_day} of the month{hours}")
+                elif constraint["type"] == "working_hours":
+                    print(f"Applied task constraint to {task_name}: every day{hours}")
         # Add warning about potential bottlenecks
         if task_constraints:
             constrained_tasks = list(task_constraints.keys())
-            print(f"Warning: Task constraints applied to {', '.join(constrained_tasks)} may cause bottlenecks.")
\ No newline at end of file
+            print(f"Warning: Task constraints applied to {', '.join(constrained_tasks)} may cause bottlenecks.")
@@ -0,0 +1,95 @@
+from simpn.simulator import SimProblem, SimToken
+
+
+def case_id_of(c):
+    """Returns the case_id of a case token (case_id, (attributes, rework_counts))."""
+    return c[0]
+
+
+class ParallelJoin:
+    """
+    The branches of the cases that have arrived at a parallel join and are not joined yet: for every case key, a
+    list of the waiting tokens per inflow place. They are kept outside the marking, so snapshots of a run take them
+    with get_state (see experiments/snapshot.py). The joins of a model are in sim_problem.parallel_joins, in the
+    order in which they were added.
+
+    :param name: Name of the join.
+    :param arity: The number of inflow places.
+    """
+    def __init__(self, name, arity):
+        self.name = name
+        self.arity = arity
+        self.arrived = {}
+
+    def get_state(self):
+        """The waiting tokens as a list of (case key, tokens per inflow place), e.g. to checkpoint a run."""
+        return [(k, [list(branch) for branch in waiting]) for k, waiting in self.arrived.items()]
+
+    def set_state(self, state):
+        """Continues from a state of get_state."""
+        self.arrived.clear()
+        for k, waiting in state:
+            if len(waiting) != self.arity:
+                raise ValueError(f"The state of parallel join '{self.name}' has {len(waiting)} branches, "
+                                 f"expected {self.arity}")
+            self.arrived[k] = [list(branch) for branch in waiting]
+
+
+def add_parallel_join(sim_problem: SimProblem, inflow: list, outflow: list, name: str, behavior=None, key=case_id_of):
+    """
+    Adds a parallel join that waits until a case has arrived on every inflow place and then puts one token on the
+    outflow places. It replaces an event on all inflow places with guard=lambda c1, c2: c1 == c2, for which the
+    simulator tries every combination of the waiting tokens. Here every inflow place gets its own event
+    (named f"{name}<join:{place}>") that takes one token and files it under its case_id, so the matching
+    tokens of the other branches are found with a dictionary lookup.
+
+    Tokens are matched by case_id (see key), not by comparing the complete tokens, so branches may change
+    the attributes of a case. The tokens that wait for the other branches are kept in a ParallelJoin, which is
+    added to sim_problem.parallel_joins.
+
+    :param sim_problem: The SimProblem instance.
+    :param inflow: The places of the branches to join.
+    :param outflow: The places that receive the joined case.
+    :param name: Name of the join.
+    :param behavior: Function that gets the token values of the case, in the order of inflow, and returns the list of
+        SimTokens for outflow. By default the token from the first inflow place is passed on to every outflow place.
+    :param key: Function that returns the value on which tokens are matched, the case_id by default.
+    :return: The join events, one per inflow place.
+    """
+    if len(inflow) < 2:
+        raise ValueError(f"Parallel join '{name}' needs at least two inflow places, got {len(inflow)}")
+    if behavior is None:
+        def behavior(*tokens):
+            return [SimToken(tokens[0]) for _ in outflow]
+    arity = len(inflow)
+    join = ParallelJoin(name, arity)
+    if getattr(sim_problem, "parallel_joins", None) is None:
+        sim_problem.parallel_joins = []
+    sim_problem.parallel_joins.append(join)
+    # case key -> for each inflow place, the tokens of that case that have arrived and are not joined yet
+    arrived = join.arrived
+
+    def arrive(index):
+        def join_behavior(c):
+            k = key(c)
+            waiting = arrived.get(k)
+            if waiting is None:
+                waiting = [[] for _ in range(arity)]
+                arrived[k] = waiting
+            waiting[index].append(c)
+            if not all(waiting):
+                return [None] * len(outflow)
+            tokens = [branch.pop(0) for branch in waiting]
+            if not any(waiting):
+                del arrived[k]
+            return behavior(*tokens)
+        return join_behavior
+
+    events = []
+    for index, place in enumerate(inflow):
+        event = sim_problem.add_event([place], outflow, arrive(index), name=f"{name}<join:{place.get_id()}>")
+        # Lets model analysis tell that the events together pass on one case per arity arrivals
+        event.join_arity = arity
+        event.join_index = index
+        events.append(event)
+    return events
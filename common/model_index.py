@@ -0,0 +1,117 @@
+from simpn.simulator import SimProblem
+
+
+class ModelIndex:
+    """
+    Lookup tables for wiring extensions into a model: the prototypes by id, the start and complete events of the
+    tasks by task name, the start events of the process, and for every place the events that consume from it and the
+    events that produce to it. Finding a node this way is a dictionary lookup instead of a scan over all prototypes
+    or events, so setting up thousands of tasks stays linear in the size of the model.
+
+    The index follows the model as it grows: every lookup first indexes the events and prototypes added since the
+    previous one. Events that are rewired after they were added must be rewired through set_inflow and set_outflow
+    of the index, or passed to reindex, so that the consumers and producers stay correct.
+
+    :param sim_problem: The SimProblem to index.
+    """
+    def __init__(self, sim_problem: SimProblem):
+        self.sim_problem = sim_problem
+        self.prototypes = {}
+        self.task_starts = {}
+        self.task_completes = {}
+        self.start_events = []
+        self.consumers = {}
+        self.producers = {}
+        self._flows = {}  # event -> (incoming, outgoing) as they were indexed
+        self._events = 0
+        self._prototypes = 0
+
+    def sync(self):
+        """Indexes the events and prototypes that were added to the model since the last call."""
+        events = self.sim_problem.events
+        for i in range(self._events, len(events)):
+            self._add_event(events[i])
+        self._events = len(events)
+        prototypes = self.sim_problem.prototypes
+        for i in range(self._prototypes, len(prototypes)):
+            self.prototypes.setdefault(prototypes[i].get_id(), prototypes[i])
+        self._prototypes = len(prototypes)
+
+    def _add_event(self, event):
+        name = event.get_id()
+        if name.endswith("<task:start>"):
+            self.task_starts[name[:-len("<task:start>")]] = event
+        elif name.endswith("<task:complete>"):
+            self.task_completes[name[:-len("<task:complete>")]] = event
+        elif name.endswith("<start_event>"):
+            self.start_events.append(event)
+        self._add_flows(event)
+
+    def _add_flows(self, event):
+        incoming, outgoing = list(event.incoming), list(event.outgoing)
+        self._flows[event] = (incoming, outgoing)
+        for place in set(incoming):
+            self.consumers.setdefault(place, []).append(event)
+        for place in set(outgoing):
+            self.producers.setdefault(place, []).append(event)
+
+    def _remove_flows(self, event):
+        incoming, outgoing = self._flows.pop(event, ((), ()))
+        for place in set(incoming):
+            self.consumers[place].remove(event)
+        for place in set(outgoing):
+            self.producers[place].remove(event)
+
+    def reindex(self, event):
+        """Updates the consumers and producers of an event whose incoming or outgoing places were changed."""
+        self.sync()
+        self._remove_flows(event)
+        self._add_flows(event)
+
+    def set_inflow(self, event, incoming):
+        """Sets the incoming places of an event and updates the index."""
+        event.set_inflow(incoming)
+        self.reindex(event)
+
+    def set_outflow(self, event, outgoing):
+        """Sets the outgoing places of an event and updates the index."""
+        event.set_outflow(outgoing)
+        self.reindex(event)
+
+    def prototype(self, prototype_id):
+        """The prototype with the given id, or None."""
+        self.sync()
+        return self.prototypes.get(prototype_id)
+
+    def task_start(self, task):
+        """The start event of a task, or None."""
+        self.sync()
+        return self.task_starts.get(task)
+
+    def task_complete(self, task):
+        """The complete event of a task, or None."""
+        self.sync()
+        return self.task_completes.get(task)
+
+    def process_start_events(self):
+        """The start events of the process, in the order in which they were added."""
+        self.sync()
+        return list(self.start_events)
+
+    def consumers_of(self, place):
+        """The events that have the place among their incoming places, in the order in which they were indexed."""
+        self.sync()
+        return list(self.consumers.get(place, ()))
+
+    def producers_of(self, place):
+        """The events that have the place among their outgoing places, in the order in which they were indexed."""
+        self.sync()
+        return list(self.producers.get(place, ()))
+
+
+def model_index(sim_problem: SimProblem):
+    """Returns the ModelIndex of the simulation problem, creating it on first use."""
+    index = getattr(sim_problem, "model_index", None)
+    if index is None:
+        index = sim_problem.model_index = ModelIndex(sim_problem)
+    return index
@@ -0,0 +1,97 @@
+import random
+
+import numpy as np
+from simpn.simulator import SimProblem
+
+
+class SimulationRNG:
+    """
+    The random streams of one simulation: `random`, a random.Random for behaviors that draw one value at a time
+    (task durations, rework decisions, the choice between enabled events), and `numpy`, a numpy.random.Generator for
+    batched sampling (case attributes). Both are derived from one numpy SeedSequence, so a single seed reproduces
+    the whole run, and spawn() gives independent substreams for replications.
+
+    Behaviors should keep a reference to the SimulationRNG (or call its methods) rather than to the underlying
+    generators: seed() re-seeds them in place, so the behaviors of an existing model follow the new seed.
+
+    :param seed: An int, a numpy SeedSequence, or None for fresh entropy.
+    """
+    def __init__(self, seed=None):
+        self.random = random.Random()
+        self.numpy = np.random.Generator(np.random.PCG64())
+        self._on_seed = []
+        self.seed(seed)
+
+    def seed(self, seed=None):
+        """Re-seeds both streams in place and notifies the components that buffer random values (see on_seed)."""
+        if isinstance(seed, np.random.SeedSequence):
+            self.seed_sequence = seed
+        else:
+            self.seed_sequence = np.random.SeedSequence(seed)
+        random_seed, numpy_seed = [self._child(i) for i in range(2)]
+        self.random.seed(int.from_bytes(random_seed.generate_state(4).tobytes(), "little"))
+        self.numpy.bit_generator.state = np.random.PCG64(numpy_seed).state
+        for callback in self._on_seed:
+            callback()
+
+    def _child(self, index):
+        # Like SeedSequence.spawn, but without advancing the spawn counter, so seed() is repeatable
+        return np.random.SeedSequence(self.seed_sequence.entropy, spawn_key=self.seed_sequence.spawn_key + (index,))
+
+    def get_state(self):
+        """The state of both streams, e.g. to checkpoint a run (see experiments/snapshot.py)."""
+        return {"seed_sequence": self.seed_sequence, "random": self.random.getstate(),
+                "numpy": self.numpy.bit_generator.state}
+
+    def set_state(self, state):
+        """Continues both streams from a state of get_state, in place and without notifying the on_seed callbacks."""
+        self.seed_sequence = state["seed_sequence"]
+        self.random.setstate(state["random"])
+        self.numpy.bit_generator.state = state["numpy"]
+
+    def on_seed(self, callback):
+        """Registers a function to call after re-seeding, e.g. to drop values that were drawn in advance."""
+        self._on_seed.append(callback)
+
+    def spawn(self, n):
+        """Returns n SeedSequences for independent substreams, e.g. one per replication."""
+        return [self._child(2 + i) for i in range(n)]
+
+    # The random.Random methods the behaviors use
+    def uniform(self, a, b):
+        return self.random.uniform(a, b)
+
+    def expovariate(self, lambd=1.0):
+        return self.random.expovariate(lambd)
+
+    def choice(self, seq):
+        return self.random.choice(seq)
+
+    def choices(self, population, weights=None, k=1):
+        return self.random.choices(population, weights=weights, k=k)
+
+
+def get_rng(sim_problem: SimProblem, seed=None):
+    """
+    Returns the SimulationRNG of the simulation problem, creating it on first use.
+    A new SimulationRNG also takes over the choice between enabled events, unless the model has its own
+    binding priority. Passing a seed re-seeds the streams in place.
+
+    :param sim_problem: The SimProblem instance.
+    :param seed: An int, a numpy SeedSequence, or None to keep the current streams (fresh entropy when new).
+    :return: The SimulationRNG of the model.
+    """
+    rng = getattr(sim_problem, "rng", None)
+    if rng is None:
+        rng = SimulationRNG(seed)
+        sim_problem.rng = rng
+        if sim_problem.binding_priority == SimProblem.PRIORITY_QUEUE_BINDING:
+            sim_problem.set_binding_priority(rng.choice)
+    elif seed is not None:
+        rng.seed(seed)
+    return rng
+
+
+def seed_model(sim_problem: SimProblem, seed):
+    """Makes a simulation run of the model reproducible: seed(model, 42) before simulate()."""
+    return get_rng(sim_problem, seed)
@@ -0,0 +1,160 @@
+import math
+import os
+import random
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from custom_reporters import EnhancedEventLogReporter
+from kpi_reporter import KPIReporter
+from rng import seed_model
+from warmup import restore_marking
+
+# Result of one replication: its number, the SeedSequence it ran with, its KPIs and its event log shard (or None)
+ReplicationResult = namedtuple("ReplicationResult", ["replication", "seed", "kpis", "log"])
+
+# A KPI over all replications: mean, sample standard deviation and half-width of the 95% confidence interval
+KPISummary = namedtuple("KPISummary", ["mean", "std", "half_width", "values"])
+
+# All replications and their summary per KPI
+Replications = namedtuple("Replications", ["summary", "results"])
+
+# Two-sided 95% quantiles of Student's t distribution by degrees of freedom; 1.96 is used above 30
+T_QUANTILES_95 = {
+    1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306, 9: 2.262, 10: 2.228,
+    11: 2.201, 12: 2.179, 13: 2.160, 14: 2.145, 15: 2.131, 16: 2.120, 17: 2.110, 18: 2.101, 19: 2.093, 20: 2.086,
+    21: 2.080, 22: 2.074, 23: 2.069, 24: 2.064, 25: 2.060, 26: 2.056, 27: 2.052, 28: 2.048, 29: 2.045, 30: 2.042,
+}
+
+
+def _seed_model(sim_problem, seed_sequence):
+    """
+    Seeds the random streams of the model (see common/rng.py), and the global random module for behaviors that
+    still draw from it.
+    """
+    random.seed(int(seed_sequence.generate_state(1, dtype=np.uint64)[0]))
+    seed_model(sim_problem, seed_sequence)
+
+
+def simulate_replication(sim_problem, config, duration, replication, seed_sequence, log=None, warmup=0,
+                         kpi_state=None):
+    """
+    Seeds and simulates one replication of an already built model and returns its ReplicationResult.
+    The building block of run_replications, also for experiments that change the model before running it.
+    The model runs for warmup + duration from its current clock; the KPIs and the event log cover the duration
+    after the warm-up. Without a seed_sequence the model continues with its current random streams; kpi_state is the
+    state of a KPIReporter of the run the model continues (see experiments/snapshot.py).
+    """
+    if seed_sequence is not None:
+        _seed_model(sim_problem, seed_sequence)
+    warmup_time = sim_problem.clock + warmup
+    end = warmup_time + duration
+    kpi_reporter = KPIReporter(sim_problem, warmup_time=warmup_time)
+    if kpi_state is not None:
+        kpi_reporter.set_state(kpi_state)
+    reporters = [kpi_reporter]
+    if log is not None:
+        reporters.append(EnhancedEventLogReporter(log, config=config, sim_problem=sim_problem, buffer_rows=10000,
+                                                  warmup_time=warmup_time))
+    try:
+        sim_problem.simulate(end, reporters)
+    finally:
+        for reporter in reporters[1:]:
+            reporter.close()
+    return ReplicationResult(replication, seed_sequence, kpi_reporter.kpis(end), log)
+
+
+def _run_replication(factory, config, duration, replication, seed_sequence, log, warmup, warm_state):
+    sim_problem = factory(config)
+    kpi_state = None
+    if warm_state is not None:
+        restore_marking(sim_problem, warm_state)
+        kpi_state = warm_state.kpi_state
+    return simulate_replication(sim_problem, config, duration, replication, seed_sequence, log, warmup, kpi_state)
+
+
+def shard_name(output, replication):
+    """Returns the event log file of one replication: sequence.csv -> sequence_rep3.csv."""
+    stem, extension = os.path.splitext(output)
+    return f"{stem}_rep{replication}{extension}"
+
+
+def merge_shards(shards, output):
+    """
+    Merges the event log shards of the replications into one CSV file with a leading replication column,
+    and removes the shards.
+
+    :param shards: List of (replication, shard file) pairs.
+    :param output: The merged CSV file.
+    """
+    with open(output, "w") as merged:
+        header_written = False
+        for replication, shard in shards:
+            with open(shard, "r") as f:
+                header = f.readline()
+                if not header_written:
+                    merged.write("replication," + header)
+                    header_written = True
+                prefix = f"{replication},"
+                for line in f:
+                    merged.write(prefix + line)
+            os.remove(shard)
+
+
+def summarize(results):
+    """Returns the mean, standard deviation and 95% confidence half-width of every KPI over the replications."""
+    summary = {}
+    for name in results[0].kpis:
+        values = [result.kpis[name] for result in results]
+        n = len(values)
+        mean = sum(values) / n
+        std = math.sqrt(sum((v - mean) ** 2 for v in values) / (n - 1)) if n > 1 else 0.0
+        half_width = T_QUANTILES_95.get(n - 1, 1.96) * std / math.sqrt(n) if n > 1 else math.inf
+        summary[name] = KPISummary(mean, std, half_width, values)
+    return summary
+
+
+def run_replications(factory, config, num_replications, duration, seed=None, output=None, merge=False,
+                     max_workers=None, warmup=0, warm_state=None):
+    """
+    Runs independent replications of a model in parallel processes.
+
+    Every replication builds a fresh model with factory(config), so no state is shared between them, and gets its
+    own random stream spawned from one numpy SeedSequence: with the same seed, the same replications are produced
+    regardless of the number of workers.
+
+    :param factory: A module-level function config -> SimProblem, e.g. build_model from templates/sequence.py.
+    :param config: The configuration dictionary, passed to factory and to the event log reporter.
+    :param num_replications: Number of replications.
+    :param duration: Simulation duration of every replication.
+    :param seed: Seed of the SeedSequence (default: fresh entropy, which is stored in the results).
+    :param output: Event log file name; every replication writes its own shard (see shard_name), or None for no logs.
+    :param merge: Merge the shards into output, with a replication column.
+    :param max_workers: Number of processes (default: the number of CPUs).
+    :param warmup: Simulation time to run every replication before measuring, e.g. Warmup.time of find_warmup.
+    :param warm_state: A WarmState (see experiments/warmup.py) to start every replication from, instead of from an
+        empty model. The replications then share their starting point, but not their random streams. The cases in
+        progress at the start count in the cycle times if the WarmState has their start times (see warm_up).
+    :return: Replications with the summary per KPI and the result of every replication.
+    """
+    if num_replications < 1:
+        raise ValueError("num_replications must be at least 1")
+    seed_sequences = np.random.SeedSequence(seed).spawn(num_replications)
+    logs = [shard_name(output, i) if output else None for i in range(num_replications)]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(_run_replication, factory, config, duration, i, seed_sequences[i], logs[i], warmup,
+                               warm_state)
+                   for i in range(num_replications)]
+        results = [future.result() for future in futures]
+    if output and merge:
+        merge_shards([(result.replication, result.log) for result in results], output)
+        results = [result._replace(log=output) for result in results]
+    return Replications(summarize(results), results)
+
+
+def print_summary(summary):
+    """Prints the KPI summary to the console."""
+    print("\nKPIs over the replications (mean ± 95% confidence half-width):\n")
+    for name, kpi in summary.items():
+        print(f"  {name}: {kpi.mean:.4f} ± {kpi.half_width:.4f}")
@@ -0,0 +1,165 @@
+import copy
+import gzip
+import lzma
+import pickle
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from replications import Replications, simulate_replication, summarize
+from case_record import case_table, freeze_records, thaw_records
+from warmup import set_marking, snapshot_marking
+
+SNAPSHOT_VERSION = 2
+COMPRESSIONS = {"gzip": gzip.open, "lzma": lzma.open, None: open}
+
+
+def take_snapshot(sim_problem, reporters=()):
+    """
+    Returns the whole state of a simulation run as a dictionary of plain values, which can be pickled: the clock, the
+    marking with the time of every token, the random streams (the model's SimulationRNG, the case attributes drawn in
+    advance and the global random module), the resource calendar, the branches waiting at the parallel joins and the
+    class name and state of the reporters in the same order as given, for the reporters that have a get_state method.
+
+    :param sim_problem: The SimProblem instance, between two calls of simulate.
+    :param reporters: The reporters of the run, e.g. an EnhancedEventLogReporter and a KPIReporter.
+    :return: The snapshot.
+    """
+    memo = {}  # one copy per case record, also for a record that is both in the marking and waiting at a join
+    marking = snapshot_marking(sim_problem, memo)
+    rng = getattr(sim_problem, "rng", None)
+    sampler = getattr(sim_problem, "attribute_sampler", None)
+    calendar = getattr(sim_problem, "resource_calendar", None)
+    return {
+        "version": SNAPSHOT_VERSION,
+        "clock": marking.clock,
+        "marking": marking.marking,
+        "rng": rng.get_state() if rng is not None else None,
+        "attribute_sampler": sampler.get_state() if sampler is not None else None,
+        "random": random.getstate(),
+        "resource_calendar": calendar.get_state() if calendar is not None else None,
+        "parallel_joins": [freeze_records(join.get_state(), memo)
+                           for join in getattr(sim_problem, "parallel_joins", None) or []],
+        "reporters": [(type(reporter).__name__, reporter.get_state() if hasattr(reporter, "get_state") else None)
+                      for reporter in reporters],
+    }
+
+
+def restore_snapshot(sim_problem, snapshot, reporters=()):
+    """
+    Puts the state of a snapshot in a freshly built model of the same process and configuration, so that the run
+    continues where the snapshot was taken: with the same random streams, the same run follows.
+
+    :param sim_problem: A SimProblem from the same factory and configuration, that has not been simulated.
+    :param snapshot: A snapshot of take_snapshot or load_snapshot, or the file name of save_snapshot.
+    :param reporters: New reporters for the rest of the run, in the order of take_snapshot; their set_state gets the
+        cases and tasks in progress, so those are reported when they complete.
+    """
+    if isinstance(snapshot, str):
+        snapshot = load_snapshot(snapshot)
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {snapshot.get('version')}, expected {SNAPSHOT_VERSION}")
+    calendar = getattr(sim_problem, "resource_calendar", None)
+    if (calendar is None) != (snapshot["resource_calendar"] is None):
+        raise ValueError("The snapshot does not match the model: only one of them has a resource calendar")
+    if calendar is not None:
+        calendar.set_state(snapshot["resource_calendar"])  # changes the marking, so it goes first
+    joins = getattr(sim_problem, "parallel_joins", None) or []
+    if len(joins) != len(snapshot["parallel_joins"]):
+        raise ValueError(f"The snapshot does not match the model: it has {len(snapshot['parallel_joins'])} parallel "
+                         f"joins, the model {len(joins)}")
+    memo = {}
+    set_marking(sim_problem, snapshot["marking"], snapshot["clock"], memo)
+    table = case_table(sim_problem)
+    for join, state in zip(joins, snapshot["parallel_joins"]):
+        join.set_state(thaw_records(copy.deepcopy(state), table, memo))
+
+    rng = getattr(sim_problem, "rng", None)
+    if rng is not None and snapshot["rng"] is not None:
+        rng.set_state(snapshot["rng"])
+    if snapshot["attribute_sampler"] is not None:
+        # The sampler is created when the first case starts, so a fresh model does not have it yet
+        from case_attributes import attribute_sampler
+        attribute_sampler(sim_problem).set_state(snapshot["attribute_sampler"])
+    random.setstate(snapshot["random"])
+    for reporter, (_, state) in zip(reporters, snapshot["reporters"]):
+        if state is not None and hasattr(reporter, "set_state"):
+            reporter.set_state(state)
+
+
+def save_snapshot(sim_problem, filename, reporters=(), compression="gzip"):
+    """
+    Writes a snapshot of a simulation run (see take_snapshot) to a binary file: a pickle, compressed with gzip
+    (default), lzma (smaller, slower) or not at all (None).
+
+    :return: The snapshot.
+    """
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unsupported compression '{compression}', use one of {list(COMPRESSIONS)}")
+    snapshot = take_snapshot(sim_problem, reporters)
+    with COMPRESSIONS[compression](filename, "wb") as f:
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return snapshot
+
+
+def load_snapshot(filename):
+    """Reads a snapshot file of save_snapshot; the compression is recognized from the first bytes of the file."""
+    with open(filename, "rb") as f:
+        magic = f.read(6)
+    if magic[:2] == b"\x1f\x8b":
+        opener = gzip.open
+    elif magic == b"\xfd7zXZ\x00":
+        opener = lzma.open
+    else:
+        opener = open
+    with opener(filename, "rb") as f:
+        return pickle.load(f)
+
+
+def _run_branch(factory, config, snapshot, change, duration, replication, seed_sequence):
+    sim_problem = factory(config)
+    restore_snapshot(sim_problem, snapshot)
+    if change is not None:
+        change(sim_problem)
+    # The cases in progress get their cycle times from the KPIReporter of the original run, if it had one
+    kpi_state = next((state for name, state in snapshot["reporters"] if name == "KPIReporter"), None)
+    return simulate_replication(sim_problem, config, duration, replication, seed_sequence, kpi_state=kpi_state)
+
+
+def fork(factory, config, snapshot, branches, duration, replications=1, seed=None, max_workers=None):
+    """
+    Continues a run from one snapshot in several what-if branches, in parallel processes, instead of simulating the
+    shared prefix again for every branch. Every branch builds a fresh model, restores the snapshot, applies its
+    change and simulates for duration; its KPIs cover the time after the snapshot. Pass the KPIReporter of the
+    original run to take_snapshot, so that the cycle times of the cases in progress are measured too.
+
+    Without a seed and with one replication, every branch continues with the random streams of the snapshot, so
+    the branch without changes continues exactly like the original run. Otherwise replication i of every branch is
+    re-seeded with the same seed (common random numbers).
+
+    :param factory: A module-level function config -> SimProblem, the one the snapshot was taken from.
+    :param config: The configuration dictionary, passed to factory.
+    :param snapshot: A snapshot of take_snapshot or load_snapshot, or the file name of save_snapshot.
+    :param branches: The changes per branch name, as functions sim_problem -> None that can be pickled, e.g.
+        {"as is": None, "two analysts": functools.partial(set_pool_size, task="credit_check", size=2)}.
+    :param duration: Simulation duration of every branch after the snapshot.
+    :param replications: Number of replications per branch.
+    :param seed: Seed of the SeedSequence of the replications.
+    :param max_workers: Number of processes (default: the number of CPUs).
+    :return: Replications per branch name.
+    """
+    if isinstance(snapshot, str):
+        snapshot = load_snapshot(snapshot)
+    if replications < 1:
+        raise ValueError("replications must be at least 1")
+    if seed is None and replications == 1:
+        seed_sequences = [None]
+    else:
+        seed_sequences = np.random.SeedSequence(seed).spawn(replications)
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {name: [pool.submit(_run_branch, factory, config, snapshot, change, duration, i, seed_sequences[i])
+                          for i in range(replications)]
+                   for name, change in branches.items()}
+        results = {name: [future.result() for future in branch] for name, branch in futures.items()}
+    return {name: Replications(summarize(branch), branch) for name, branch in results.items()}
@@ -0,0 +1,173 @@
+import itertools
+import math
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from network_analyzer import analyze_network
+from replications import simulate_replication, summarize
+
+
+def resource_place(sim_problem, task):
+    """Returns the place that holds the resources of a task (the second input of its start event)."""
+    event = sim_problem.id2node.get(f"{task}<task:start>")
+    if event is None or len(event.incoming) < 2:
+        raise ValueError(f"No task '{task}' with a resource pool in the model")
+    return event.incoming[1]
+
+
+def set_pool_size(sim_problem, task, size):
+    """
+    Sets the number of resources of a task, free and busy. Free resources are removed from the end of the pool, or
+    added with the name of the first resource and the next free number (officer1 -> officer2, officer3, ...).
+    Tasks that share a pool share the new size. Busy resources only exist in a model that continues from a snapshot
+    (see experiments/snapshot.py); they cannot be removed.
+    """
+    if size < 1:
+        raise ValueError(f"Task '{task}' needs at least one resource, got {size}")
+    place = resource_place(sim_problem, task)
+    busy = [token.value[1] for event in sim_problem.events
+            if event.get_id().endswith("<task:start>") and len(event.incoming) > 1 and event.incoming[1] is place
+            for token in event.outgoing[0].marking]
+    if len(busy) > size:
+        raise ValueError(f"Task '{task}' has {len(busy)} busy resources, more than the new size {size}")
+    while len(place.marking) + len(busy) > size:
+        place.remove_token(place.marking[-1])
+    if len(place.marking) + len(busy) < size:
+        names = set(str(token.value) for token in place.marking) | set(str(resource) for resource in busy)
+        first = str(place.marking[0].value) if len(place.marking) > 0 else str(busy[0]) if busy else task
+        prefix = re.sub(r"\d+$", "", first)
+        number = 1
+        while len(place.marking) + len(busy) < size:
+            while f"{prefix}{number}" in names:
+                number += 1
+            names.add(f"{prefix}{number}")
+            place.put(f"{prefix}{number}")
+
+
+def around(resources, k=1, minimum=1):
+    """
+    Returns a grid of pool sizes within k of the given sizes per task, e.g. of calculate_optimal_resources.
+    around({"review": 2, "approve": 1}) == {"review": [1, 2, 3], "approve": [1, 2]}
+    """
+    return {task: list(range(max(minimum, size - k), size + k + 1)) for task, size in resources.items()}
+
+
+def _run_configuration(factory, config, pools, duration, replication, seed_sequence, warmup):
+    sim_problem = factory(config)
+    for task, size in pools.items():
+        set_pool_size(sim_problem, task, size)
+    return simulate_replication(sim_problem, config, duration, replication, seed_sequence, warmup=warmup)
+
+
+def _offered_loads(sim_problem, config, num_cases):
+    """Offered load (arrival rate x mean service time) per task, from the routing of the model."""
+    loads = analyze_network(sim_problem, config, num_cases=num_cases, print_report=False)
+    return {load.task: load.arrival_rate * load.mean_service for load in loads}
+
+
+def _pareto(rows):
+    """Marks the rows that no other row beats on both total resources and mean cycle time."""
+    for row in rows:
+        row["pareto"] = row["pruned"] is None and not any(
+            other is not row and other["pruned"] is None
+            and other["total_resources"] <= row["total_resources"]
+            and other["mean_cycle_time"] <= row["mean_cycle_time"]
+            and (other["total_resources"] < row["total_resources"] or other["mean_cycle_time"] < row["mean_cycle_time"])
+            for other in rows)
+
+
+def sweep(factory, config, grid, duration, replications=1, seed=None, prune=True, target_cycle_time=None,
+          max_workers=None, num_cases=1000, warmup=0):
+    """
+    Simulates every combination of resource pool sizes in a grid, in parallel processes.
+
+    All configurations use the same seeds for the same replication number (common random numbers), so differences
+    between configurations come from the pool sizes rather than from the random streams.
+
+    With prune set, two kinds of configurations are skipped without simulating them:
+    - overloaded ones, in which a task gets more work than its resources can handle (offered load >= pool size, so
+      its queue grows without bound). The offered loads follow from the routing of the model, see network_analyzer.
+    - dominated ones, which have at least as many resources for every task as a configuration that already meets
+      target_cycle_time, if given.
+
+    :param factory: A module-level function config -> SimProblem, e.g. build_model from templates/sequence.py.
+    :param config: The configuration dictionary.
+    :param grid: Pool sizes to try per task, e.g. {"review_application": [1, 2, 3]} or around(...).
+    :param duration: Simulation duration of every replication.
+    :param replications: Number of replications per configuration.
+    :param seed: Seed of the numpy SeedSequence.
+    :param prune: Skip overloaded and dominated configurations.
+    :param target_cycle_time: Mean cycle time that is good enough, or None to simulate all stable configurations.
+    :param max_workers: Number of processes (default: the number of CPUs).
+    :param num_cases: Number of cases used to sample the routing for pruning.
+    :param warmup: Simulation time to run every replication before measuring (see experiments/warmup.py).
+    :return: One row (dict) per configuration with the pool sizes, total_resources, mean_cycle_time (and its 95%
+        half-width), mean_waiting_time, utilization per task, pruned (None or the reason) and pareto, ordered by
+        total resources and cycle time.
+    """
+    tasks = list(grid)
+    rows = [dict(zip(tasks, sizes)) for sizes in itertools.product(*(grid[task] for task in tasks))]
+    base_model = factory(config)
+    for task in tasks:
+        resource_place(base_model, task)  # fails early on a misspelled task
+    offered_loads = _offered_loads(base_model, config, num_cases) if prune else {}
+    seed_sequences = np.random.SeedSequence(seed).spawn(replications)
+
+    for row in rows:
+        row["total_resources"] = sum(row[task] for task in tasks)
+        overloaded = [task for task in tasks if offered_loads.get(task, 0.0) >= row[task]]
+        row["pruned"] = "overloaded: " + ", ".join(overloaded) if overloaded else None
+
+    # Configurations are simulated in waves of equal total resources, smallest first, so that a configuration that
+    # meets the target cycle time prunes every configuration with at least as many resources for every task
+    meeting_target = []
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        for total in sorted(set(row["total_resources"] for row in rows)):
+            jobs = []
+            for row in rows:
+                if row["total_resources"] != total or row["pruned"] is not None:
+                    continue
+                if any(all(row[task] >= other[task] for task in tasks) for other in meeting_target):
+                    row["pruned"] = "dominated"
+                    continue
+                pools = {task: row[task] for task in tasks}
+                jobs.append((row, [pool.submit(_run_configuration, factory, config, pools, duration, i,
+                                               seed_sequences[i], warmup) for i in range(replications)]))
+            for row, futures in jobs:
+                summary = summarize([future.result() for future in futures])
+                row["mean_cycle_time"] = summary["mean_cycle_time"].mean
+                row["cycle_time_half_width"] = summary["mean_cycle_time"].half_width
+                row["mean_waiting_time"] = summary["mean_waiting_time"].mean
+                for name, kpi in summary.items():
+                    if name.startswith("utilization_"):
+                        row[name] = kpi.mean
+                if prune and target_cycle_time is not None and row["mean_cycle_time"] <= target_cycle_time:
+                    meeting_target.append(row)
+
+    for row in rows:
+        if row["pruned"] is not None:
+            row["mean_cycle_time"] = row["mean_waiting_time"] = math.inf
+    _pareto(rows)
+    rows.sort(key=lambda row: (row["total_resources"], row["mean_cycle_time"]))
+    return rows
+
+
+def print_sweep(rows):
+    """Prints the rows of a sweep as a table; * marks the configurations on the Pareto front."""
+    if not rows:
+        return
+    tasks = [key for key in rows[0] if key not in ("total_resources", "pruned", "pareto", "mean_cycle_time",
+                                                   "cycle_time_half_width", "mean_waiting_time")
+             and not key.startswith("utilization_")]
+    print("\n" + "  ".join(f"{task:>{len(task)}}" for task in tasks) + "   cycle time       waiting   max util.")
+    for row in rows:
+        sizes = "  ".join(f"{row[task]:>{len(task)}}" for task in tasks)
+        if row["pruned"] is not None:
+            print(f"{sizes}   pruned ({row['pruned']})")
+            continue
+        utilization = max((value for key, value in row.items() if key.startswith("utilization_")), default=math.nan)
+        marker = " *" if row["pareto"] else ""
+        print(f"{sizes}   {row['mean_cycle_time']:8.2f} ± {row['cycle_time_half_width']:<6.2f}"
+              f"{row['mean_waiting_time']:8.2f}   {utilization:8.0%}{marker}")
@@ -0,0 +1,218 @@
+import copy
+import math
+import random
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from simpn.reporters import Reporter
+from simpn.simulator import SimToken
+
+from rng import seed_model
+from case_record import case_table, freeze_records, thaw_records
+from kpi_reporter import KPIReporter
+
+# The detected warm-up: its length in simulation time, the queue length series averaged over the pilot runs (one
+# value per interval), the same series smoothed with Welch's moving average, and the interval
+Warmup = namedtuple("Warmup", ["time", "series", "smoothed", "interval"])
+
+# The marking of a model at the end of a warm-up: the clock and, per place id, the (value, time) of its tokens; and
+# the KPIReporter state with the start times of the cases and tasks in progress, or None if they were not recorded
+WarmState = namedtuple("WarmState", ["clock", "marking", "kpi_state"], defaults=(None,))
+
+
+class QueueLengthProbe(Reporter):
+    """
+    Records the time-weighted mean number of cases waiting in the queues of all tasks, per interval of simulation
+    time. A model that starts empty shows a rising series that levels off once the queues reach steady state.
+
+    :param sim_problem: The SimProblem instance, before the simulation starts.
+    :param interval: The length of the intervals, in simulation time.
+    """
+    def __init__(self, sim_problem, interval):
+        self.interval = interval
+        self.lengths = {event.incoming[0]: len(event.incoming[0].marking)
+                        for event in sim_problem.events if event.get_id().endswith("<task:start>")}
+        self.level = sum(self.lengths.values())
+        self.start = sim_problem.clock
+        self.last_time = sim_problem.clock
+        self.area = 0.0
+        self.series = []
+
+    def _advance(self, time):
+        end = self.start + (len(self.series) + 1) * self.interval
+        while time >= end:
+            self.area += self.level * (end - self.last_time)
+            self.series.append(self.area / self.interval)
+            self.area = 0.0
+            self.last_time = end
+            end += self.interval
+        self.area += self.level * (time - self.last_time)
+        self.last_time = time
+
+    def callback(self, timed_binding):
+        (binding, time, event) = timed_binding
+        self._advance(time)
+        # Only the queues that this event took a case from or put one in can have changed
+        for place in [place for place, _ in binding] + event.outgoing:
+            length = self.lengths.get(place)
+            if length is not None:
+                self.level += len(place.marking) - length
+                self.lengths[place] = len(place.marking)
+
+    def finish(self, time):
+        """Closes the intervals up to `time`, the end of the run; a last, partial interval is left out."""
+        self._advance(time)
+        return self.series
+
+
+def mser(series, batch_size=5):
+    """
+    Returns the number of leading observations to delete from a series with the MSER-5 rule (White, 1997): the series
+    is averaged in batches of batch_size, and the truncation point d minimizes the variance of the mean of the
+    remaining batches, sum((Y_i - mean)^2) / (n - d)^2. Only the first half of the series is considered.
+
+    :param series: The observations, e.g. QueueLengthProbe.series.
+    :param batch_size: The number of observations per batch (default: 5).
+    :return: The number of observations to delete, a multiple of batch_size.
+    """
+    n = len(series) // batch_size
+    if n < 2:
+        raise ValueError(f"MSER needs at least {2 * batch_size} observations, got {len(series)}")
+    batches = [sum(series[i * batch_size:(i + 1) * batch_size]) / batch_size for i in range(n)]
+    best, best_d = math.inf, 0
+    total = squares = 0.0
+    # Sums of the remaining batches, from the end of the series to the front
+    for d in range(n - 1, -1, -1):
+        total += batches[d]
+        squares += batches[d] * batches[d]
+        remaining = n - d
+        if d <= n // 2:
+            value = max(squares - total * total / remaining, 0.0) / (remaining * remaining)
+            if value <= best:
+                best, best_d = value, d
+    return best_d * batch_size
+
+
+def welch(series_list, window):
+    """
+    Welch's procedure: averages the series of several runs point by point and smooths the average with a moving
+    window of 2 * window + 1 points (shorter at the start). The warm-up ends where the smoothed series levels off.
+
+    :param series_list: One series per run; they are cut to the shortest.
+    :param window: Half-width of the moving average.
+    :return: The smoothed series, window points shorter than the average.
+    """
+    length = min(len(series) for series in series_list)
+    average = [sum(series[i] for series in series_list) / len(series_list) for i in range(length)]
+    smoothed = []
+    for i in range(length - window):
+        w = min(i, window)
+        smoothed.append(sum(average[i - w:i + w + 1]) / (2 * w + 1))
+    return smoothed
+
+
+def _pilot_run(factory, config, duration, interval, seed_sequence):
+    sim_problem = factory(config)
+    random.seed(int(seed_sequence.generate_state(1, dtype=np.uint64)[0]))
+    seed_model(sim_problem, seed_sequence)
+    probe = QueueLengthProbe(sim_problem, interval)
+    sim_problem.simulate(duration, probe)
+    return probe.finish(duration)
+
+
+def find_warmup(factory, config, duration, interval=60, replications=5, seed=None, window=None, max_workers=None):
+    """
+    Detects the warm-up period of a model that starts empty, from the queue lengths of pilot runs in parallel
+    processes: the series of the runs are averaged (the first step of Welch's procedure) and the truncation point of
+    the average is found with MSER-5.
+
+    :param factory: A module-level function config -> SimProblem, as for run_replications.
+    :param config: The configuration dictionary, passed to factory.
+    :param duration: Simulation duration of the pilot runs; at least twice the expected warm-up.
+    :param interval: The interval over which the queue lengths are averaged (default: 60, one hour in minutes).
+    :param replications: Number of pilot runs (default: 5).
+    :param seed: Seed of the SeedSequence of the pilot runs.
+    :param window: Half-width of Welch's moving average in Warmup.smoothed (default: a tenth of the series).
+    :param max_workers: Number of processes (default: the number of CPUs).
+    :return: The Warmup.
+    """
+    if replications < 1:
+        raise ValueError("replications must be at least 1")
+    seed_sequences = np.random.SeedSequence(seed).spawn(replications)
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(_pilot_run, factory, config, duration, interval, seed_sequence)
+                   for seed_sequence in seed_sequences]
+        series_list = [future.result() for future in futures]
+    length = min(len(series) for series in series_list)
+    average = [sum(series[i] for series in series_list) / replications for i in range(length)]
+    deleted = mser(average)
+    if deleted >= (length // 5) // 2 * 5:
+        print(f"Warning: the warm-up takes at least half of the pilot runs; "
+              f"simulate longer than {duration} to find its end.")
+    window = window if window is not None else max(1, length // 10)
+    return Warmup(deleted * interval, average, welch(series_list, window), interval)
+
+
+def warm_up(sim_problem, warmup_time, reporter=None):
+    """
+    Simulates a model up to warmup_time and returns its WarmState, from which replications can start instead of
+    from an empty model (see restore_marking and run_replications). The WarmState includes the start times of the
+    cases and tasks in progress, so that the replications measure their cycle and service times when they complete.
+    """
+    kpi_reporter = KPIReporter()
+    if reporter is None:
+        reporters = [kpi_reporter]
+    else:
+        reporters = [kpi_reporter] + (reporter if isinstance(reporter, list) else [reporter])
+    sim_problem.simulate(warmup_time, reporters)
+    return snapshot_marking(sim_problem)._replace(kpi_state=kpi_reporter.get_state())
+
+
+def snapshot_marking(sim_problem, memo=None):
+    """
+    Returns the WarmState of a model: its clock and the value and time of every token, per place id. Case records
+    are changed in place as the run goes on, so the WarmState keeps copies of them (see freeze_records); pass memo
+    to share the copies with other parts of a snapshot.
+    """
+    memo = {} if memo is None else memo
+    return WarmState(sim_problem.clock, {place.get_id(): [(freeze_records(token.value, memo), token.time)
+                                                          for token in place.marking]
+                                         for place in sim_problem.places})
+
+
+def restore_marking(sim_problem, warm_state):
+    """
+    Puts the marking and clock of a WarmState in a freshly built model of the same process. The token values are
+    copied, so that many models can start from the same WarmState.
+
+    The marking holds everything for models built from the templates with rework, task constraints and case
+    attributes, but not for models with a ResourceCalendar (time-based bottlenecks, shifts), which keeps its
+    timeline outside the marking, or with a parallel join (the parallel and mix templates), which keeps the branches
+    that wait for each other. Those models cannot be restored from a WarmState; use a snapshot
+    (experiments/snapshot.py) for them.
+    """
+    if getattr(sim_problem, "resource_calendar", None) is not None:
+        raise ValueError("The model has a resource calendar, whose state is not part of the marking")
+    if getattr(sim_problem, "parallel_joins", None):
+        raise ValueError("The model has a parallel join, whose waiting branches are not part of the marking")
+    set_marking(sim_problem, warm_state.marking, warm_state.clock)
+
+
+def set_marking(sim_problem, marking, clock, memo=None):
+    """
+    Replaces the marking and clock of a model by copies of those of snapshot_marking, with new case records in the
+    CaseTable of the model; pass memo to share the records with other parts of a snapshot (see thaw_records).
+    """
+    places = {place.get_id(): place for place in sim_problem.places}
+    unknown = set(marking) ^ set(places)
+    if unknown:
+        raise ValueError(f"The marking does not match the model, places {sorted(unknown)} are in only one of them")
+    table = case_table(sim_problem)
+    memo = {} if memo is None else memo
+    for place_id, tokens in copy.deepcopy(marking).items():
+        place = places[place_id]
+        place.marking.clear()
+        for value, time in tokens:
+            place.add_token(SimToken(thaw_records(value, table, memo), time=time))
+    sim_problem.clock = clock
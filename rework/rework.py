@@ -1,18 +1,128 @@
-from random import uniform
+import ast
+import operator
 from simpn.simulator import SimProblem, SimToken
+from rng import get_rng
+from case_record import CaseRecord, case_attributes, case_table
+from model_index import model_index
 from typing import Dict, Optional
 from datetime import datetime
 
+# Comparison operators that compile_condition turns into closures, and their mirror image for "literal op attr"
+_COMPARISONS = {
+    ast.Eq: (operator.eq, operator.eq),
+    ast.NotEq: (operator.ne, operator.ne),
+    ast.Lt: (operator.lt, operator.gt),
+    ast.LtE: (operator.le, operator.ge),
+    ast.Gt: (operator.gt, operator.lt),
+    ast.GtE: (operator.ge, operator.le),
+}
+
+# Nested scopes cannot see eval() locals, so conditions with these nodes get the attributes as globals
+_NESTED_SCOPES = (ast.Lambda, ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+
+_compiled_conditions = {}
+
+def _literal(node):
+    """
+    Returns (True, value) if node is a constant or a datetime(...) call with constant arguments, else (False, None).
+    """
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "datetime":
+        try:
+            args = [ast.literal_eval(arg) for arg in node.args]
+            kwargs = {kw.arg: ast.literal_eval(kw.value) for kw in node.keywords}
+            return True, datetime(*args, **kwargs)
+        except (ValueError, TypeError, SyntaxError):
+            return False, None
+    try:
+        return True, ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError):
+        return False, None
+
+def _compile_comparison(node):
+    """Returns a closure for "attr op literal" or "literal op attr", or None if node has another form."""
+    if not (isinstance(node, ast.Compare) and len(node.ops) == 1 and type(node.ops[0]) in _COMPARISONS):
+        return None
+    compare, mirrored = _COMPARISONS[type(node.ops[0])]
+    left, right = node.left, node.comparators[0]
+    if isinstance(left, ast.Name) and left.id != "datetime":
+        name = left.id
+        is_literal, value = _literal(right)
+    elif isinstance(right, ast.Name) and right.id != "datetime":
+        name, compare = right.id, mirrored
+        is_literal, value = _literal(left)
+    else:
+        return None
+    if not is_literal:
+        return None
+
+    def comparison(attributes):
+        try:
+            return compare(attributes[name], value)
+        except Exception:
+            return False
+    return comparison
+
+def _compile_fast(node):
+    """Returns a closure for constants, simple comparisons and 'and' of those, or None."""
+    is_literal, value = _literal(node)
+    if is_literal:
+        return lambda attributes: value
+    if isinstance(node, ast.BoolOp) and isinstance(node.op, ast.And):
+        # An exception in an operand makes the whole condition False, which is what 'and' gives when the operand is False
+        operands = [_compile_fast(operand) for operand in node.values]
+        if any(operand is None for operand in operands):
+            return None
+
+        def conjunction(attributes):
+            for operand in operands:
+                if not operand(attributes):
+                    return False
+            return True
+        return conjunction
+    return _compile_comparison(node)
+
+def compile_condition(condition: str):
+    """
+    Compiles a rework condition into a predicate that takes the case attributes.
+    Constants, comparisons of an attribute with a literal (e.g. loanType == 'personal', requestedAmount > 5000,
+    start_time >= datetime(2020, 1, 2)) and 'and' combinations of those become plain closures;
+    other conditions are compiled to a code object once. Like safe_eval, the predicate is False when
+    the condition raises, e.g. because an attribute is missing.
+    """
+    if condition in _compiled_conditions:
+        return _compiled_conditions[condition]
+    try:
+        tree = ast.parse(condition, mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid rework condition '{condition}': {e.msg}")
+
+    predicate = _compile_fast(tree.body)
+    if predicate is None:
+        code = compile(tree, "<condition>", "eval")
+        env = {"__builtins__": {}, "datetime": datetime}
+        if any(isinstance(node, _NESTED_SCOPES) for node in ast.walk(tree)):
+            def predicate(attributes):
+                try:
+                    return eval(code, {**env, **attributes})
+                except Exception:
+                    return False
+        else:
+            def predicate(attributes):
+                try:
+                    return eval(code, env, attributes)
+                except Exception:
+                    return False
+    _compiled_conditions[condition] = predicate
+    return predicate
+
 def safe_eval(condition: str, attributes: Dict) -> bool:
     """
     Safely evaluate the condition string using attributes.
+    The condition is compiled on first use, see compile_condition.
     """
     try:
-        # Include datetime in the evaluation environment
-        env = {"__builtins__": {}, "datetime": datetime}
-        env.update(attributes)
-        return eval(condition, env)
-    except Exception:
+        return compile_condition(condition)(attributes)
+    except ValueError:
         return False
 
 def setup_rework(sim_problem: SimProblem, config: dict):
@@ -20,15 +130,19 @@ def setup_rework(sim_problem: SimProblem, config: dict):
     Sets up self-loop rework where a token is sent back to the same activity's input queue.
     Rework occurs based on conditions and resource used, as defined in config.json.
     """
+    rng = get_rng(sim_problem)
+    table = case_table(sim_problem)
+    index = model_index(sim_problem)
     for rework_config in config.get("rework", []):
         activity = rework_config["activity"]
         max_iteration = rework_config["max_iteration"]
         probability = rework_config["probability"]
         condition = rework_config.get("condition", "True")
         resource_condition = rework_config.get("resource", None)  # Resource that triggers rework
+        condition_holds = compile_condition(condition)
 
         # Find the prototype for the activity
-        prototype = next((p for p in sim_problem.prototypes if p.get_id() == activity), None)
+        prototype = index.prototype(activity)
         if not prototype:
             raise ValueError(f"Activity '{activity}' not found in the process model")
 
@@ -44,31 +158,49 @@ def setup_rework(sim_problem: SimProblem, config: dict):
             decision_place = sim_problem.add_var(decision_place_name)
 
         # Modify the complete event to output to decision_place instead of output_queue
-        complete_event_name = f"{activity}<task:complete>"
-        if complete_event_name in sim_problem.id2node:
-            complete_event = sim_problem.id2node[complete_event_name]
+        complete_event = index.task_complete(activity)
+        if complete_event is not None:
             resource_place = complete_event.outgoing[1]  # Assuming [output_place, resource_place]
-            complete_event.set_outflow([decision_place, resource_place])
+            index.set_outflow(complete_event, [decision_place, resource_place])
 
             # Modify behavior to include resource in attributes
-            def complete_with_resource(busy, activity=activity):
-                case, resource = busy  # busy is the tuple ((case_id, (attributes, rework_counts)), resource)
+            def complete_with_resource(busy, resource_key=f"{activity}_resource"):
+                case, resource = busy  # busy is the tuple (case, resource)
+                if case.__class__ is CaseRecord:
+                    case[resource_key] = resource
+                    return [SimToken(case, delay=0), SimToken(resource, delay=0)]
                 identifier, (attributes, rework_counts) = case
-                new_attributes = {**attributes, f"{activity}_resource": resource}
+                new_attributes = {**attributes, resource_key: resource}
                 new_case = (identifier, (new_attributes, rework_counts))
                 return [SimToken(new_case, delay=0), SimToken(resource, delay=0)]
             complete_event.behavior = complete_with_resource
 
         # Define the decision behavior with resource check
+        resource_key = f"{activity}_resource"
+        rework_index = table.rework_index(activity)
+
         def decision_behavior(c):
+            if c.__class__ is CaseRecord:
+                # Change the case in place
+                count = c.rework_count(rework_index)
+                if ((resource_condition is None or c.get(resource_key) == resource_condition) and
+                    condition_holds(c) and
+                    count < max_iteration and
+                    rng.uniform(0, 1) < probability):
+                    c.set_rework_count(rework_index, count + 1)
+                    c["has_rework"] = True
+                    return [SimToken(c), None]
+                if count:
+                    c.set_rework_count(rework_index, 0)
+                return [None, SimToken(c)]
             identifier, (attributes, rework_counts) = c
             count = rework_counts.get(activity, 0)
             resource_used = attributes.get(f"{activity}_resource", None)
             # Check if resource matches the condition (if specified) and other criteria
             if ((resource_condition is None or resource_used == resource_condition) and
-                safe_eval(condition, attributes) and
+                condition_holds(attributes) and
                 count < max_iteration and
-                uniform(0, 1) < probability):
+                rng.uniform(0, 1) < probability):
                 # Rework: increment count and send token back to input queue
                 new_rework_counts = {**rework_counts, activity: count + 1}
                 new_attributes = {**attributes, "has_rework": True}
@@ -98,6 +230,9 @@ def setup_long_rework(sim_problem: SimProblem, config: dict):
     Sets up long rework where a token is sent back to an earlier activity.
     Rework occurs based on conditions and resource used, as defined in config.json.
     """
+    rng = get_rng(sim_problem)
+    table = case_table(sim_problem)
+    index = model_index(sim_problem)
     for long_rework_config in config.get("long_rework", []):
         trigger_activity = long_rework_config["trigger_activity"]
         back_to_activity = long_rework_config["back_to"]
@@ -105,10 +240,11 @@ def setup_long_rework(sim_problem: SimProblem, config: dict):
         probability = long_rework_config["probability"]
         condition = long_rework_config.get("condition", "True")
         resource_condition = long_rework_config.get("resource", None)  # Resource that triggers rework
+        condition_holds = compile_condition(condition)
 
         # Find prototypes
-        trigger_prototype = next((p for p in sim_problem.prototypes if p.get_id() == trigger_activity), None)
-        back_to_prototype = next((p for p in sim_problem.prototypes if p.get_id() == back_to_activity), None)
+        trigger_prototype = index.prototype(trigger_activity)
+        back_to_prototype = index.prototype(back_to_activity)
         if not trigger_prototype or not back_to_prototype:
             raise ValueError(f"Activity not found: '{trigger_activity}' or '{back_to_activity}'")
 
@@ -124,16 +260,18 @@ def setup_long_rework(sim_problem: SimProblem, config: dict):
             decision_place = sim_problem.add_var(decision_place_name)
 
         # Modify the complete event for the trigger activity
-        complete_event_name = f"{trigger_activity}<task:complete>"
-        if complete_event_name in sim_problem.id2node:
-            complete_event = sim_problem.id2node[complete_event_name]
+        complete_event = index.task_complete(trigger_activity)
+        if complete_event is not None:
             resource_place = complete_event.outgoing[1]
-            complete_event.set_outflow([decision_place, resource_place])
+            index.set_outflow(complete_event, [decision_place, resource_place])
 
-            def complete_with_resource(busy, activity=trigger_activity):
+            def complete_with_resource(busy, resource_key=f"{trigger_activity}_resource"):
                 case, resource = busy
+                if case.__class__ is CaseRecord:
+                    case[resource_key] = resource
+                    return [SimToken(case, delay=0), SimToken(resource, delay=0)]
                 identifier, (attributes, rework_counts) = case
-                new_attributes = {**attributes, f"{activity}_resource": resource}
+                new_attributes = {**attributes, resource_key: resource}
                 new_case = (identifier, (new_attributes, rework_counts))
                 return [SimToken(new_case, delay=0), SimToken(resource, delay=0)]
             complete_event.behavior = complete_with_resource
@@ -142,14 +280,29 @@ def setup_long_rework(sim_problem: SimProblem, config: dict):
         rework_key = f"{trigger_activity}_to_{back_to_activity}"
 
         # Decision behavior with resource check
+        resource_key = f"{trigger_activity}_resource"
+        rework_index = table.rework_index(rework_key)
+
         def decision_behavior(c):
+            if c.__class__ is CaseRecord:
+                count = c.rework_count(rework_index)
+                if ((resource_condition is None or c.get(resource_key) == resource_condition) and
+                    condition_holds(c) and
+                    count < max_iteration and
+                    rng.uniform(0, 1) < probability):
+                    c.set_rework_count(rework_index, count + 1)
+                    c["has_rework"] = True
+                    return [SimToken(c), None]
+                if count:
+                    c.set_rework_count(rework_index, 0)
+                return [None, SimToken(c)]
             identifier, (attributes, rework_counts) = c
             count = rework_counts.get(rework_key, 0)
             resource_used = attributes.get(f"{trigger_activity}_resource", None)
             if ((resource_condition is None or resource_used == resource_condition) and
-                safe_eval(condition, attributes) and
+                condition_holds(attributes) and
                 count < max_iteration and
-                uniform(0, 1) < probability):
+                rng.uniform(0, 1) < probability):
                 new_rework_counts = {**rework_counts, rework_key: count + 1}
                 new_attributes = {**attributes, "has_rework": True}
                 new_token = (identifier, (new_attributes, new_rework_counts))
@@ -174,15 +327,14 @@ def setup_long_rework(sim_problem: SimProblem, config: dict):
 
         # Modify subsequent decision event if exists
         decision_events = [
-            e for e in sim_problem.events
-            if back_to_prototype.outgoing[0] in e.incoming and trigger_prototype.incoming[0] in e.outgoing
+            e for e in index.consumers_of(back_to_prototype.outgoing[0])
+            if trigger_prototype.incoming[0] in e.outgoing
         ]
         if decision_events and len(decision_events) == 1:
             decision_event = decision_events[0]
             original_behavior = decision_event.behavior
             def new_behavior(token):
-                identifier, (attributes, _) = token
-                if attributes.get("has_rework", False):
+                if case_attributes(token).get("has_rework", False):
                     index = decision_event.outgoing.index(trigger_prototype.incoming[0])
                     result = [None] * len(decision_event.outgoing)
                     result[index] = SimToken(token)
@@ -191,7 +343,7 @@ def setup_long_rework(sim_problem: SimProblem, config: dict):
             decision_event.behavior = new_behavior
 
 def _find_prototype(sim_problem: SimProblem, activity_id: str):
-    return next((p for p in sim_problem.prototypes if p.get_id() == activity_id), None)
+    return model_index(sim_problem).prototype(activity_id)
 
 def _must(condition: bool, msg: str):
     if not condition:
@@ -271,7 +423,7 @@ def setup_rework_impact(sim_problem: SimProblem, config: dict):
 
         # Keep existing incoming places as-is. Only set the two outgoing places.
         try:
-            node.set_outflow([pos_place, neg_place])
+            model_index(sim_problem).set_outflow(node, [pos_place, neg_place])
         except Exception as e:
             raise ValueError(
                 f"Failed to set outflows for '{event_name}'. "
@@ -280,12 +432,12 @@ def setup_rework_impact(sim_problem: SimProblem, config: dict):
 
     # -------- Replace behavior with rework-aware logic --------
     original_outgoing = list(node.outgoing)  # after optional rewiring
+    rng = get_rng(sim_problem)
 
     def _rework_aware_choice(token):
-        # token content is expected to be (case_id, (attributes_dict, rework_counts_dict))
+        # token content is expected to be a CaseRecord or (case_id, (attributes_dict, rework_counts_dict))
         try:
-            identifier, payload = token
-            attributes, rework_counts = payload
+            attributes = case_attributes(token)
         except Exception:
             # Be permissive and default to no rework if the shape is unexpected
             attributes = {}
@@ -298,7 +450,7 @@ def setup_rework_impact(sim_problem: SimProblem, config: dict):
         else:
             pos_prob = normal_p[0]
 
-        if uniform(0.0, 1.0) < pos_prob:
+        if rng.uniform(0.0, 1.0) < pos_prob:
             # Send to first outgoing (positive)
             return [SimToken(token), None]
         else:
@@ -1,13 +1,16 @@
 from simpn.simulator import SimProblem, SimToken
-from random import expovariate as exp
-from random import uniform
 import simpn.prototypes as prototype
 from simpn.reporters import EventLogReporter, ProcessReporter
 import json
+from rng import get_rng
 
 # Instantiate a simulation problem
 agency = SimProblem()
 
+# Random streams of this simulation; seed them with get_rng(agency, seed) to reproduce a run
+rng = get_rng(agency)
+exp, uniform = rng.expovariate, rng.uniform
+
 # Define variables (queues) for the process flow
 waiting = agency.add_var("waiting")
 to_pre_approval = agency.add_var("to_pre_approval")
@@ -1,15 +1,20 @@
 from simpn.simulator import SimProblem, SimToken
-from random import expovariate as exp, uniform, choice
 #from simpn.reporters import EventLogReporter
 from custom_reporters import EnhancedEventLogReporter
 from simpn.prototypes import BPMNStartEvent, BPMNTask, BPMNEndEvent
 import json
 from rework import setup_rework, setup_long_rework
-from case_attributes import start_behavior
+from case_attributes import start_case
+from rng import get_rng
+from gateways import add_parallel_join
 
 # Instantiate the simulation problem
 loan_process = SimProblem()
 
+# Random streams of this simulation; seed them with get_rng(loan_process, seed) to reproduce a run
+rng = get_rng(loan_process)
+exp, uniform, choice = rng.expovariate, rng.uniform, rng.choice
+
 # Define places (variables) for the process
 waiting = loan_process.add_var("waiting")           # Applications waiting to be reviewed.
 review_done = loan_process.add_var("review_done")     # Applications that have been reviewed.
@@ -49,7 +54,7 @@ BPMNStartEvent(
     [waiting],     # New application token goes into the waiting queue.
     "application_received",
     lambda: exp(1/20),
-    behavior=lambda: start_behavior(loan_process)
+    behavior=lambda case_id: start_case(loan_process, case_id)
 )
 
 # Task: Review Application
@@ -108,13 +113,7 @@ BPMNTask(
 )
 
 # Parallel Join: Synchronize tokens from verify_document and assess_risk.
-loan_process.add_event(
-    [verify_done, risk_done],
-    [join_done],
-    lambda c1, c2: [SimToken(c1)],
-    name="parallel_join",
-    guard=lambda c1, c2: c1 == c2
-)
+add_parallel_join(loan_process, [verify_done, risk_done], [join_done], "parallel_join")
 
 # Task: Loan Approval (after the parallel tasks have joined)
 def loan_approval_start(c, r):
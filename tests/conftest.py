@@ -0,0 +1,10 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The project modules use flat imports (e.g. ``from custom_reporters import ...``), as in the templates
+for folder in ["attr", "rework", "bottleneck", "common", "experiments"]:
+    path = os.path.join(ROOT, folder)
+    if path not in sys.path:
+        sys.path.insert(0, path)
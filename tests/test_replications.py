@@ -0,0 +1,32 @@
+import pytest
+from simpn.simulator import SimProblem, SimToken
+from simpn.prototypes import BPMNStartEvent, BPMNTask, BPMNEndEvent
+
+from case_record import CaseRecord, case_table
+from replications import run_replications
+from warmup import warm_up
+
+
+def build_model(config):
+    """A case every 10 minutes for a task of 25 minutes with one resource, so the queue keeps growing."""
+    model = SimProblem()
+    arrivals, done, staff = model.add_var("arrivals"), model.add_var("done"), model.add_var("staff")
+    staff.put("clerk")
+    BPMNStartEvent(model, [], [arrivals], "arrive", lambda: 10,
+                   behavior=lambda case_id: SimToken(CaseRecord(case_id, case_table(model))))
+    BPMNTask(model, [arrivals, staff], [done, staff], "handle", lambda c, r: [SimToken((c, r), delay=25)])
+    BPMNEndEvent(model, [done], [], "end")
+    return model
+
+
+def test_cases_in_progress_at_the_warm_state_count_in_the_cycle_times():
+    warm_state = warm_up(build_model({}), 600)
+    assert len(warm_state.kpi_state["case_start_times"]) > 30
+
+    result = run_replications(build_model, {}, 2, 200, seed=1, max_workers=1, warm_state=warm_state)
+
+    # The clerk completes 8 cases in 200 minutes, all of them arrived during the warm-up
+    kpis = result.results[0].kpis
+    assert kpis["cases_completed"] == 8
+    assert kpis["mean_cycle_time"] > 200
+    assert kpis["service_time_handle"] == pytest.approx(25)
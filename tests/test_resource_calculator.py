@@ -0,0 +1,65 @@
+import random
+from random import expovariate as exp
+
+import pytest
+from simpn.simulator import SimProblem, SimToken
+from simpn.prototypes import BPMNStartEvent
+
+from resource_calculator import DelayEstimate, clear_estimates, estimate_interarrival, estimate_service
+from rng import get_rng
+
+
+@pytest.fixture(autouse=True)
+def fresh_estimates():
+    clear_estimates()
+    random.seed(1)
+    yield
+    clear_estimates()
+
+
+def sampled(behavior):
+    return estimate_service(behavior, num_samples=20000, rel_precision=0.01)
+
+
+def test_single_draw_is_analytic():
+    assert estimate_service(lambda c, r: [SimToken((c, r), delay=exp(1 / 8))]) == DelayEstimate(8.0, 64.0, 0)
+
+    rng = get_rng(SimProblem(), 1)
+    assert estimate_service(lambda c, r: [SimToken((c, r), delay=rng.uniform(2, 4))]) == DelayEstimate(3.0, 1 / 3, 0)
+
+
+def test_branch_on_other_random_numbers_is_sampled():
+    estimate = sampled(lambda c, r: [SimToken((c, r), delay=exp(1 / 2) if random.random() < 0.9 else exp(1 / 200))])
+    assert estimate.samples > 0
+    assert estimate.mean == pytest.approx(21.8, rel=0.15)
+
+
+def test_branch_on_draws_is_sampled():
+    def shortest(c, r):
+        a, b = exp(1 / 10), exp(1 / 5)
+        return [SimToken((c, r), delay=a if a < b else b)]
+
+    estimate = sampled(shortest)
+    assert estimate.samples > 0
+    assert estimate.mean == pytest.approx(10 / 3, rel=0.05)
+
+
+def test_hidden_random_numbers_are_sampled():
+    def urgent():
+        return random.random() < 0.5
+
+    estimate = sampled(lambda c, r: [SimToken((c, r), delay=exp(1) if urgent() else exp(1 / 100))])
+    assert estimate.samples > 0
+    assert estimate.mean == pytest.approx(50.5, rel=0.1)
+
+
+def test_mixture_interarrival_is_sampled():
+    model = SimProblem()
+    rng = get_rng(model, 1)
+    BPMNStartEvent(model, [], [model.add_var("arrivals")], "arrive",
+                   lambda: rng.expovariate(1) if rng.random.random() < 0.5 else rng.expovariate(1 / 100))
+    behavior = model.id2node["arrive<start_event>"].behavior
+
+    estimate = estimate_interarrival(behavior, "arrive", num_samples=20000, rel_precision=0.01)
+    assert estimate.samples > 0
+    assert estimate.mean == pytest.approx(50.5, rel=0.1)
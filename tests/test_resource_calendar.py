@@ -0,0 +1,60 @@
+import contextlib
+import io
+
+import pytest
+from simpn.simulator import SimProblem, SimToken
+from simpn.prototypes import BPMNStartEvent, BPMNTask, BPMNEndEvent
+from simpn.reporters import Reporter
+
+from case_record import CaseRecord, case_table
+from rework import setup_rework
+from bottleneck_manager import adjust_bottlenecks
+from rng import get_rng
+
+DAY = 24 * 60
+CONFIG = {
+    "rework": [{"activity": "review", "max_iteration": 1, "probability": 0.3}],
+    "bottlenecks": {"type": "resource_shortage", "where": [{"task": "review", "periods": [
+        {"start_date": "2020-01-02", "end_date": "2020-01-03", "resources_to_remove": ["r1", "r2"]}]}]},
+}
+
+
+class TaskStarts(Reporter):
+    def __init__(self):
+        self.starts = []
+
+    def callback(self, timed_binding):
+        binding, time, event = timed_binding
+        if event.get_id() == "review<task:start>":
+            self.starts.append((time, binding[1][1].value))
+
+
+def build_model():
+    # Both resources are busy most of the time, so they are busy when the period starts
+    model = SimProblem()
+    rng = get_rng(model, 3)
+    arrivals, done, staff = model.add_var("arrivals"), model.add_var("done"), model.add_var("staff")
+    staff.put("r1")
+    staff.put("r2")
+    BPMNStartEvent(model, [], [arrivals], "arrive", lambda: rng.expovariate(1 / 20),
+                   behavior=lambda case_id: SimToken(CaseRecord(case_id, case_table(model))))
+    BPMNTask(model, [arrivals, staff], [done, staff], "review",
+             lambda c, r: [SimToken((c, r), delay=rng.expovariate(1 / 35))])
+    BPMNEndEvent(model, [done], [], "end")
+    return model
+
+
+@pytest.mark.parametrize("rework_first", [True, False])
+def test_busy_resources_leave_whatever_the_setup_order(rework_first):
+    model = build_model()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if rework_first:
+            setup_rework(model, CONFIG)
+        adjust_bottlenecks(model, CONFIG)
+        if not rework_first:
+            setup_rework(model, CONFIG)
+    reporter = TaskStarts()
+    model.simulate(3 * DAY, reporter)
+
+    assert [start for start in reporter.starts if DAY <= start[0] < 2 * DAY] == []
+    assert {resource for time, resource in reporter.starts if time >= 2 * DAY} == {"r1", "r2"}
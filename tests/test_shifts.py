@@ -0,0 +1,54 @@
+import contextlib
+import csv
+import io
+
+import pytest
+from simpn.simulator import SimProblem, SimToken
+from simpn.prototypes import BPMNStartEvent, BPMNTask, BPMNEndEvent
+
+from case_record import CaseRecord, case_table
+from custom_reporters import EnhancedEventLogReporter
+from kpi_reporter import KPIReporter
+from shifts import apply_shifts
+
+
+def build_model(policy):
+    """
+    A case every 100 minutes for a task of 70 minutes. Resource a works from 00:00 to 01:00, so its shift ends while
+    it works on the first case; resource b is free then and always on duty.
+    """
+    model = SimProblem()
+    arrivals, done, staff = model.add_var("arrivals"), model.add_var("done"), model.add_var("staff")
+    staff.put("a")
+    staff.put("b")
+    BPMNStartEvent(model, [], [arrivals], "arrive", lambda: 100,
+                   behavior=lambda case_id: SimToken(CaseRecord(case_id, case_table(model))))
+    BPMNTask(model, [arrivals, staff], [done, staff], "handle", lambda c, r: [SimToken((c, r), delay=70)])
+    BPMNEndEvent(model, [done], [], "end")
+    config = {"shifts": {"calendars": {"early": {"hours": ["00:00", "01:00"], "at_shift_end": policy}},
+                         "resources": {"a": "early"}}}
+    with contextlib.redirect_stdout(io.StringIO()):
+        apply_shifts(model, config)
+    return model
+
+
+@pytest.mark.parametrize("policy, start, resource, completion", [
+    ("preempt", "2020-01-01 01:00:00.000000", "b", "2020-01-01 02:10:00.000000"),
+    ("handover", "2020-01-01 00:00:00.000000", "b", "2020-01-01 01:10:00.000000"),
+])
+def test_interrupted_task_is_logged_once(tmp_path, policy, start, resource, completion):
+    model = build_model(policy)
+    log = tmp_path / "log.csv"
+    kpi_reporter = KPIReporter(model)
+    with EnhancedEventLogReporter(str(log), sim_problem=model) as reporter:
+        model.simulate(450, [reporter, kpi_reporter])
+    with open(log) as f:
+        rows = [row for row in csv.DictReader(f) if row["task"] == "handle"]
+
+    first = [row for row in rows if row["case_id"] == "arrive0"]
+    assert [(row["start_time"], row["resource"], row["completion_time"]) for row in first] == \
+        [(start, resource, completion)]
+    # All tasks have completed, the interrupted one included
+    assert reporter.task_start_times == {}
+    assert kpi_reporter.task_start_times == {}
+    assert kpi_reporter.task_service_time["handle"].count == len(rows) == 5